@@ -0,0 +1,84 @@
+"""Yomon so‘z tekshiruvi benchmarki: eski regex usuli va Aho-Corasick avtomati.
+
+Ishga tushirish:
+    python benchmarks/bad_words_bench.py
+    python benchmarks/bad_words_bench.py --words 10000 --messages 2000
+"""
+import argparse
+import random
+import re
+import string
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.word_matcher import WordMatcher  # noqa: E402
+
+
+def regex_contains_bad_word(text: str, words: list[str]) -> bool:
+    """Oldingi handlers.common.contains_bad_word: har chaqiruvda regex qayta yig‘iladi."""
+    if not text or not words:
+        return False
+    words = sorted({w.strip().lower() for w in words if w.strip()}, key=len, reverse=True)
+    pattern = r"(?<![\w'])(" + "|".join(re.escape(w) for w in words) + r")(?![\w'])"
+    return bool(re.search(pattern, text.lower(), flags=re.IGNORECASE | re.UNICODE))
+
+
+def make_words(rng: random.Random, count: int) -> list[str]:
+    letters = string.ascii_lowercase + "ўқғҳ"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(4, 10))) for _ in range(count)]
+
+
+def make_messages(rng: random.Random, words: list[str], count: int) -> list[str]:
+    filler = ["salom", "guruh", "bugun", "dars", "yangilik", "rahmat", "qachon", "uchrashuv", "ok", "ha"]
+    messages = []
+    for i in range(count):
+        parts = [rng.choice(filler) for _ in range(rng.randint(5, 40))]
+        if i % 20 == 0:
+            parts.insert(rng.randrange(len(parts)), rng.choice(words))
+        messages.append(" ".join(parts))
+    return messages
+
+
+def bench(label: str, func, messages: list[str]) -> tuple[float, int]:
+    started = time.perf_counter()
+    hits = sum(1 for text in messages if func(text))
+    elapsed = time.perf_counter() - started
+    print(f"{label:<34} {elapsed * 1000:10.1f} ms  {elapsed / len(messages) * 1e6:9.1f} us/xabar  topildi={hits}")
+    return elapsed, hits
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--words", type=int, default=10_000)
+    parser.add_argument("--messages", type=int, default=2_000)
+    parser.add_argument("--chats", type=int, default=8, help="alohida ro‘yxatli chatlar (re cache thrash)")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    lists = [make_words(rng, args.words) for _ in range(args.chats)]
+    messages = make_messages(rng, lists[0], args.messages)
+    print(f"So‘zlar: {args.words} x {args.chats} chat | Xabarlar: {args.messages}\n")
+
+    started = time.perf_counter()
+    matcher = WordMatcher(lists[0])
+    print(f"{'Avtomat qurish (bir marta)':<34} {(time.perf_counter() - started) * 1000:10.1f} ms")
+
+    # Eski usul juda sekin bo‘lgani uchun xabarlarning bir qismida o‘lchanadi.
+    sample = messages[: max(1, min(len(messages), 50))]
+    old_elapsed, _ = bench("regex (har xabarda yig‘iladi)", lambda t: regex_contains_bad_word(t, lists[len(t) % args.chats]), sample)
+    new_elapsed, _ = bench("Aho-Corasick (kesh)", matcher.search, messages)
+    old_per_msg = old_elapsed / len(sample)
+    new_per_msg = new_elapsed / len(messages)
+    print(f"\nTezlanish: ~{old_per_msg / new_per_msg:,.0f}x")
+
+    mismatches = sum(
+        1 for text in sample if regex_contains_bad_word(text, lists[0]) != matcher.search(text)
+    )
+    print(f"Natijalar mosligi: {len(sample) - mismatches}/{len(sample)}")
+
+
+if __name__ == "__main__":
+    main()
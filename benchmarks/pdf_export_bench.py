@@ -0,0 +1,120 @@
+"""PDF export benchmarki: eski Paragraph-per-row usuli va yangi jadval + ProcessPool.
+
+Vaqtinchalik bazada init_db() sxemasi bilan 100 000 foydalanuvchi yaratiladi.
+Har usul uchun vaqt, fayl hajmi va event loop eng uzoq qotgan vaqt (lag) chiqariladi.
+
+Ishga tushirish:
+    python benchmarks/pdf_export_bench.py
+    python benchmarks/pdf_export_bench.py --rows 200000 --processes 4 --range-pages 50
+    python benchmarks/pdf_export_bench.py --skip-legacy
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--rows", type=int, default=100_000)
+parser.add_argument("--processes", type=int, default=min(os.cpu_count() or 1, 4))
+parser.add_argument("--range-pages", type=int, default=50)
+parser.add_argument("--skip-legacy", action="store_true", help="eski usulni o‘tkazib yuborish (juda sekin)")
+args = parser.parse_args()
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DB_PATH"] = os.path.join(_tmp.name, "bench.db")
+os.environ["PDF_RENDER_PROCESSES"] = str(args.processes)
+os.environ["PDF_RANGE_PAGES"] = str(args.range_pages)
+os.environ.setdefault("BOT_TOKEN", "0:bench")
+os.environ.setdefault("ADMIN_IDS", "1")
+
+from reportlab.lib.styles import getSampleStyleSheet  # noqa: E402
+from reportlab.platypus import Paragraph, SimpleDocTemplate  # noqa: E402
+
+import database  # noqa: E402
+from services.exports import export_users_file, shutdown_pdf_pool  # noqa: E402
+from utils.timezone import format_samarkand  # noqa: E402
+
+
+def old_export_users_to_pdf(users, filename):
+    """Oldingi utils.file_export.export_users_to_pdf: har qatorga Paragraph + "<br/>" Paragraph."""
+    doc = SimpleDocTemplate(filename)
+    styles = getSampleStyleSheet()
+    story = [Paragraph("<b>Foydalanuvchilar ro‘yxati</b>", styles["Title"])]
+    for i, row in enumerate(users, start=1):
+        user_id, first_name, last_name, username, language_code, joined_at = row[:6]
+        full_name = f"{first_name or ''} {last_name or ''}".strip() or "Noma’lum"
+        text = (
+            f"<b>{i}. {full_name}</b><br/>"
+            f"ID: {user_id} | Username: @{username} | Til: {language_code or '—'}<br/>"
+            f"Qo‘shilgan: {format_samarkand(joined_at)}"
+        )
+        story.append(Paragraph(text, styles["Normal"]))
+        story.append(Paragraph("<br/>", styles["Normal"]))
+    doc.build(story)
+    return filename
+
+
+async def seed(rows: int):
+    async with database._pool.write() as db:
+        await db.executemany(
+            "INSERT INTO users (user_id, first_name, last_name, username, language_code) VALUES (?, ?, ?, ?, ?)",
+            ((i, f"Ism {i}", "Familiyev", f"user_{i}", "uz") for i in range(1, rows + 1)),
+        )
+        await db.commit()
+
+
+async def measure(label: str, coro_factory):
+    """Export paytida event loop har 10 ms da uyg‘onishi kerak; eng katta kechikish — lag."""
+    lag = 0.0
+    done = False
+
+    async def probe():
+        nonlocal lag
+        while not done:
+            tick = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lag = max(lag, time.perf_counter() - tick - 0.01)
+
+    probe_task = asyncio.create_task(probe())
+    started = time.perf_counter()
+    path = await coro_factory()
+    elapsed = time.perf_counter() - started
+    done = True
+    await probe_task
+    size = os.path.getsize(path) / 1024 / 1024
+    print(f"{label:<38} {elapsed:8.1f} s  {size:7.1f} MB  loop lag max {lag * 1000:8.0f} ms")
+    return elapsed
+
+
+async def main():
+    await database.init_db()
+    started = time.perf_counter()
+    await seed(args.rows)
+    print(f"Qatorlar: {args.rows} | jarayonlar: {args.processes} | oraliq: {args.range_pages} sahifa"
+          f" | to‘ldirish {time.perf_counter() - started:.1f} s\n")
+
+    old_elapsed = None
+    if not args.skip_legacy:
+        async def legacy():
+            users = await database.get_all_users()
+            # Eski handlerlar kabi to‘g‘ridan-to‘g‘ri event loop ichida.
+            return old_export_users_to_pdf(users, os.path.join(_tmp.name, "old.pdf"))
+
+        old_elapsed = await measure("Paragraph har qatorga (eski)", legacy)
+
+    new_elapsed = await measure(
+        "Jadval + ProcessPool (yangi)", lambda: export_users_file("pdf", os.path.join(_tmp.name, "new.pdf"), False)
+    )
+    if old_elapsed:
+        print(f"\nTezlanish: ~{old_elapsed / new_elapsed:.1f}x")
+    shutdown_pdf_pool()
+    await database.close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,104 @@
+"""Statistika benchmarki: eski 13 ta COUNT(*) va yangi guruhlangan (covering indeks) so‘rov.
+
+Vaqtinchalik bazada init_db() sxemasi bilan 100 000 chat yaratiladi.
+
+Ishga tushirish:
+    python benchmarks/stats_bench.py
+    python benchmarks/stats_bench.py --chats 300000 --repeat 10
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DB_PATH"] = os.path.join(_tmp.name, "bench.db")
+os.environ.setdefault("BOT_TOKEN", "0:bench")
+os.environ.setdefault("ADMIN_IDS", "1")
+
+import database  # noqa: E402
+
+
+async def old_get_stats_summary():
+    """Oldingi database.get_stats_summary: har hisoblagich uchun alohida to‘liq skan."""
+    async with database._pool.read() as db:
+        async def fetch_count(sql: str) -> int:
+            cursor = await db.execute(sql)
+            return int((await cursor.fetchone())[0] or 0)
+
+        inactive_sql = "COALESCE(bot_status, 'unknown') IN ('not_member', 'left', 'kicked')"
+        active_sql = f"NOT ({inactive_sql})"
+        values = [
+            await fetch_count("SELECT COUNT(*) FROM chats"),
+            await fetch_count(f"SELECT COUNT(*) FROM chats WHERE {active_sql}"),
+            await fetch_count("SELECT COUNT(*) FROM chats WHERE is_bot_admin=1"),
+            await fetch_count(f"SELECT COUNT(*) FROM chats WHERE {inactive_sql}"),
+            await fetch_count("SELECT COUNT(*) FROM chats WHERE type IN ('group', 'supergroup')"),
+            await fetch_count("SELECT COUNT(*) FROM chats WHERE type='channel'"),
+            await fetch_count(f"SELECT COUNT(*) FROM chats WHERE type IN ('group', 'supergroup') AND {active_sql}"),
+            await fetch_count(f"SELECT COUNT(*) FROM chats WHERE type='channel' AND {active_sql}"),
+            await fetch_count("SELECT COUNT(*) FROM chats WHERE type IN ('group', 'supergroup') AND is_bot_admin=1"),
+            await fetch_count("SELECT COUNT(*) FROM chats WHERE type='channel' AND is_bot_admin=1"),
+            await fetch_count("SELECT COUNT(*) FROM users"),
+            await fetch_count("SELECT COUNT(*) FROM unsafe_extensions WHERE chat_id IS NULL"),
+            await fetch_count("SELECT COUNT(*) FROM bad_words WHERE chat_id IS NULL"),
+        ]
+    return dict(zip(database.STATS_KEYS, values))
+
+
+async def seed(chats: int, users: int):
+    rng = random.Random(42)
+    types = ["group", "supergroup", "supergroup", "channel"]
+    statuses = ["administrator", "member", "member", "left", "kicked", "not_member", None]
+    async with database._pool.write() as db:
+        await db.executemany(
+            "INSERT INTO chats (chat_id, title, type, is_bot_admin, bot_status, member_count) VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                (-1_000_000_000 - i, f"chat {i}", rng.choice(types), int(rng.random() < 0.4), rng.choice(statuses), rng.randint(1, 5000))
+                for i in range(chats)
+            ),
+        )
+        await db.executemany(
+            "INSERT INTO users (user_id, first_name) VALUES (?, ?)",
+            ((i, f"user {i}") for i in range(1, users + 1)),
+        )
+        await db.commit()
+
+
+async def bench(label: str, func, repeat: int) -> tuple[float, dict]:
+    result = await func()  # isitish (sahifa keshi)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = await func()
+    elapsed = (time.perf_counter() - started) / repeat
+    print(f"{label:<34} {elapsed * 1000:10.1f} ms/chaqiruv")
+    return elapsed, result
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chats", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    await database.init_db()
+    started = time.perf_counter()
+    await seed(args.chats, args.users)
+    print(f"Chatlar: {args.chats} | Userlar: {args.users} | to‘ldirish {time.perf_counter() - started:.1f} s\n")
+
+    old_elapsed, old_result = await bench("13 ta COUNT(*) (eski)", old_get_stats_summary, args.repeat)
+    new_elapsed, new_result = await bench("GROUP BY indeks (yangi)", database.get_stats_summary, args.repeat)
+    print(f"\nTezlanish: ~{old_elapsed / new_elapsed:.1f}x")
+    print(f"Natijalar mosligi: {'ha' if old_result == new_result else 'YO‘Q'}")
+    await database.close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
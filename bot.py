@@ -6,9 +6,15 @@ from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
 
 from config import BOT_TOKEN, LOG_LEVEL
-from database import init_db
+from database import init_db, close_db
 from handlers import routers
 from services.stat_cache import stats_cache_loop
+from services.delete_scheduler import delete_scheduler
+from services.member_counts import member_count_refresher
+from services.rate_limiter import rate_limiter
+from services.broadcast import broadcast_engine
+from services.export_cache import export_cache
+from services.exports import shutdown_pdf_pool
 
 logging.basicConfig(
     level=getattr(logging, LOG_LEVEL, logging.INFO),
@@ -20,6 +26,8 @@ bot = Bot(
     token=BOT_TOKEN,
     default=DefaultBotProperties(parse_mode=ParseMode.HTML)
 )
+# Barcha Bot API so‘rovlari umumiy limit va ustuvorlik navbatidan o‘tadi.
+bot.session.middleware(rate_limiter)
 dp = Dispatcher()
 
 
@@ -28,12 +36,22 @@ async def main():
     for router in routers:
         dp.include_router(router)
     cache_task = asyncio.create_task(stats_cache_loop(bot))
+    await delete_scheduler.start(bot)
+    await member_count_refresher.start(bot)
+    await broadcast_engine.start(bot)
+    await export_cache.start()
     logger.info("🤖 Bot ishga tushdi...")
     try:
         await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
     finally:
         cache_task.cancel()
         await asyncio.gather(cache_task, return_exceptions=True)
+        await broadcast_engine.stop()
+        await delete_scheduler.stop()
+        await member_count_refresher.stop()
+        await rate_limiter.close()
+        shutdown_pdf_pool()
+        await close_db()
 
 
 if __name__ == "__main__":
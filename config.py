@@ -16,6 +16,50 @@ ADMIN_ID = [
     if x.strip().isdigit()
 ]
 DB_PATH = os.getenv("DB_PATH", str(BASE_DIR / "chat.db"))
+# Doimiy SQLite pool: bitta yozuvchi + shuncha o‘quvchi ulanish.
+DB_POOL_READERS = int(os.getenv("DB_POOL_READERS", "4"))
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+# User/chat upsert va loglar shuncha yozuv yig‘ilganda yoki shuncha soniyadan keyin saqlanadi.
+WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", "200"))
+WRITE_FLUSH_INTERVAL = float(os.getenv("WRITE_FLUSH_INTERVAL", "0.5"))
+# Ism/username/title o‘zgarmasa user/chat qayta yozilmaydi; updated_at shuncha soniyada bir yangilanadi.
+METADATA_REFRESH_SECONDS = int(os.getenv("METADATA_REFRESH_SECONDS", "900"))
+# Runtime cache (sozlama, yomon so‘z, kengaytma, whitelist) har biri uchun chegaralar.
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "50000"))
+CACHE_MAX_MB = float(os.getenv("CACHE_MAX_MB", "32"))
+# Botning chatdagi huquqlari (status, o‘chirish, cheklash) shuncha soniya cache'da turadi.
+BOT_RIGHTS_TTL = int(os.getenv("BOT_RIGHTS_TTL", "600"))
+# Ogohlantirish xabarlarini kechiktirib o‘chirish navbati.
+DELETE_QUEUE_MAX = int(os.getenv("DELETE_QUEUE_MAX", "5000"))
+DELETE_CONCURRENCY = int(os.getenv("DELETE_CONCURRENCY", "8"))
+DELETE_PERSIST = os.getenv("DELETE_PERSIST", "1").strip().lower() not in {"0", "false", "no"}
+# A'zolar soni shuncha soniyadan eski bo‘lsa fonda yangilanadi (admin/referral chatlar — PRIORITY).
+MEMBER_COUNT_MAX_AGE = int(os.getenv("MEMBER_COUNT_MAX_AGE", "21600"))
+MEMBER_COUNT_PRIORITY_MAX_AGE = int(os.getenv("MEMBER_COUNT_PRIORITY_MAX_AGE", "3600"))
+# getChatMemberCount byudjeti: sekundiga so‘rovlar, parallel so‘rovlar, fon tekshiruv oralig‘i.
+MEMBER_COUNT_RATE = float(os.getenv("MEMBER_COUNT_RATE", "5"))
+MEMBER_COUNT_CONCURRENCY = int(os.getenv("MEMBER_COUNT_CONCURRENCY", "4"))
+MEMBER_COUNT_SWEEP_SECONDS = int(os.getenv("MEMBER_COUNT_SWEEP_SECONDS", "300"))
+# Telegram API limiti: global so‘rov/s, guruhga daqiqasiga xabar, RetryAfter'da qayta urinishlar.
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))
+TELEGRAM_GROUP_PER_MINUTE = float(os.getenv("TELEGRAM_GROUP_PER_MINUTE", "20"))
+TELEGRAM_RETRY_MAX = int(os.getenv("TELEGRAM_RETRY_MAX", "3"))
+TELEGRAM_RETRY_MAX_WAIT = float(os.getenv("TELEGRAM_RETRY_MAX_WAIT", "60"))
+# Ommaviy xabar: parallel yuboruvchilar soni va progress xabarini tahrirlash oralig‘i (soniya).
+BROADCAST_WORKERS = int(os.getenv("BROADCAST_WORKERS", "8"))
+BROADCAST_PROGRESS_SECONDS = float(os.getenv("BROADCAST_PROGRESS_SECONDS", "5"))
+# Exportlar: bazadan bir partiyada o‘qiladigan qatorlar va bir vaqtda tayyorlanadigan fayllar soni.
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "2000"))
+EXPORT_CONCURRENCY = int(os.getenv("EXPORT_CONCURRENCY", "2"))
+# PDF alohida jarayonlarda chiziladi: jarayonlar soni va bitta jarayonga beriladigan sahifalar.
+PDF_RENDER_PROCESSES = int(os.getenv("PDF_RENDER_PROCESSES", str(min(os.cpu_count() or 1, 4))))
+PDF_RANGE_PAGES = int(os.getenv("PDF_RANGE_PAGES", "50"))
+# Tayyor export fayllari keshi: papka, ko‘pi bilan fayllar soni va ishlatilmasa saqlanish muddati (soniya).
+EXPORT_DIR = os.getenv("EXPORT_DIR", "exports")
+EXPORT_CACHE_MAX_FILES = int(os.getenv("EXPORT_CACHE_MAX_FILES", "50"))
+EXPORT_CACHE_TTL = int(os.getenv("EXPORT_CACHE_TTL", "86400"))
+# CSV/JSONL exportlar shu hajmdan (MB) oshsa keyingi qism faylga o‘tadi (Bot API limiti 50 MB).
+EXPORT_PART_MAX_MB = float(os.getenv("EXPORT_PART_MAX_MB", "45"))
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
 
 if not BOT_TOKEN:
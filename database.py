@@ -1,49 +1,342 @@
+import asyncio
 import aiosqlite
 import logging
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-import time
 from utils.timezone import now_samarkand_str, now_samarkand
-from config import DB_PATH
+from utils.cache import RuntimeCache
+from itertools import count, groupby
+from config import (
+    DB_PATH, DB_POOL_READERS, DB_BUSY_TIMEOUT_MS, WRITE_BATCH_SIZE, WRITE_FLUSH_INTERVAL,
+    METADATA_REFRESH_SECONDS, CACHE_MAX_ENTRIES, CACHE_MAX_MB,
+)
 
 logger = logging.getLogger(__name__)
 
 
+class WriteBehindQueue:
+    """Tez-tez takrorlanadigan yozuvlarni guruhlab, bitta tranzaksiyada saqlaydi.
+
+    Har bir xabarda keladigan user/chat upsert'lari va security loglar darhol commit
+    qilinmaydi: navbatga qo‘yiladi va ``batch_size`` ga yetganda yoki
+    ``flush_interval`` soniyadan keyin bitta commit bilan yoziladi. Bir xil kalitli
+    yozuv (masalan o‘sha user) navbatda bo‘lsa, faqat oxirgisi qoladi.
+    """
+
+    def __init__(self, pool: "ConnectionPool", batch_size: int = 200, flush_interval: float = 0.5):
+        self.pool = pool
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = max(0.0, float(flush_interval))
+        self._pending: dict = {}
+        self._seq = count()
+        self._timer: asyncio.Task | None = None
+        self._size_flush: asyncio.Task | None = None
+        # Saqlanmagan yozuvlar kalitlari bilan chaqiriladi (masalan, metadata izini o‘chirish uchun).
+        self.on_failed = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def submit(self, key, sql: str, params: tuple):
+        """Yozuvni navbatga qo‘yadi. key=None bo‘lsa yozuv hech qachon birlashtirilmaydi (log)."""
+        if key is None:
+            key = ("_seq", next(self._seq))
+        # Eski yozuv o‘chirilib oxiriga qo‘yiladi: tartib oxirgi o‘zgarish bo‘yicha saqlanadi.
+        self._pending.pop(key, None)
+        self._pending[key] = (sql, params)
+        self._schedule()
+
+    def _schedule(self):
+        if len(self._pending) >= self.batch_size:
+            if self._size_flush is None or self._size_flush.done():
+                self._size_flush = asyncio.create_task(self._flush_full())
+        elif self._timer is None or self._timer.done():
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        # Drain paytida kelgan yozuv yangi taymer ochsin (aks holda u navbatda osilib qoladi).
+        self._timer = None
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Navbatdagi yozuvlarni saqlashda xato")
+
+    async def _flush_full(self):
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Navbatdagi yozuvlarni saqlashda xato")
+        finally:
+            self._size_flush = None
+        if self._pending:
+            self._schedule()
+
+    async def flush(self):
+        """Navbatdagi barcha yozuvlarni darhol bazaga yozadi."""
+        if not self._pending:
+            return
+        async with self.pool.write():
+            # write() o‘zi avval navbatni bo‘shatadi (drain).
+            pass
+
+    async def drain(self, db: aiosqlite.Connection) -> int:
+        """Yozuvchi lock ushlangan holda chaqiriladi."""
+        if not self._pending:
+            return 0
+        items = list(self._pending.items())
+        self._pending = {}
+        failed = []
+        try:
+            for sql, group in groupby(items, key=lambda item: item[1][0]):
+                group = [(key, p) for key, (_, p) in group]
+                await db.execute("SAVEPOINT write_queue")
+                try:
+                    await db.executemany(sql, [p for _, p in group])
+                except Exception:
+                    # Bitta noto‘g‘ri yozuv butun partiyani yo‘qotmasin: qolganlarini alohida yozamiz.
+                    await db.execute("ROLLBACK TO write_queue")
+                    for key, p in group:
+                        try:
+                            await db.execute(sql, p)
+                        except Exception as exc:
+                            failed.append(key)
+                            logger.warning("Navbatdagi yozuv bajarilmadi: %s params=%s", exc, p)
+                await db.execute("RELEASE write_queue")
+            await db.commit()
+        except Exception:
+            logger.exception("Navbatdagi %s ta yozuvni commit qilib bo‘lmadi", len(items))
+            failed = [key for key, _ in items]
+            if db.in_transaction:
+                await db.rollback()
+        if failed and self.on_failed is not None:
+            self.on_failed(failed)
+        return len(items)
+
+    async def close(self):
+        for task in (self._timer, self._size_flush):
+            if task is not None and not task.done():
+                task.cancel()
+        self._timer = None
+        self._size_flush = None
+
+
+class ConnectionPool:
+    """Doimiy ochiq aiosqlite ulanishlari: bitta yozuvchi va N ta o‘quvchi.
+
+    Har bir so‘rov uchun yangi ``aiosqlite.connect`` (yangi thread + SQLite handle)
+    ochilmaydi. PRAGMA'lar har bir ulanishga faqat bir marta, ochilganda qo‘llanadi.
+    Yozuvlar bitta ulanishda lock orqali ketma-ket bajariladi, o‘qishlar esa WAL
+    rejimida parallel o‘quvchi ulanishlarda ishlaydi.
+    """
+
+    def __init__(self, path: str, readers: int = 4):
+        self.path = path
+        self.readers_count = max(1, int(readers))
+        self._writer: aiosqlite.Connection | None = None
+        self._readers: list[aiosqlite.Connection] = []
+        self._idle: asyncio.Queue | None = None
+        self._write_lock = asyncio.Lock()
+        self._open_lock = asyncio.Lock()
+        self.queue = WriteBehindQueue(self, WRITE_BATCH_SIZE, WRITE_FLUSH_INTERVAL)
+
+    @property
+    def is_open(self) -> bool:
+        return self._writer is not None
+
+    async def _connect(self) -> aiosqlite.Connection:
+        conn = await aiosqlite.connect(self.path)
+        await conn.execute("PRAGMA journal_mode=WAL")
+        await conn.execute("PRAGMA foreign_keys=ON")
+        await conn.execute(f"PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT_MS)}")
+        return conn
+
+    async def open(self):
+        if self._writer is not None:
+            return
+        async with self._open_lock:
+            if self._writer is not None:
+                return
+            writer = await self._connect()
+            readers = [await self._connect() for _ in range(self.readers_count)]
+            idle: asyncio.Queue = asyncio.Queue()
+            for conn in readers:
+                idle.put_nowait(conn)
+            self._readers = readers
+            self._idle = idle
+            self._writer = writer
+            logger.info("SQLite pool ochildi: 1 writer + %s reader", self.readers_count)
+
+    async def close(self):
+        if self._writer is not None and len(self.queue):
+            await self.queue.flush()
+        await self.queue.close()
+        writer, readers = self._writer, self._readers
+        self._writer = None
+        self._readers = []
+        self._idle = None
+        for conn in [*readers, writer]:
+            if conn is None:
+                continue
+            try:
+                await conn.close()
+            except Exception as exc:
+                logger.warning("SQLite ulanishini yopishda xato: %s", exc)
+
+    @asynccontextmanager
+    async def write(self):
+        """Yozuvchi ulanish. Blok ichidagi tranzaksiya boshqa yozuvlar bilan aralashmaydi.
+
+        Navbatdagi (write-behind) yozuvlar har doim avval saqlanadi, shuning uchun
+        to‘g‘ridan-to‘g‘ri yozuvlar ulardan oldin bajarilib ketmaydi.
+        """
+        await self.open()
+        async with self._write_lock:
+            db = self._writer
+            await self.queue.drain(db)
+            try:
+                yield db
+            except BaseException:
+                # Xato bo‘lsa yarim qolgan tranzaksiya keyingi yozuvchiga o‘tib ketmasin.
+                if db.in_transaction:
+                    try:
+                        await db.rollback()
+                    except Exception:
+                        logger.exception("SQLite rollback xatosi")
+                raise
+
+    @asynccontextmanager
+    async def read(self):
+        """Bo‘sh o‘quvchi ulanishni navbatdan olib, ish tugagach qaytaradi."""
+        await self.open()
+        idle = self._idle
+        db = await idle.get()
+        try:
+            yield db
+        finally:
+            idle.put_nowait(db)
+
+    @asynccontextmanager
+    async def stream(self):
+        """Uzoq o‘qishlar (export) uchun alohida, faqat o‘qiydigan ulanish.
+
+        Pool o‘quvchilari export davomida band qilinmaydi; WAL tufayli yozuvlar
+        ham to‘xtamaydi, bitta SELECT esa boshidagi holatni (snapshot) o‘qiydi.
+        """
+        conn = await self._connect()
+        try:
+            await conn.execute("PRAGMA query_only=ON")
+            yield conn
+        finally:
+            await conn.close()
+
+
+_pool = ConnectionPool(DB_PATH, DB_POOL_READERS)
+
+
+async def close_db():
+    """Bot to‘xtaganda navbatni saqlab, doimiy ulanishlarni yopadi."""
+    await _pool.close()
+
+
+async def flush_writes():
+    """Navbatdagi user/chat/log yozuvlarini darhol saqlaydi (o‘qishdan oldin yoki testlarda)."""
+    await _pool.queue.flush()
+
+
 ARCHIVE_EXTENSIONS = [".zip", ".rar", ".7z", ".tar", ".gz"]
 
 # Tezkor guruh tekshiruvlari uchun kichik TTL cache.
 # 1000+ foydalanuvchi yozganda har xabar uchun 3-4 marta SQLite ochilishini kamaytiradi.
+# O‘zgarishda faqat tegishli kalit (chat) bekor qilinadi; global o‘zgarish namespace
+# generatsiyasini oshiradi (utils/cache.py).
 _CACHE_TTL = 30
-_settings_cache: dict[int, tuple[float, dict]] = {}
-_bad_words_cache: dict[int | None, tuple[float, list[str]]] = {}
-_unsafe_ext_cache: dict[int | None, tuple[float, list[str]]] = {}
-_whitelist_cache: dict[tuple[int, int], tuple[float, bool]] = {}
-
-def _cache_get(cache: dict, key):
-    item = cache.get(key)
-    if not item:
-        return None
-    ts, value = item
-    if time.monotonic() - ts > _CACHE_TTL:
-        cache.pop(key, None)
-        return None
-    return value
+_CACHE_MAX_BYTES = int(CACHE_MAX_MB * 1024 * 1024)
+_settings_cache = RuntimeCache("settings", _CACHE_TTL, CACHE_MAX_ENTRIES, _CACHE_MAX_BYTES)
+_bad_words_cache = RuntimeCache("bad_words", _CACHE_TTL, CACHE_MAX_ENTRIES, _CACHE_MAX_BYTES)
+_unsafe_ext_cache = RuntimeCache("unsafe_ext", _CACHE_TTL, CACHE_MAX_ENTRIES, _CACHE_MAX_BYTES)
+# Whitelist chat bo‘yicha to‘liq to‘plam sifatida saqlanadi; har o‘zgarish add/remove orqali
+# o‘sha chatni aniq bekor qiladi, shuning uchun TTL uzunroq.
+_WHITELIST_TTL = 10 * 60
+_whitelist_cache = RuntimeCache("whitelist", _WHITELIST_TTL, CACHE_MAX_ENTRIES, _CACHE_MAX_BYTES)
+_RUNTIME_CACHES = (_settings_cache, _bad_words_cache, _unsafe_ext_cache, _whitelist_cache)
+
+
+def _invalidate_scoped(cache: RuntimeCache, chat_id: int | None):
+    """Global ro‘yxat (chat_id=None) hamma chat kalitlariga kiradi, chat ro‘yxati faqat o‘ziga."""
+    if chat_id is None:
+        cache.invalidate_all()
+    else:
+        cache.invalidate(chat_id)
+
+
+def _invalidate_chat_caches(chat_id: int):
+    """Chat o‘chirilganda faqat shu chatga tegishli yozuvlar tozalanadi."""
+    _settings_cache.invalidate(chat_id)
+    _bad_words_cache.invalidate(chat_id)
+    _unsafe_ext_cache.invalidate(chat_id)
+    _whitelist_cache.invalidate(chat_id)
 
-def _cache_set(cache: dict, key, value):
-    cache[key] = (time.monotonic(), value)
-    return value
 
 def clear_runtime_cache():
-    _settings_cache.clear()
-    _bad_words_cache.clear()
-    _unsafe_ext_cache.clear()
-    _whitelist_cache.clear()
+    """Barcha runtime cache'larni to‘liq tozalaydi (qo‘lda tiklash uchun)."""
+    for cache in _RUNTIME_CACHES:
+        cache.clear()
 
 
-async def init_db():
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute("PRAGMA journal_mode=WAL")
-        await db.execute("PRAGMA foreign_keys=ON")
+def sweep_runtime_caches() -> int:
+    """Muddati o‘tgan yozuvlarni fon rejimida tozalash (o‘qilmaydigan kalitlar ham ketadi)."""
+    return sum(cache.sweep() for cache in _RUNTIME_CACHES)
+
+
+def get_runtime_cache_stats() -> list[dict]:
+    return [cache.stats() for cache in _RUNTIME_CACHES]
+
+
+# Har xabarda bir xil user/chat ma'lumotini qayta yozmaslik uchun oxirgi saqlangan
+# qiymatlar izi. Maydon o‘zgarsa yoki METADATA_REFRESH_SECONDS o‘tsa yoziladi.
+# Hajmi cheklangan (LRU), muddati o‘tgan izlar esa supurib tashlanadi.
+_metadata_fingerprints = RuntimeCache("metadata", METADATA_REFRESH_SECONDS, CACHE_MAX_ENTRIES, _CACHE_MAX_BYTES)
+_metadata_stats = {"hits": 0, "misses": 0}
+
+
+def _metadata_changed(kind: str, key_id: int, fingerprint: tuple) -> bool:
+    key = (kind, key_id)
+    if _metadata_fingerprints.get(key, None) == fingerprint:
+        _metadata_stats["hits"] += 1
+        return False
+    _metadata_stats["misses"] += 1
+    # Yozuv bajarilmasa iz _forget_failed_metadata orqali o‘chiriladi — keyingi xabar qayta yozadi.
+    _metadata_fingerprints.set(key, fingerprint)
+    return True
+
+
+def _forget_failed_metadata(queue_keys):
+    """Saqlanmagan user/chat yozuvlari izini o‘chiradi (navbat kalitlari: ("user", id), ("chat_meta", id, ...))."""
+    for key in queue_keys:
+        if key[0] == "user":
+            _metadata_fingerprints.invalidate(("user", key[1]))
+        elif key[0] == "chat_meta":
+            _metadata_fingerprints.invalidate(("chat", key[1]))
 
+
+_pool.queue.on_failed = _forget_failed_metadata
+
+
+def get_metadata_cache_stats() -> dict:
+    """hits — o‘tkazib yuborilgan (tejalgan) yozuvlar, misses — bazaga ketgan yozuvlar."""
+    hits, misses = _metadata_stats["hits"], _metadata_stats["misses"]
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "entries": len(_metadata_fingerprints),
+        "hit_ratio": round(hits / total, 4) if total else 0.0,
+    }
+
+
+async def init_db():
+    async with _pool.write() as db:
         await db.execute("""
         CREATE TABLE IF NOT EXISTS chats (
             chat_id INTEGER PRIMARY KEY,
@@ -54,6 +347,8 @@ async def init_db():
             bot_status TEXT DEFAULT 'unknown',
             member_count INTEGER DEFAULT NULL,
             member_count_updated_at TIMESTAMP,
+            is_reachable INTEGER DEFAULT 1,
+            unreachable_reason TEXT,
             added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
@@ -90,6 +385,17 @@ async def init_db():
                 "ALTER TABLE chats ADD COLUMN member_count_updated_at TIMESTAMP"
             )
 
+        # Bot chiqarilgan yoki o‘chib ketgan chatlar (broadcast, statistika va exportlarda o‘tkazib yuboriladi).
+        if "is_reachable" not in column_names:
+            await db.execute(
+                "ALTER TABLE chats ADD COLUMN is_reachable INTEGER DEFAULT 1"
+            )
+
+        if "unreachable_reason" not in column_names:
+            await db.execute(
+                "ALTER TABLE chats ADD COLUMN unreachable_reason TEXT"
+            )
+
         # Eski bazada member_count ustuni yangi qo‘shilganda hamma chatlarga 0 yozilgan bo‘lishi mumkin.
         # 0 real a'zolar soni emas, "hali olinmagan" degani. Shuning uchun NULL qilib qo‘yamiz.
         await db.execute("""
@@ -105,11 +411,21 @@ async def init_db():
             last_name TEXT,
             username TEXT,
             language_code TEXT,
+            is_reachable INTEGER DEFAULT 1,
+            unreachable_reason TEXT,
             joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
         """)
 
+        # Botni bloklagan yoki o‘chirilgan akkauntlar (broadcast va exportlarda o‘tkazib yuboriladi).
+        cursor = await db.execute("PRAGMA table_info(users)")
+        user_columns = [column[1] for column in await cursor.fetchall()]
+        if "is_reachable" not in user_columns:
+            await db.execute("ALTER TABLE users ADD COLUMN is_reachable INTEGER DEFAULT 1")
+        if "unreachable_reason" not in user_columns:
+            await db.execute("ALTER TABLE users ADD COLUMN unreachable_reason TEXT")
+
         await db.execute("""
         CREATE TABLE IF NOT EXISTS bad_words (
             chat_id INTEGER,
@@ -319,11 +635,16 @@ async def init_db():
             admin_count INTEGER DEFAULT 0,
             member_count INTEGER DEFAULT 0,
             not_member_count INTEGER DEFAULT 0,
+            member_gt_10 INTEGER DEFAULT 0,
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY(link_id) REFERENCES referral_links(id) ON DELETE CASCADE
         )
         """)
 
+        cursor = await db.execute("PRAGMA table_info(referral_stats_cache)")
+        if "member_gt_10" not in [column[1] for column in await cursor.fetchall()]:
+            await db.execute("ALTER TABLE referral_stats_cache ADD COLUMN member_gt_10 INTEGER DEFAULT 0")
+
         await db.execute("CREATE INDEX IF NOT EXISTS idx_chats_updated_at ON chats(updated_at DESC)")
         await db.execute("CREATE INDEX IF NOT EXISTS idx_chats_status ON chats(bot_status)")
         await db.execute("CREATE INDEX IF NOT EXISTS idx_chats_type_admin ON chats(type, is_bot_admin)")
@@ -332,6 +653,8 @@ async def init_db():
         await db.execute("CREATE INDEX IF NOT EXISTS idx_referral_link_chats_link_id ON referral_link_chats(link_id)")
         await db.execute("CREATE INDEX IF NOT EXISTS idx_chats_admin_status ON chats(is_bot_admin, bot_status)")
         await db.execute("CREATE INDEX IF NOT EXISTS idx_chats_member_count ON chats(member_count)")
+        # get_stats_summary shu covering indeks bo‘yicha guruhlaydi (jadval qatorlari o‘qilmaydi).
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_chats_stats ON chats(type, is_bot_admin, bot_status)")
 
         # CRUD/ROLE tizimi. Eski baza o'chmaydi, yangi jadvallar qo'shiladi.
         await db.execute("""
@@ -372,10 +695,82 @@ async def init_db():
         await db.execute("CREATE INDEX IF NOT EXISTS idx_users_updated_at ON users(updated_at DESC)")
         await db.execute("CREATE INDEX IF NOT EXISTS idx_chats_updated_at ON chats(updated_at DESC)")
         await db.execute("CREATE INDEX IF NOT EXISTS idx_security_logs_id ON security_logs(id DESC)")
+        # Kursorli sahifalash (updated_at, id) bo‘yicha tartiblaydi — qo‘shimcha saralashsiz.
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_chats_updated_page ON chats(updated_at, chat_id)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_users_updated_page ON users(updated_at, user_id)")
+        # Broadcast qabul qiluvchilari, statistika va exportlar faqat yetib boradigan qatorlarni o‘qiydi.
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_chats_reachable ON chats(is_reachable, updated_at)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_users_reachable ON users(is_reachable, updated_at)")
         await db.execute("CREATE INDEX IF NOT EXISTS idx_bad_words_chat_word ON bad_words(chat_id, word)")
         await db.execute("CREATE INDEX IF NOT EXISTS idx_unsafe_extensions_chat_ext ON unsafe_extensions(chat_id, ext)")
         await db.execute("CREATE INDEX IF NOT EXISTS idx_whitelist_chat_user ON whitelist(chat_id, user_id)")
 
+        # Umumiy statistika triggerlar bilan real vaqtda saqlanadi; startda bir marta solishtiriladi.
+        await _create_stats_triggers(db)
+        await _create_referral_stats_triggers(db)
+        await _rebuild_referral_stats(db)
+        actual = await _compute_stats_summary(db)
+        mismatches = _stats_mismatches(await _read_stats_cache(db), actual)
+        if mismatches:
+            await _write_stats_cache(db, actual)
+            logger.info("stats_cache qayta hisoblandi: %s", mismatches)
+
+        # Kechiktirib o‘chiriladigan bot xabarlari (ogohlantirish va h.k.): restartdan keyin ham o‘chiriladi.
+        await db.execute("""
+        CREATE TABLE IF NOT EXISTS pending_deletions (
+            chat_id INTEGER NOT NULL,
+            message_id INTEGER NOT NULL,
+            due_at REAL NOT NULL,
+            PRIMARY KEY(chat_id, message_id)
+        )
+        """)
+
+        # Ommaviy xabar: vazifa va har bir qabul qiluvchi holati bazada — restartdan keyin davom etadi.
+        await db.execute("""
+        CREATE TABLE IF NOT EXISTS broadcast_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_by INTEGER,
+            target TEXT NOT NULL,
+            source_chat_id INTEGER NOT NULL,
+            source_message_id INTEGER NOT NULL,
+            progress_chat_id INTEGER,
+            progress_message_id INTEGER,
+            status TEXT NOT NULL DEFAULT 'running',
+            total INTEGER DEFAULT 0,
+            sent INTEGER DEFAULT 0,
+            failed INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            finished_at TIMESTAMP
+        )
+        """)
+        await db.execute("""
+        CREATE TABLE IF NOT EXISTS broadcast_recipients (
+            job_id INTEGER NOT NULL,
+            chat_id INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            error TEXT,
+            PRIMARY KEY(job_id, chat_id)
+        ) WITHOUT ROWID
+        """)
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_broadcast_recipients_status ON broadcast_recipients(job_id, status, chat_id)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_broadcast_jobs_status ON broadcast_jobs(status)")
+
+        # Tayyor export fayllari: kalit — export turi + ma'lumot versiyasi, file_id qayta yuborish uchun.
+        await db.execute("""
+        CREATE TABLE IF NOT EXISTS export_files (
+            cache_key TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            path TEXT NOT NULL,
+            file_id TEXT,
+            size INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            used_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_export_files_kind ON export_files(kind)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_export_files_used ON export_files(used_at)")
+
         await db.commit()
 
 
@@ -392,11 +787,13 @@ async def add_or_update_chat(
 
     Muhim: is_admin=None bo'lsa bazadagi admin status o'zgarmaydi.
     Bu umumiy message handler har bir xabarda admin statusni 0 qilib yubormasligi uchun kerak.
+    Yozuv write-behind navbati orqali guruhlab saqlanadi.
     """
     title = title or "Noma’lum"
-    async with aiosqlite.connect(DB_PATH) as db:
-        if is_admin is None:
-            await db.execute("""
+    if is_admin is None:
+        if not _metadata_changed("chat", chat_id, (title, chat_type, invite_link, bot_status)):
+            return
+        _pool.queue.submit(("chat_meta", chat_id, bot_status is not None), """
             INSERT INTO chats (chat_id, title, type, invite_link, bot_status)
             VALUES (?, ?, ?, ?, COALESCE(?, 'unknown'))
             ON CONFLICT(chat_id) DO UPDATE SET
@@ -406,79 +803,231 @@ async def add_or_update_chat(
                 bot_status=COALESCE(?, chats.bot_status),
                 updated_at=CURRENT_TIMESTAMP
             """, (chat_id, title, chat_type, invite_link, bot_status, bot_status))
-        else:
-            is_admin = 1 if int(is_admin) == 1 else 0
-            bot_status = bot_status or ("administrator" if is_admin else "member")
-            await db.execute("""
-            INSERT INTO chats (chat_id, title, type, invite_link, is_bot_admin, bot_status)
-            VALUES (?, ?, ?, ?, ?, ?)
+    else:
+        is_admin = 1 if int(is_admin) == 1 else 0
+        bot_status = bot_status or ("administrator" if is_admin else "member")
+        _metadata_fingerprints.invalidate(("chat", chat_id))
+        # Aniq status kelganda (my_chat_member, /start) yetib borish belgisi ham shunga moslanadi.
+        _pool.queue.submit(("chat_admin", chat_id), """
+            INSERT INTO chats (chat_id, title, type, invite_link, is_bot_admin, bot_status, is_reachable, unreachable_reason)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             ON CONFLICT(chat_id) DO UPDATE SET
                 title=excluded.title,
                 type=excluded.type,
                 invite_link=COALESCE(excluded.invite_link, chats.invite_link),
                 is_bot_admin=excluded.is_bot_admin,
                 bot_status=excluded.bot_status,
+                is_reachable=excluded.is_reachable,
+                unreachable_reason=excluded.unreachable_reason,
                 updated_at=CURRENT_TIMESTAMP
-            """, (chat_id, title, chat_type, invite_link, is_admin, bot_status))
-        await db.commit()
+            """, (
+            chat_id, title, chat_type, invite_link, is_admin, bot_status,
+            0 if bot_status in INACTIVE_BOT_STATUSES else 1,
+            bot_status if bot_status in INACTIVE_BOT_STATUSES else None,
+        ))
 
 
 async def update_chat_bot_status(chat_id: int, is_admin: int, bot_status: str):
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute("""
-            UPDATE chats
-            SET is_bot_admin=?, bot_status=?, updated_at=CURRENT_TIMESTAMP
-            WHERE chat_id=?
-        """, (1 if is_admin else 0, bot_status, chat_id))
-        await db.commit()
+    """Statusni yozadi; ``unknown`` (tarmoq xatosi) yetib borish belgisini o‘zgartirmaydi."""
+    if bot_status == "unknown":
+        reachable, reason = None, None
+    elif bot_status in INACTIVE_BOT_STATUSES:
+        reachable, reason = 0, bot_status
+    else:
+        reachable, reason = 1, None
+    _pool.queue.submit(("chat_status", chat_id), """
+        UPDATE chats
+        SET is_bot_admin=?, bot_status=?,
+            is_reachable=COALESCE(?, is_reachable),
+            unreachable_reason=CASE WHEN ? IS NULL THEN unreachable_reason ELSE ? END,
+            updated_at=CURRENT_TIMESTAMP
+        WHERE chat_id=?
+    """, (1 if is_admin else 0, bot_status, reachable, reachable, reason, chat_id))
+
+
+async def set_user_reachable(user_id: int, reachable: bool, reason: str | None = None):
+    """Foydalanuvchi botni bloklaganda (my_chat_member: kicked) yoki qayta yozganda."""
+    if reachable:
+        # Odatda qator allaqachon yetib boradigan — WHERE tufayli yozuv bo‘lmaydi.
+        _pool.queue.submit(("user_reach", user_id), """
+            UPDATE users SET is_reachable=1, unreachable_reason=NULL WHERE user_id=? AND is_reachable=0
+        """, (user_id,))
+    else:
+        _pool.queue.submit(("user_reach", user_id), """
+            UPDATE users SET is_reachable=0, unreachable_reason=? WHERE user_id=?
+        """, (reason, user_id))
+
+INACTIVE_BOT_STATUSES = ("not_member", "left", "kicked")
+STATS_KEYS = (
+    "chats_count", "member_chats", "bot_admin_chats", "not_member_chats",
+    "groups_count", "channels_count", "group_member_chats", "channel_member_chats",
+    "group_admin_chats", "channel_admin_chats", "users_count", "unsafe_ext_count",
+    "bad_words_count",
+)
+
+
+# stats_cache hisoblagichlari: chats qatori qaysi hisoblagichga kirishi ({r} — NEW yoki OLD).
+# Triggerlar ham, _compute_stats_summary ham aynan shu qoidalarga tayanadi.
+_CHAT_STAT_PREDICATES = {
+    "chats_count": "1",
+    "member_chats": "NOT ({inactive})",
+    "bot_admin_chats": "{r}.is_bot_admin = 1",
+    "not_member_chats": "{inactive}",
+    "groups_count": "{group}",
+    "channels_count": "{channel}",
+    "group_member_chats": "{group} AND NOT ({inactive})",
+    "channel_member_chats": "{channel} AND NOT ({inactive})",
+    "group_admin_chats": "{group} AND {r}.is_bot_admin = 1",
+    "channel_admin_chats": "{channel} AND {r}.is_bot_admin = 1",
+}
+
+
+def _row_flag(template: str, r: str) -> str:
+    predicate = template.format(
+        r=r,
+        inactive=f"COALESCE({r}.bot_status, 'unknown') IN ('not_member', 'left', 'kicked')",
+        group=f"{r}.type IN ('group', 'supergroup')",
+        channel=f"{r}.type = 'channel'",
+    )
+    return f"(CASE WHEN {predicate} THEN 1 ELSE 0 END)"
+
+
+def _chat_stat_flag(key: str, r: str) -> str:
+    return _row_flag(_CHAT_STAT_PREDICATES[key], r)
+
+
+def _stats_trigger_statements() -> list[str]:
+    """stats_cache ni har INSERT/UPDATE/DELETE da aniq saqlovchi triggerlar."""
+    keys = list(_CHAT_STAT_PREDICATES)
+    chat_insert = ", ".join(f"{k} = {k} + {_chat_stat_flag(k, 'NEW')}" for k in keys)
+    chat_delete = ", ".join(f"{k} = {k} - {_chat_stat_flag(k, 'OLD')}" for k in keys)
+    chat_update = ", ".join(f"{k} = {k} + {_chat_stat_flag(k, 'NEW')} - {_chat_stat_flag(k, 'OLD')}" for k in keys)
+    statements = [
+        f"""CREATE TRIGGER trg_stats_chats_insert AFTER INSERT ON chats BEGIN
+            UPDATE stats_cache SET {chat_insert} WHERE id=1;
+        END""",
+        f"""CREATE TRIGGER trg_stats_chats_delete AFTER DELETE ON chats BEGIN
+            UPDATE stats_cache SET {chat_delete} WHERE id=1;
+        END""",
+        # Faqat hisoblagichga ta'sir qiladigan ustunlar haqiqatan o‘zgarganda (oddiy upsertda emas).
+        f"""CREATE TRIGGER trg_stats_chats_update AFTER UPDATE OF type, is_bot_admin, bot_status ON chats
+        WHEN OLD.type IS NOT NEW.type OR OLD.is_bot_admin IS NOT NEW.is_bot_admin OR OLD.bot_status IS NOT NEW.bot_status
+        BEGIN
+            UPDATE stats_cache SET {chat_update} WHERE id=1;
+        END""",
+        """CREATE TRIGGER trg_stats_users_insert AFTER INSERT ON users BEGIN
+            UPDATE stats_cache SET users_count = users_count + 1 WHERE id=1;
+        END""",
+        """CREATE TRIGGER trg_stats_users_delete AFTER DELETE ON users BEGIN
+            UPDATE stats_cache SET users_count = users_count - 1 WHERE id=1;
+        END""",
+    ]
+    # Faqat global (chat_id IS NULL) kengaytma va so‘zlar sanaladi.
+    for table, column in (("unsafe_extensions", "unsafe_ext_count"), ("bad_words", "bad_words_count")):
+        statements += [
+            f"""CREATE TRIGGER trg_stats_{table}_insert AFTER INSERT ON {table} WHEN NEW.chat_id IS NULL BEGIN
+                UPDATE stats_cache SET {column} = {column} + 1 WHERE id=1;
+            END""",
+            f"""CREATE TRIGGER trg_stats_{table}_delete AFTER DELETE ON {table} WHEN OLD.chat_id IS NULL BEGIN
+                UPDATE stats_cache SET {column} = {column} - 1 WHERE id=1;
+            END""",
+            f"""CREATE TRIGGER trg_stats_{table}_update AFTER UPDATE OF chat_id ON {table} BEGIN
+                UPDATE stats_cache SET {column} = {column} + (NEW.chat_id IS NULL) - (OLD.chat_id IS NULL) WHERE id=1;
+            END""",
+        ]
+    return statements
+
+
+async def _create_stats_triggers(db: aiosqlite.Connection):
+    # Har startda qayta yaratiladi: qoidalar o‘zgarsa eski trigger qolib ketmaydi.
+    cursor = await db.execute("SELECT name FROM sqlite_master WHERE type='trigger' AND name LIKE 'trg_stats_%'")
+    for (name,) in await cursor.fetchall():
+        await db.execute(f"DROP TRIGGER IF EXISTS {name}")
+    for statement in _stats_trigger_statements():
+        await db.execute(statement)
+
+
+async def _compute_stats_summary(db: aiosqlite.Connection) -> dict:
+    """Hisoblagichlarni jadvallardan to‘liq hisoblaydi (chats — idx_chats_stats bo‘yicha guruhlab)."""
+    stats = dict.fromkeys(STATS_KEYS, 0)
+    cursor = await db.execute("""
+        SELECT type, is_bot_admin, bot_status, COUNT(*)
+        FROM chats
+        GROUP BY type, is_bot_admin, bot_status
+    """)
+    for chat_type, is_bot_admin, bot_status, total in await cursor.fetchall():
+        is_group = chat_type in ("group", "supergroup")
+        is_channel = chat_type == "channel"
+        is_admin = is_bot_admin == 1
+        inactive = (bot_status or "unknown") in INACTIVE_BOT_STATUSES
+        stats["chats_count"] += total
+        stats["bot_admin_chats"] += total if is_admin else 0
+        stats["not_member_chats" if inactive else "member_chats"] += total
+        stats["groups_count"] += total if is_group else 0
+        stats["channels_count"] += total if is_channel else 0
+        stats["group_member_chats"] += total if is_group and not inactive else 0
+        stats["channel_member_chats"] += total if is_channel and not inactive else 0
+        stats["group_admin_chats"] += total if is_group and is_admin else 0
+        stats["channel_admin_chats"] += total if is_channel and is_admin else 0
+
+    cursor = await db.execute("""
+        SELECT
+            (SELECT COUNT(*) FROM users),
+            (SELECT COUNT(*) FROM unsafe_extensions WHERE chat_id IS NULL),
+            (SELECT COUNT(*) FROM bad_words WHERE chat_id IS NULL)
+    """)
+    stats["users_count"], stats["unsafe_ext_count"], stats["bad_words_count"] = await cursor.fetchone()
+    return stats
+
+
+async def _read_stats_cache(db: aiosqlite.Connection) -> dict | None:
+    cursor = await db.execute(f"SELECT {', '.join(STATS_KEYS)}, updated_at FROM stats_cache WHERE id=1")
+    row = await cursor.fetchone()
+    return dict(zip(STATS_KEYS + ("updated_at",), row)) if row else None
+
+
+def _stats_mismatches(cached: dict | None, actual: dict) -> dict:
+    cached = cached or {}
+    return {key: (cached.get(key), actual[key]) for key in STATS_KEYS if cached.get(key) != actual[key]}
+
 
 async def get_stats_summary():
-    async with aiosqlite.connect(DB_PATH) as db:
-        async def fetch_count(sql: str, params: tuple = ()) -> int:
-            cursor = await db.execute(sql, params)
-            row = await cursor.fetchone()
-            return int(row[0] or 0)
-
-        inactive_statuses = ("not_member", "left", "kicked")
-        inactive_sql = "COALESCE(bot_status, 'unknown') IN ('not_member', 'left', 'kicked')"
-        active_sql = f"NOT ({inactive_sql})"
-
-        chats_count = await fetch_count("SELECT COUNT(*) FROM chats")
-        bot_admin_chats = await fetch_count("SELECT COUNT(*) FROM chats WHERE is_bot_admin=1")
-        not_member_chats = await fetch_count(f"SELECT COUNT(*) FROM chats WHERE {inactive_sql}")
-        member_chats = await fetch_count(f"SELECT COUNT(*) FROM chats WHERE {active_sql}")
-
-        groups_count = await fetch_count("SELECT COUNT(*) FROM chats WHERE type IN ('group', 'supergroup')")
-        channels_count = await fetch_count("SELECT COUNT(*) FROM chats WHERE type='channel'")
-        group_member_chats = await fetch_count(f"SELECT COUNT(*) FROM chats WHERE type IN ('group', 'supergroup') AND {active_sql}")
-        channel_member_chats = await fetch_count(f"SELECT COUNT(*) FROM chats WHERE type='channel' AND {active_sql}")
-        group_admin_chats = await fetch_count("SELECT COUNT(*) FROM chats WHERE type IN ('group', 'supergroup') AND is_bot_admin=1")
-        channel_admin_chats = await fetch_count("SELECT COUNT(*) FROM chats WHERE type='channel' AND is_bot_admin=1")
-
-        users_count = await fetch_count("SELECT COUNT(*) FROM users")
-        unsafe_ext_count = await fetch_count("SELECT COUNT(*) FROM unsafe_extensions WHERE chat_id IS NULL")
-        bad_words_count = await fetch_count("SELECT COUNT(*) FROM bad_words WHERE chat_id IS NULL")
-
-        return {
-            "chats_count": chats_count,
-            "member_chats": member_chats,
-            "bot_admin_chats": bot_admin_chats,
-            "not_member_chats": not_member_chats,
-            "groups_count": groups_count,
-            "channels_count": channels_count,
-            "group_member_chats": group_member_chats,
-            "channel_member_chats": channel_member_chats,
-            "group_admin_chats": group_admin_chats,
-            "channel_admin_chats": channel_admin_chats,
-            "users_count": users_count,
-            "unsafe_ext_count": unsafe_ext_count,
-            "bad_words_count": bad_words_count,
-        }
+    """Barcha hisoblagichlarni jadvallardan hisoblaydi (panel esa get_stats_summary_cached dan o‘qiydi)."""
+    async with _pool.read() as db:
+        return await _compute_stats_summary(db)
+
+
+async def reconcile_stats_cache() -> dict:
+    """stats_cache ni jadvallardan qayta hisoblab yozadi; topilgan farqlarni qaytaradi.
+
+    Yozuvchi lock ostida bajariladi, shuning uchun hisoblash va yozish orasida triggerlar ishlamaydi.
+    """
+    async with _pool.write() as db:
+        actual = await _compute_stats_summary(db)
+        mismatches = _stats_mismatches(await _read_stats_cache(db), actual)
+        await _write_stats_cache(db, actual)
+        await db.commit()
+    if mismatches:
+        logger.warning("stats_cache tuzatildi: %s", mismatches)
+    return mismatches
+
+
+async def check_stats_cache() -> dict:
+    """Trigger hisoblagichlarini to‘liq hisob bilan solishtiradi (bazaga yozmaydi)."""
+    async with _pool.read() as db:
+        # Ikkala o‘qish bitta WAL snapshotida bo‘lishi uchun tranzaksiya ichida.
+        await db.execute("BEGIN")
+        try:
+            cached = await _read_stats_cache(db)
+            actual = await _compute_stats_summary(db)
+        finally:
+            await db.execute("COMMIT")
+    return _stats_mismatches(cached, actual)
 
 
 async def delete_chat(chat_id: int) -> bool:
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute("PRAGMA foreign_keys=ON")
+    _metadata_fingerprints.invalidate(("chat", chat_id))
+    async with _pool.write() as db:
         await db.execute("DELETE FROM referral_link_chats WHERE chat_id=?", (chat_id,))
         await db.execute("DELETE FROM bad_words WHERE chat_id=?", (chat_id,))
         await db.execute("DELETE FROM settings WHERE chat_id=?", (chat_id,))
@@ -487,14 +1036,18 @@ async def delete_chat(chat_id: int) -> bool:
         await db.execute("DELETE FROM warnings WHERE chat_id=?", (chat_id,))
         cur = await db.execute("DELETE FROM chats WHERE chat_id=?", (chat_id,))
         await db.commit()
+        _bump_bad_words_version(chat_id)
+        _invalidate_chat_caches(chat_id)
         return cur.rowcount > 0
 
 
-async def get_all_chats(limit: int | None = None, offset: int = 0):
-    async with aiosqlite.connect(DB_PATH) as db:
-        sql = """
+async def get_all_chats(limit: int | None = None, offset: int = 0, reachable_only: bool = False):
+    """``reachable_only`` — bot chiqarilgan/o‘chib ketgan chatlarsiz (idx_chats_reachable)."""
+    async with _pool.read() as db:
+        sql = f"""
             SELECT chat_id, title, type, invite_link, is_bot_admin, COALESCE(bot_status, 'unknown')
             FROM chats
+            {"WHERE is_reachable=1" if reachable_only else ""}
             ORDER BY updated_at DESC
         """
         params: tuple = ()
@@ -505,17 +1058,86 @@ async def get_all_chats(limit: int | None = None, offset: int = 0):
         return await cursor.fetchall()
 
 
-async def get_chat_count():
-    async with aiosqlite.connect(DB_PATH) as db:
-        cursor = await db.execute("SELECT COUNT(*) FROM chats")
+async def _keyset_page(select_sql: str, keys: list[tuple[str, str]], limit: int, cursor: tuple | None, backward: bool):
+    """Kursor bo‘yicha sahifa: ``keys`` — (ustun, parametr ifodasi), kamayish tartibida.
+
+    OFFSET o‘rniga ``(k1, k2) < (?, ?)`` sharti indeksdan to‘g‘ridan-to‘g‘ri o‘qiladi.
+    ``backward`` bo‘lsa kursordan oldingi qatorlar olinadi va qaytadan teskari tartiblanadi.
+    Qaytaradi: ``(rows, has_more)`` — shu yo‘nalishda yana qator bormi.
+    """
+    columns = ", ".join(column for column, _ in keys)
+    direction = "ASC" if backward else "DESC"
+    sql = select_sql
+    params: tuple = ()
+    if cursor is not None:
+        placeholders = ", ".join(placeholder for _, placeholder in keys)
+        sql += f" WHERE ({columns}) {'>' if backward else '<'} ({placeholders})"
+        params = tuple(cursor)
+    sql += " ORDER BY " + ", ".join(f"{column} {direction}" for column, _ in keys) + " LIMIT ?"
+    async with _pool.read() as db:
+        result = await db.execute(sql, params + (int(limit) + 1,))
+        rows = await result.fetchall()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if backward:
+        rows.reverse()
+    return rows, has_more
+
+
+_CHAT_PAGE_KEYS = [("updated_at", "datetime(?, 'unixepoch')"), ("chat_id", "?")]
+
+
+async def get_chats_page(limit: int, cursor: tuple[int, int] | None = None, backward: bool = False):
+    """get_all_chats ustunlari + kursor kaliti ``updated_ts``, ``member_count``, ``member_count_ts``.
+
+    Vaqtlar unix soniyada; ``member_count_ts`` None bo‘lsa son hali olinmagan.
+    Kursor — ``(updated_ts, chat_id)``; keyingi sahifa uchun oxirgi, oldingisi uchun birinchi qator.
+    """
+    return await _keyset_page("""
+        SELECT chat_id, title, type, invite_link, is_bot_admin, COALESCE(bot_status, 'unknown'),
+               CAST(strftime('%s', updated_at) AS INTEGER),
+               member_count, CAST(strftime('%s', member_count_updated_at) AS INTEGER)
+        FROM chats
+    """, _CHAT_PAGE_KEYS, limit, cursor, backward)
+
+
+async def get_chat_count(reachable_only: bool = False):
+    async with _pool.read() as db:
+        cursor = await db.execute(f"SELECT COUNT(*) FROM chats {'WHERE is_reachable=1' if reachable_only else ''}")
         return (await cursor.fetchone())[0]
 
 
+async def _stream_rows(sql: str, params: tuple, chunk_size: int):
+    """SELECT natijasini ``chunk_size`` tadan qaytaruvchi async generator (butun ro‘yxat xotiraga olinmaydi)."""
+    async with _pool.stream() as db:
+        cursor = await db.execute(sql, params)
+        try:
+            while True:
+                rows = await cursor.fetchmany(int(chunk_size))
+                if not rows:
+                    return
+                yield rows
+        finally:
+            await cursor.close()
+
+
+def iter_chats(chunk_size: int, reachable_only: bool = False):
+    """get_all_chats ustunlari, partiyalab (export uchun)."""
+    return _stream_rows(f"""
+        SELECT chat_id, title, type, invite_link, is_bot_admin, COALESCE(bot_status, 'unknown')
+        FROM chats
+        {"WHERE is_reachable=1" if reachable_only else ""}
+        ORDER BY updated_at DESC
+    """, (), chunk_size)
+
+
 async def add_or_update_user(user):
     if not user:
         return
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute("""
+    fingerprint = (user.first_name or "", user.last_name or "", user.username or "", getattr(user, "language_code", None))
+    if not _metadata_changed("user", user.id, fingerprint):
+        return
+    _pool.queue.submit(("user", user.id), """
         INSERT INTO users (user_id, first_name, last_name, username, language_code)
         VALUES (?, ?, ?, ?, ?)
         ON CONFLICT(user_id) DO UPDATE SET
@@ -525,20 +1147,21 @@ async def add_or_update_user(user):
             language_code=excluded.language_code,
             updated_at=CURRENT_TIMESTAMP
         """, (
-            user.id,
-            user.first_name or "",
-            user.last_name or "",
-            user.username or "",
-            getattr(user, "language_code", None)
-        ))
-        await db.commit()
-
-
-async def get_all_users(limit: int | None = None, offset: int = 0):
-    async with aiosqlite.connect(DB_PATH) as db:
-        sql = """
+        user.id,
+        user.first_name or "",
+        user.last_name or "",
+        user.username or "",
+        getattr(user, "language_code", None)
+    ))
+
+
+async def get_all_users(limit: int | None = None, offset: int = 0, reachable_only: bool = False):
+    """``reachable_only`` — botni bloklagan/o‘chirilgan akkauntlarsiz (idx_users_reachable)."""
+    async with _pool.read() as db:
+        sql = f"""
             SELECT user_id, first_name, last_name, username, language_code, joined_at
             FROM users
+            {"WHERE is_reachable=1" if reachable_only else ""}
             ORDER BY updated_at DESC
         """
         params: tuple = ()
@@ -549,14 +1172,33 @@ async def get_all_users(limit: int | None = None, offset: int = 0):
         return await cursor.fetchall()
 
 
-async def get_user_count() -> int:
-    async with aiosqlite.connect(DB_PATH) as db:
-        cursor = await db.execute("SELECT COUNT(*) FROM users")
+async def get_users_page(limit: int, cursor: tuple[int, int] | None = None, backward: bool = False):
+    """get_all_users ustunlari + ``updated_ts``; kursor — ``(updated_ts, user_id)``."""
+    return await _keyset_page("""
+        SELECT user_id, first_name, last_name, username, language_code, joined_at,
+               CAST(strftime('%s', updated_at) AS INTEGER)
+        FROM users
+    """, [("updated_at", "datetime(?, 'unixepoch')"), ("user_id", "?")], limit, cursor, backward)
+
+
+async def get_user_count(reachable_only: bool = False) -> int:
+    async with _pool.read() as db:
+        cursor = await db.execute(f"SELECT COUNT(*) FROM users {'WHERE is_reachable=1' if reachable_only else ''}")
         return (await cursor.fetchone())[0]
 
 
+def iter_users(chunk_size: int, reachable_only: bool = False):
+    """get_all_users ustunlari, partiyalab (export uchun)."""
+    return _stream_rows(f"""
+        SELECT user_id, first_name, last_name, username, language_code, joined_at
+        FROM users
+        {"WHERE is_reachable=1" if reachable_only else ""}
+        ORDER BY updated_at DESC
+    """, (), chunk_size)
+
+
 async def get_user_by_id(user_id: int):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.read() as db:
         cursor = await db.execute("""
             SELECT user_id, first_name, last_name, username, language_code, joined_at
             FROM users WHERE user_id=?
@@ -564,37 +1206,53 @@ async def get_user_by_id(user_id: int):
         return await cursor.fetchone()
 
 
+# bad_words jadvali o‘zgarganda oshadigan versiyalar (None kaliti — global ro‘yxat).
+# Kompilyatsiya qilingan so‘z avtomatlari shu versiya bo‘yicha eskiradi.
+_bad_words_versions: dict[int | None, int] = {}
+
+
+def get_bad_words_version(chat_id: int | None = None) -> int:
+    return _bad_words_versions.get(chat_id, 0)
+
+
+def _bump_bad_words_version(chat_id: int | None):
+    _bad_words_versions[chat_id] = _bad_words_versions.get(chat_id, 0) + 1
+
+
 async def add_bad_word(word: str, chat_id: int | None = None) -> bool:
     word = (word or "").strip().lower()
     if not word:
         return False
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.write() as db:
         cur = await db.execute(
             "INSERT OR IGNORE INTO bad_words (chat_id, word) VALUES (?, ?)",
             (chat_id, word)
         )
         await db.commit()
-        clear_runtime_cache()
+        _invalidate_scoped(_bad_words_cache, chat_id)
+        _bump_bad_words_version(chat_id)
         return cur.rowcount > 0
 
 
 async def remove_bad_word(word: str, chat_id: int | None = None) -> bool:
     word = (word or "").strip().lower()
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.write() as db:
         if chat_id is None:
             cur = await db.execute("DELETE FROM bad_words WHERE word=? AND chat_id IS NULL", (word,))
         else:
             cur = await db.execute("DELETE FROM bad_words WHERE word=? AND chat_id=?", (word, chat_id))
         await db.commit()
-        clear_runtime_cache()
+        _invalidate_scoped(_bad_words_cache, chat_id)
+        _bump_bad_words_version(chat_id)
         return cur.rowcount > 0
 
 
 async def list_bad_words(chat_id: int | None = None):
-    cached = _cache_get(_bad_words_cache, chat_id)
-    if cached is not None:
-        return cached
-    async with aiosqlite.connect(DB_PATH) as db:
+    return await _bad_words_cache.get_or_load(chat_id, lambda: _load_bad_words(chat_id))
+
+
+async def _load_bad_words(chat_id: int | None) -> list[str]:
+    async with _pool.read() as db:
         if chat_id is None:
             cursor = await db.execute("SELECT word FROM bad_words WHERE chat_id IS NULL ORDER BY word")
         else:
@@ -605,10 +1263,29 @@ async def list_bad_words(chat_id: int | None = None):
                 ORDER BY word
             """, (chat_id,))
         rows = await cursor.fetchall()
-        return _cache_set(_bad_words_cache, chat_id, [r[0] for r in rows])
+        return [r[0] for r in rows]
+
+
+async def list_chat_bad_words(chat_id: int) -> list[str]:
+    """Faqat shu chatga qo‘shilgan so‘zlar (global ro‘yxatsiz)."""
+    async with _pool.read() as db:
+        cursor = await db.execute("SELECT word FROM bad_words WHERE chat_id=? ORDER BY word", (chat_id,))
+        return [r[0] for r in await cursor.fetchall()]
+
+
+SETTING_KEYS = ("mute_minutes", "max_warnings", "max_file_mb", "delete_service_messages", "block_archives")
+DEFAULT_SETTINGS = {
+    "mute_minutes": 10,
+    "max_warnings": 3,
+    "max_file_mb": 20,
+    "delete_service_messages": False,
+    "block_archives": False,
+}
 
 
 async def _settings_row_to_dict(row):
+    if row is None:
+        return dict(DEFAULT_SETTINGS)
     return {
         "mute_minutes": row[0],
         "max_warnings": row[1],
@@ -618,38 +1295,50 @@ async def _settings_row_to_dict(row):
     }
 
 
-async def get_global_settings():
-    """chat_id=0 umumiy sozlamalar sifatida ishlatiladi."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute("INSERT OR IGNORE INTO settings (chat_id) VALUES (0)")
-        await db.commit()
+async def _load_settings_snapshot(chat_id: int) -> dict:
+    """Chat sozlamasini faqat o‘qish orqali oladi.
+
+    Chat uchun qator bo‘lmasa umumiy (chat_id=0) sozlama, u ham bo‘lmasa default qaytadi.
+    Qator o‘qishda yaratilmaydi — birinchi o‘zgartirishda (_ensure_settings_row) yaratiladi.
+    """
+    async with _pool.read() as db:
         cursor = await db.execute("""
             SELECT mute_minutes, max_warnings, max_file_mb, delete_service_messages, block_archives
-            FROM settings WHERE chat_id=0
-        """)
+            FROM settings
+            WHERE chat_id IN (?, 0)
+            ORDER BY chat_id = 0
+            LIMIT 1
+        """, (chat_id,))
         row = await cursor.fetchone()
-        return _cache_set(_settings_cache, 0, await _settings_row_to_dict(row))
+    return await _settings_row_to_dict(row)
 
 
-async def get_settings(chat_id: int):
-    cached = _cache_get(_settings_cache, chat_id)
-    if cached is not None:
-        return cached
-    async with aiosqlite.connect(DB_PATH) as db:
-        # Yangi guruhlar uchun default qiymatlar umumiy sozlamadan olinadi.
-        await db.execute("INSERT OR IGNORE INTO settings (chat_id) VALUES (0)")
+async def _ensure_settings_row(db, chat_id: int):
+    """Yozishdan oldin chat qatorini umumiy sozlamadan nusxa qilib yaratadi (yozuvchi ulanishda)."""
+    await db.execute("INSERT OR IGNORE INTO settings (chat_id) VALUES (0)")
+    if chat_id != 0:
         await db.execute("""
             INSERT OR IGNORE INTO settings (chat_id, mute_minutes, max_warnings, max_file_mb, delete_service_messages, block_archives)
             SELECT ?, mute_minutes, max_warnings, max_file_mb, delete_service_messages, block_archives
             FROM settings WHERE chat_id=0
         """, (chat_id,))
-        await db.commit()
-        cursor = await db.execute("""
-            SELECT mute_minutes, max_warnings, max_file_mb, delete_service_messages, block_archives
-            FROM settings WHERE chat_id=?
-        """, (chat_id,))
-        row = await cursor.fetchone()
-        return await _settings_row_to_dict(row)
+
+
+def _invalidate_settings(chat_id: int | None = None):
+    """chat_id=None yoki 0 — umumiy sozlama o‘zgargan, qatorisiz chatlar ham unga bog‘liq."""
+    if chat_id is None or chat_id == 0:
+        _settings_cache.invalidate_all()
+    else:
+        _settings_cache.invalidate(chat_id)
+
+
+async def get_global_settings():
+    """chat_id=0 umumiy sozlamalar sifatida ishlatiladi."""
+    return await get_settings(0)
+
+
+async def get_settings(chat_id: int):
+    return await _settings_cache.get_or_load(chat_id, lambda: _load_settings_snapshot(chat_id))
 
 
 async def get_mute_minutes(chat_id: int | None) -> int:
@@ -659,96 +1348,87 @@ async def get_mute_minutes(chat_id: int | None) -> int:
 
 
 async def set_mute_minutes(chat_id: int, minutes: int) -> bool:
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.write() as db:
+        await _ensure_settings_row(db, chat_id)
         await db.execute("""
-            INSERT INTO settings (chat_id, mute_minutes)
-            VALUES (?, ?)
-            ON CONFLICT(chat_id) DO UPDATE SET
-                mute_minutes=excluded.mute_minutes,
-                updated_at=CURRENT_TIMESTAMP
-        """, (chat_id, minutes))
+            UPDATE settings
+            SET mute_minutes=?, updated_at=CURRENT_TIMESTAMP
+            WHERE chat_id=?
+        """, (minutes, chat_id))
         await db.commit()
-        clear_runtime_cache()
+        _invalidate_settings(chat_id)
         return True
 
 
 async def update_setting(chat_id: int, key: str, value: int):
-    allowed = {"mute_minutes", "max_warnings", "max_file_mb", "delete_service_messages", "block_archives"}
-    if key not in allowed:
+    if key not in SETTING_KEYS:
         raise ValueError("Noto‘g‘ri sozlama nomi")
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute("INSERT OR IGNORE INTO settings (chat_id) VALUES (?)", (chat_id,))
+    async with _pool.write() as db:
+        await _ensure_settings_row(db, chat_id)
         await db.execute(f"UPDATE settings SET {key}=?, updated_at=CURRENT_TIMESTAMP WHERE chat_id=?", (value, chat_id))
         await db.commit()
-        clear_runtime_cache()
+        _invalidate_settings(chat_id)
 
 
 async def update_setting_for_all_chats(key: str, value: int) -> int:
     """Umumiy defaultni va bazadagi barcha guruh/kanal sozlamalarini yangilaydi."""
-    allowed = {"mute_minutes", "max_warnings", "max_file_mb", "delete_service_messages", "block_archives"}
-    if key not in allowed:
+    if key not in SETTING_KEYS:
         raise ValueError("Noto‘g‘ri sozlama nomi")
 
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.write() as db:
         await db.execute("INSERT OR IGNORE INTO settings (chat_id) VALUES (0)")
-        cursor = await db.execute("SELECT chat_id FROM chats")
-        chat_ids = [row[0] for row in await cursor.fetchall()]
-
-        for cid in chat_ids:
-            await db.execute("""
-                INSERT OR IGNORE INTO settings (chat_id, mute_minutes, max_warnings, max_file_mb, delete_service_messages, block_archives)
-                SELECT ?, mute_minutes, max_warnings, max_file_mb, delete_service_messages, block_archives
-                FROM settings WHERE chat_id=0
-            """, (cid,))
+        cursor = await db.execute("SELECT COUNT(*) FROM chats")
+        chat_count = int((await cursor.fetchone())[0] or 0)
 
+        # Qatori bor chatlar yangilanadi; qatori yo‘q chatlar o‘qishda umumiy sozlamani oladi.
         await db.execute(f"UPDATE settings SET {key}=?, updated_at=CURRENT_TIMESTAMP WHERE chat_id=0", (value,))
-        if chat_ids:
-            placeholders = ",".join("?" for _ in chat_ids)
-            await db.execute(
-                f"UPDATE settings SET {key}=?, updated_at=CURRENT_TIMESTAMP WHERE chat_id IN ({placeholders})",
-                (value, *chat_ids),
-            )
+        await db.execute(f"""
+            UPDATE settings SET {key}=?, updated_at=CURRENT_TIMESTAMP
+            WHERE chat_id IN (SELECT chat_id FROM chats)
+        """, (value,))
         await db.commit()
-        clear_runtime_cache()
-        return len(chat_ids)
+        _invalidate_settings(None)
+        return chat_count
 
 
 async def add_whitelist_user(chat_id: int, user_id: int):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.write() as db:
         await db.execute("INSERT OR IGNORE INTO whitelist (chat_id, user_id) VALUES (?, ?)", (chat_id, user_id))
         await db.commit()
-        clear_runtime_cache()
+        _whitelist_cache.invalidate(chat_id)
 
 
 async def remove_whitelist_user(chat_id: int, user_id: int):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.write() as db:
         await db.execute("DELETE FROM whitelist WHERE chat_id=? AND user_id=?", (chat_id, user_id))
         await db.commit()
-        clear_runtime_cache()
+        _whitelist_cache.invalidate(chat_id)
 
 
 async def list_whitelist(chat_id: int):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.read() as db:
         cursor = await db.execute("SELECT user_id FROM whitelist WHERE chat_id=? ORDER BY created_at DESC", (chat_id,))
         rows = await cursor.fetchall()
         return [r[0] for r in rows]
 
 
 async def is_whitelisted(chat_id: int, user_id: int) -> bool:
-    key = (chat_id, user_id)
-    cached = _cache_get(_whitelist_cache, key)
-    if cached is not None:
-        return cached
-    async with aiosqlite.connect(DB_PATH) as db:
-        cursor = await db.execute("SELECT 1 FROM whitelist WHERE chat_id=? AND user_id=?", (chat_id, user_id))
-        return _cache_set(_whitelist_cache, key, await cursor.fetchone() is not None)
+    """Chatning butun whitelisti bir marta o‘qiladi; yangi yozuvchilar uchun ham javob xotiradan."""
+    return user_id in await _whitelist_cache.get_or_load(chat_id, lambda: _load_whitelist_ids(chat_id))
+
+
+async def _load_whitelist_ids(chat_id: int) -> frozenset[int]:
+    async with _pool.read() as db:
+        cursor = await db.execute("SELECT user_id FROM whitelist WHERE chat_id=?", (chat_id,))
+        return frozenset(r[0] for r in await cursor.fetchall())
 
 
 async def list_unsafe_extensions(chat_id: int | None = None):
-    cached = _cache_get(_unsafe_ext_cache, chat_id)
-    if cached is not None:
-        return cached
-    async with aiosqlite.connect(DB_PATH) as db:
+    return await _unsafe_ext_cache.get_or_load(chat_id, lambda: _load_unsafe_extensions(chat_id))
+
+
+async def _load_unsafe_extensions(chat_id: int | None) -> list[str]:
+    async with _pool.read() as db:
         if chat_id is None:
             cursor = await db.execute("SELECT ext FROM unsafe_extensions WHERE chat_id IS NULL ORDER BY ext")
         else:
@@ -758,42 +1438,43 @@ async def list_unsafe_extensions(chat_id: int | None = None):
                 GROUP BY ext ORDER BY ext
             """, (chat_id,))
         rows = await cursor.fetchall()
-        return _cache_set(_unsafe_ext_cache, chat_id, [r[0] for r in rows])
+        return [r[0] for r in rows]
 
 
 async def add_unsafe_extension(ext: str, chat_id: int | None = None):
     ext = (ext or "").strip().lower()
     if not ext.startswith("."):
         ext = "." + ext
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.write() as db:
         await db.execute("INSERT OR IGNORE INTO unsafe_extensions (chat_id, ext) VALUES (?, ?)", (chat_id, ext))
         await db.commit()
-        clear_runtime_cache()
+        _invalidate_scoped(_unsafe_ext_cache, chat_id)
 
 
 async def remove_unsafe_extension(ext: str, chat_id: int | None = None):
     ext = (ext or "").strip().lower()
     if not ext.startswith("."):
         ext = "." + ext
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.write() as db:
         if chat_id is None:
             await db.execute("DELETE FROM unsafe_extensions WHERE chat_id IS NULL AND ext=?", (ext,))
         else:
             await db.execute("DELETE FROM unsafe_extensions WHERE chat_id=? AND ext=?", (chat_id, ext))
         await db.commit()
-        clear_runtime_cache()
+        _invalidate_scoped(_unsafe_ext_cache, chat_id)
 
 async def remove_unsafe_all_extensions(chat_id: int | None = None):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.write() as db:
         if chat_id is None:
             await db.execute("DELETE FROM unsafe_extensions WHERE chat_id IS NULL")
         else:
             await db.execute("DELETE FROM unsafe_extensions WHERE chat_id=?", (chat_id,))
         await db.commit()
+        _invalidate_scoped(_unsafe_ext_cache, chat_id)
 
 
 async def add_warning(chat_id: int, user_id: int) -> int:
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.write() as db:
         await db.execute("""
             INSERT INTO warnings (chat_id, user_id, count)
             VALUES (?, ?, 1)
@@ -807,22 +1488,317 @@ async def add_warning(chat_id: int, user_id: int) -> int:
 
 
 async def reset_warning(chat_id: int, user_id: int):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.write() as db:
         await db.execute("DELETE FROM warnings WHERE chat_id=? AND user_id=?", (chat_id, user_id))
         await db.commit()
 
 
 async def add_security_log(chat_id: int | None, user_id: int | None, action: str, reason: str = "", file_name: str = ""):
-    async with aiosqlite.connect(DB_PATH) as db:
+    # Loglar navbat orqali partiyalab yoziladi. Ogohlantirish/mute hisoblagichlari
+    # (add_warning, reset_warning) esa avvalgidek darhol commit qilinadi.
+    _pool.queue.submit(None, """
+        INSERT INTO security_logs (chat_id, user_id, action, reason, file_name)
+        VALUES (?, ?, ?, ?, ?)
+    """, (chat_id, user_id, action, reason, file_name))
+
+
+def add_pending_deletion(chat_id: int, message_id: int, due_at: float):
+    # Qo‘shish va o‘chirish bir kalitda: xabar navbat yozilguncha o‘chirilsa, INSERT umuman bajarilmaydi.
+    _pool.queue.submit(("pending_deletion", chat_id, message_id), """
+        INSERT OR REPLACE INTO pending_deletions (chat_id, message_id, due_at) VALUES (?, ?, ?)
+    """, (chat_id, message_id, due_at))
+
+
+def remove_pending_deletion(chat_id: int, message_id: int):
+    _pool.queue.submit(("pending_deletion", chat_id, message_id), """
+        DELETE FROM pending_deletions WHERE chat_id=? AND message_id=?
+    """, (chat_id, message_id))
+
+
+async def list_pending_deletions():
+    async with _pool.read() as db:
+        cursor = await db.execute("SELECT chat_id, message_id, due_at FROM pending_deletions ORDER BY due_at")
+        return await cursor.fetchall()
+
+
+BROADCAST_ACTIVE_STATUSES = ("running", "paused")
+
+
+async def create_broadcast_job(
+    created_by: int | None,
+    target: str,
+    source_chat_id: int,
+    source_message_id: int,
+    exclude_user_id: int | None = None,
+) -> int:
+    """Vazifa va uning qabul qiluvchilarini bitta tranzaksiyada yaratadi.
+
+    Qabul qiluvchilar ``INSERT ... SELECT`` bilan yoziladi — ro‘yxat Python xotirasiga yuklanmaydi.
+    Oldingi yuborishlarda doimiy xato bergan (``is_reachable=0``) chatlar olinmaydi.
+    """
+    async with _pool.write() as db:
+        cursor = await db.execute("""
+            INSERT INTO broadcast_jobs (created_by, target, source_chat_id, source_message_id)
+            VALUES (?, ?, ?, ?)
+        """, (created_by, target, source_chat_id, source_message_id))
+        job_id = cursor.lastrowid
+        if target in {"users", "all"}:
+            await db.execute("""
+                INSERT OR IGNORE INTO broadcast_recipients (job_id, chat_id)
+                SELECT ?, user_id FROM users WHERE is_reachable=1 AND user_id != ?
+            """, (job_id, exclude_user_id or 0))
+        if target in {"chats", "all"}:
+            await db.execute("""
+                INSERT OR IGNORE INTO broadcast_recipients (job_id, chat_id)
+                SELECT ?, chat_id FROM chats WHERE is_reachable=1
+            """, (job_id,))
+        await db.execute("""
+            UPDATE broadcast_jobs
+            SET total=(SELECT COUNT(*) FROM broadcast_recipients WHERE job_id=?)
+            WHERE id=?
+        """, (job_id, job_id))
+        await db.commit()
+        return job_id
+
+
+async def get_broadcast_job(job_id: int):
+    """``(id, created_by, target, source_chat_id, source_message_id, progress_chat_id,
+    progress_message_id, status, total, sent, failed, created_at, finished_at)``"""
+    async with _pool.read() as db:
+        cursor = await db.execute("""
+            SELECT id, created_by, target, source_chat_id, source_message_id, progress_chat_id,
+                   progress_message_id, status, total, sent, failed, created_at, finished_at
+            FROM broadcast_jobs WHERE id=?
+        """, (job_id,))
+        return await cursor.fetchone()
+
+
+async def list_broadcast_jobs(statuses: tuple[str, ...] = BROADCAST_ACTIVE_STATUSES):
+    placeholders = ", ".join("?" for _ in statuses)
+    async with _pool.read() as db:
+        cursor = await db.execute(
+            f"SELECT id, status FROM broadcast_jobs WHERE status IN ({placeholders}) ORDER BY id",
+            tuple(statuses),
+        )
+        return await cursor.fetchall()
+
+
+async def set_broadcast_progress_message(job_id: int, chat_id: int, message_id: int):
+    async with _pool.write() as db:
+        await db.execute(
+            "UPDATE broadcast_jobs SET progress_chat_id=?, progress_message_id=? WHERE id=?",
+            (chat_id, message_id, job_id),
+        )
+        await db.commit()
+
+
+async def set_broadcast_job_status(job_id: int, status: str, expected: tuple[str, ...] | None = None) -> bool:
+    """Holatni o‘zgartiradi; ``expected`` berilsa faqat shu holatlardan o‘tadi."""
+    sql = """
+        UPDATE broadcast_jobs
+        SET status=?, updated_at=CURRENT_TIMESTAMP,
+            finished_at=CASE WHEN ? IN ('done', 'cancelled') THEN CURRENT_TIMESTAMP ELSE finished_at END
+        WHERE id=?
+    """
+    params: tuple = (status, status, job_id)
+    if expected:
+        sql += f" AND status IN ({', '.join('?' for _ in expected)})"
+        params += tuple(expected)
+    async with _pool.write() as db:
+        cursor = await db.execute(sql, params)
+        await db.commit()
+        return cursor.rowcount > 0
+
+
+async def get_pending_broadcast_recipients(job_id: int, limit: int, after_chat_id: int | None = None) -> list[int]:
+    """Hali yuborilmaganlar, chat_id bo‘yicha kursor bilan (indeksdan o‘qiladi)."""
+    async with _pool.read() as db:
+        cursor = await db.execute("""
+            SELECT chat_id FROM broadcast_recipients
+            WHERE job_id=? AND status='pending' AND chat_id > ?
+            ORDER BY chat_id
+            LIMIT ?
+        """, (job_id, -(1 << 63) if after_chat_id is None else after_chat_id, int(limit)))
+        return [row[0] for row in await cursor.fetchall()]
+
+
+async def save_broadcast_results(
+    job_id: int,
+    results: list[tuple[int, str, str | None]],
+    unreachable: list[tuple[int, str]] = (),
+):
+    """``(chat_id, 'sent' | 'failed', xato)`` natijalarini va vazifa hisoblagichlarini bitta commitda yozadi.
+
+    ``unreachable`` — doimiy xato bergan ``(chat_id, sabab)``lar: shu commitda ``users``/``chats``
+    qatorlari yetib bormaydigan deb belgilanadi (musbat id — foydalanuvchi, manfiy — guruh/kanal).
+    """
+    if not results:
+        return
+    sent = sum(1 for _, status, _ in results if status == "sent")
+    failed = len(results) - sent
+    async with _pool.write() as db:
+        await db.executemany("""
+            UPDATE broadcast_recipients SET status=?, error=?
+            WHERE job_id=? AND chat_id=? AND status='pending'
+        """, [(status, error, job_id, chat_id) for chat_id, status, error in results])
+        await db.execute("""
+            UPDATE broadcast_jobs SET sent=sent+?, failed=failed+?, updated_at=CURRENT_TIMESTAMP WHERE id=?
+        """, (sent, failed, job_id))
+        if unreachable:
+            await _mark_unreachable(db, unreachable)
+        await db.commit()
+
+
+async def _mark_unreachable(db, targets: list[tuple[int, str]]):
+    users = [(reason, chat_id) for chat_id, reason in targets if chat_id > 0]
+    chats = [(reason, chat_id) for chat_id, reason in targets if chat_id < 0]
+    if users:
+        await db.executemany("UPDATE users SET is_reachable=0, unreachable_reason=? WHERE user_id=?", users)
+    if chats:
+        # Bot chatga kira olmaydi — status ham shunga mos, statistika triggerlari hisobni tuzatadi.
+        await db.executemany("""
+            UPDATE chats
+            SET is_reachable=0, unreachable_reason=?, is_bot_admin=0, bot_status='not_member',
+                updated_at=CURRENT_TIMESTAMP
+            WHERE chat_id=?
+        """, chats)
+
+
+# CSV/JSONL exportlar: ustun nomlari va so‘rov (jadvaldagi xom qiymatlar, vaqtlar UTC).
+DATA_EXPORTS = {
+    "chats": (
+        ("chat_id", "title", "type", "invite_link", "is_bot_admin", "bot_status", "member_count",
+         "member_count_updated_at", "is_reachable", "unreachable_reason", "added_at", "updated_at"),
+        "FROM chats ORDER BY chat_id",
+    ),
+    "users": (
+        ("user_id", "first_name", "last_name", "username", "language_code", "is_reachable",
+         "unreachable_reason", "joined_at", "updated_at"),
+        "FROM users ORDER BY user_id",
+    ),
+    "security_logs": (
+        ("id", "chat_id", "user_id", "action", "reason", "file_name", "created_at"),
+        "FROM security_logs ORDER BY id",
+    ),
+    "referrals": (
+        ("link_id", "link_name", "code", "chat_id", "title", "type", "member_count", "is_bot_admin",
+         "bot_status", "added_by", "added_at"),
+        """
+        FROM (
+            SELECT rl.id AS link_id, rl.name AS link_name, rl.code, c.chat_id, c.title, c.type, c.member_count,
+                   c.is_bot_admin, c.bot_status, rlc.added_by, rlc.added_at
+            FROM referral_link_chats rlc
+            JOIN referral_links rl ON rl.id = rlc.link_id
+            JOIN chats c ON c.chat_id = rlc.chat_id
+        )
+        ORDER BY link_id, added_at
+        """,
+    ),
+    "admin_audit_logs": (
+        ("id", "actor_id", "target_user_id", "action", "details", "created_at"),
+        "FROM admin_audit_logs ORDER BY id",
+    ),
+}
+
+
+def iter_data_export(dataset: str, chunk_size: int):
+    """``DATA_EXPORTS`` dagi jadval qatorlari, ustunlar tartibida, partiyalab."""
+    columns, source = DATA_EXPORTS[dataset]
+    return _stream_rows(f"SELECT {', '.join(columns)} {source}", (), chunk_size)
+
+
+async def get_export_version(kind: str, link_id: int | None = None) -> tuple:
+    """Export ma'lumotlari versiyasi: qatorlar soni, eng oxirgi ``updated_at`` va id yig‘indisi.
+
+    Qiymat o‘zgarmasa, oldingi fayl (yoki uning Telegram file_id'si) qayta ishlatiladi.
+    Id yig‘indisi yetib boriladigan qatorlar to‘plami almashganini ham sezadi.
+    """
+    if kind == "chats":
+        sql, params = "SELECT COUNT(*), MAX(updated_at), TOTAL(chat_id) FROM chats WHERE is_reachable=1", ()
+    elif kind == "users":
+        sql, params = "SELECT COUNT(*), MAX(updated_at), TOTAL(user_id) FROM users WHERE is_reachable=1", ()
+    elif kind == "referrals":
+        # Ssilka nomlari ham faylga yoziladi; ssilkalar soni kam.
+        sql, params = """
+            SELECT COUNT(*), MAX(c.updated_at), MAX(c.member_count_updated_at), MAX(rlc.added_at), TOTAL(c.chat_id),
+                   (SELECT group_concat(id || ':' || name, '|') FROM referral_links)
+            FROM referral_link_chats rlc
+            JOIN chats c ON c.chat_id = rlc.chat_id
+            WHERE c.is_bot_admin=1
+        """, ()
+    elif kind == "referral":
+        sql, params = """
+            SELECT COUNT(*), MAX(c.updated_at), MAX(c.member_count_updated_at), MAX(rlc.added_at), TOTAL(c.chat_id),
+                   (SELECT name || ':' || code FROM referral_links WHERE id=?)
+            FROM referral_link_chats rlc
+            JOIN chats c ON c.chat_id = rlc.chat_id
+            WHERE rlc.link_id=? AND c.is_bot_admin=1
+        """, (link_id, link_id)
+    else:
+        raise ValueError(f"Noma’lum export turi: {kind}")
+    async with _pool.read() as db:
+        cursor = await db.execute(sql, params)
+        return tuple(await cursor.fetchone())
+
+
+async def get_export_file(cache_key: str):
+    """``(path, file_id)`` yoki None; ishlatilgan vaqti yangilanadi (LRU uchun)."""
+    async with _pool.read() as db:
+        cursor = await db.execute("SELECT path, file_id FROM export_files WHERE cache_key=?", (cache_key,))
+        row = await cursor.fetchone()
+    if row:
+        _pool.queue.submit(("export_used", cache_key), """
+            UPDATE export_files SET used_at=CURRENT_TIMESTAMP WHERE cache_key=?
+        """, (cache_key,))
+    return row
+
+
+async def save_export_file(cache_key: str, kind: str, path: str, size: int) -> list[str]:
+    """Yangi faylni yozadi; shu turdagi eski versiyalar o‘chiriladi va ularning yo‘llari qaytariladi."""
+    async with _pool.write() as db:
+        cursor = await db.execute("SELECT path FROM export_files WHERE kind=? AND cache_key != ?", (kind, cache_key))
+        stale = [row[0] for row in await cursor.fetchall()]
+        await db.execute("DELETE FROM export_files WHERE kind=? AND cache_key != ?", (kind, cache_key))
         await db.execute("""
-            INSERT INTO security_logs (chat_id, user_id, action, reason, file_name)
-            VALUES (?, ?, ?, ?, ?)
-        """, (chat_id, user_id, action, reason, file_name))
+            INSERT INTO export_files (cache_key, kind, path, size)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(cache_key) DO UPDATE SET
+                path=excluded.path, size=excluded.size, file_id=NULL,
+                created_at=CURRENT_TIMESTAMP, used_at=CURRENT_TIMESTAMP
+        """, (cache_key, kind, path, int(size)))
         await db.commit()
+        return stale
+
+
+async def set_export_file_id(cache_key: str, file_id: str | None):
+    async with _pool.write() as db:
+        await db.execute("UPDATE export_files SET file_id=? WHERE cache_key=?", (file_id, cache_key))
+        await db.commit()
+
+
+async def forget_export_file(cache_key: str):
+    async with _pool.write() as db:
+        await db.execute("DELETE FROM export_files WHERE cache_key=?", (cache_key,))
+        await db.commit()
+
+
+async def evict_export_files(max_files: int, max_age_seconds: int) -> list[str]:
+    """Eskirgan (``max_age_seconds`` dan beri ishlatilmagan) va ``max_files`` dan ortiq (LRU) yozuvlarni o‘chiradi."""
+    async with _pool.write() as db:
+        cursor = await db.execute("""
+            SELECT cache_key, path FROM export_files
+            WHERE used_at < datetime('now', ?)
+               OR cache_key NOT IN (SELECT cache_key FROM export_files ORDER BY used_at DESC LIMIT ?)
+        """, (f"-{int(max_age_seconds)} seconds", max(int(max_files), 0)))
+        rows = await cursor.fetchall()
+        if rows:
+            await db.executemany("DELETE FROM export_files WHERE cache_key=?", [(key,) for key, _ in rows])
+            await db.commit()
+        return [path for _, path in rows]
 
 
 async def get_security_logs(limit: int = 20, offset: int = 0):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.read() as db:
         cursor = await db.execute("""
             SELECT chat_id, user_id, action, reason, file_name, created_at
             FROM security_logs
@@ -832,15 +1808,23 @@ async def get_security_logs(limit: int = 20, offset: int = 0):
         return await cursor.fetchall()
 
 
+async def get_security_logs_page(limit: int, cursor: tuple[int] | None = None, backward: bool = False):
+    """get_security_logs ustunlari + ``id``; kursor — ``(id,)``."""
+    return await _keyset_page("""
+        SELECT chat_id, user_id, action, reason, file_name, created_at, id
+        FROM security_logs
+    """, [("id", "?")], limit, cursor, backward)
+
+
 async def get_security_log_count() -> int:
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.read() as db:
         cursor = await db.execute("SELECT COUNT(*) FROM security_logs")
         return (await cursor.fetchone())[0]
 
 
 async def create_referral_link(name: str, code: str, created_by: int | None = None) -> int:
     name = (name or "").strip() or "Nomsiz havola"
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.write() as db:
         cursor = await db.execute(
             "INSERT INTO referral_links (name, code, created_by) VALUES (?, ?, ?)",
             (name, code, created_by)
@@ -850,7 +1834,7 @@ async def create_referral_link(name: str, code: str, created_by: int | None = No
 
 
 async def get_referral_link_by_code(code: str):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.read() as db:
         cursor = await db.execute(
             "SELECT id, name, code, created_by, created_at FROM referral_links WHERE code=?",
             (code,)
@@ -859,7 +1843,7 @@ async def get_referral_link_by_code(code: str):
 
 
 async def get_referral_link_by_id(link_id: int):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.read() as db:
         cursor = await db.execute(
             "SELECT id, name, code, created_by, created_at FROM referral_links WHERE id=?",
             (link_id,)
@@ -869,7 +1853,7 @@ async def get_referral_link_by_id(link_id: int):
 
 async def update_referral_link_name(link_id: int, name: str) -> bool:
     name = (name or "").strip()[:100] or "Nomsiz havola"
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.write() as db:
         cursor = await db.execute(
             "UPDATE referral_links SET name=? WHERE id=?",
             (name, link_id)
@@ -879,7 +1863,7 @@ async def update_referral_link_name(link_id: int, name: str) -> bool:
 
 
 async def delete_referral_link(link_id: int) -> bool:
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.write() as db:
         # SQLite har bir connection uchun foreign_keys alohida yoqiladi.
         # Shuning uchun eski bazalarda ham bog‘langan chatlarni qo‘lda tozalaymiz.
         await db.execute("DELETE FROM referral_link_chats WHERE link_id=?", (link_id,))
@@ -895,7 +1879,7 @@ async def save_user_referral_click(user_id: int, code: str) -> bool:
     link = await get_referral_link_by_code(code)
     if not link:
         return False
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.write() as db:
         await db.execute(
             """
             INSERT INTO user_referral_clicks (user_id, code, updated_at)
@@ -913,7 +1897,7 @@ async def save_user_referral_click(user_id: int, code: str) -> bool:
 async def get_user_referral_click(user_id: int, max_age_hours: int = 72) -> str | None:
     if not user_id:
         return None
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.read() as db:
         cursor = await db.execute(
             """
             SELECT code
@@ -941,7 +1925,7 @@ async def track_referral_chat(code: str, chat_id: int, added_by: int | None = No
     link = await get_referral_link_by_code(code)
     if not link:
         return False
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.write() as db:
         await db.execute(
             """
             INSERT INTO referral_link_chats (link_id, chat_id, added_by)
@@ -955,31 +1939,67 @@ async def track_referral_chat(code: str, chat_id: int, added_by: int | None = No
         return True
 
 
+# get_referral_stats, sahifa va bitta ssilka so‘rovlari uchun umumiy qator shakli.
+_REFERRAL_STATS_COLUMNS = """
+    rl.id,
+    rl.name,
+    rl.code,
+    COALESCE(rsc.groups_count, 0),
+    COALESCE(rsc.admin_count, 0),
+    rl.created_at,
+    rsc.updated_at,
+    COALESCE(rsc.member_count, 0),
+    COALESCE(rsc.not_member_count, 0),
+    COALESCE(rsc.member_gt_10, 0)
+"""
+
+
 async def get_referral_stats():
-    async with aiosqlite.connect(DB_PATH) as db:
-        cursor = await db.execute("""
-            SELECT
-                rl.id,
-                rl.name,
-                rl.code,
-                COALESCE(rsc.admin_count, SUM(CASE WHEN c.is_bot_admin=1 THEN 1 ELSE 0 END), 0) AS groups_count,
-                COALESCE(rsc.admin_count, SUM(CASE WHEN c.is_bot_admin=1 THEN 1 ELSE 0 END), 0) AS admin_count,
-                rl.created_at,
-                rsc.updated_at,
-                COALESCE(rsc.member_count, SUM(CASE WHEN COALESCE(c.bot_status, 'unknown') NOT IN ('not_member','left','kicked') THEN 1 ELSE 0 END), 0) AS member_count,
-                COALESCE(rsc.not_member_count, SUM(CASE WHEN COALESCE(c.bot_status, 'unknown') IN ('not_member','left','kicked') THEN 1 ELSE 0 END), 0) AS not_member_count
+    """Ssilkalar va ularning hisoblagichlari — faqat triggerlar saqlaydigan cache'dan."""
+    async with _pool.read() as db:
+        cursor = await db.execute(f"""
+            SELECT {_REFERRAL_STATS_COLUMNS}
             FROM referral_links rl
             LEFT JOIN referral_stats_cache rsc ON rsc.link_id = rl.id
-            LEFT JOIN referral_link_chats rlc ON rlc.link_id = rl.id AND rsc.link_id IS NULL
-            LEFT JOIN chats c ON c.chat_id = rlc.chat_id AND rsc.link_id IS NULL
-            GROUP BY rl.id
             ORDER BY rl.id DESC
         """)
         return await cursor.fetchall()
 
 
+async def get_referral_summary_page(limit: int, offset: int = 0) -> tuple[list, int]:
+    """Bitta sahifa ssilkalar (admin_count, member_gt_10 bilan) va jami ssilkalar soni — bitta so‘rovda."""
+    async with _pool.read() as db:
+        cursor = await db.execute(f"""
+            SELECT {_REFERRAL_STATS_COLUMNS}, COUNT(*) OVER () AS total
+            FROM referral_links rl
+            LEFT JOIN referral_stats_cache rsc ON rsc.link_id = rl.id
+            ORDER BY rl.id DESC
+            LIMIT ? OFFSET ?
+        """, (int(limit), int(offset)))
+        rows = await cursor.fetchall()
+        if rows:
+            return [row[:-1] for row in rows], int(rows[0][-1])
+        if not offset:
+            return [], 0
+        # Sahifa oxiridan tashqarida — jami sonni alohida olamiz (chaqiruvchi sahifani qisqartiradi).
+        cursor = await db.execute("SELECT COUNT(*) FROM referral_links")
+        return [], int((await cursor.fetchone())[0] or 0)
+
+
+async def get_referral_link_stats(link_id: int):
+    """Bitta ssilka va uning hisoblagichlari (get_referral_stats qatori shaklida)."""
+    async with _pool.read() as db:
+        cursor = await db.execute(f"""
+            SELECT {_REFERRAL_STATS_COLUMNS}
+            FROM referral_links rl
+            LEFT JOIN referral_stats_cache rsc ON rsc.link_id = rl.id
+            WHERE rl.id=?
+        """, (link_id,))
+        return await cursor.fetchone()
+
+
 async def get_referral_chats(link_id: int, limit: int | None = None, offset: int = 0):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.read() as db:
         sql = """
             SELECT
                 c.chat_id,
@@ -1003,33 +2023,71 @@ async def get_referral_chats(link_id: int, limit: int | None = None, offset: int
         return await cursor.fetchall()
 
 
+def iter_referral_chats(chunk_size: int):
+    """Barcha ssilkalarning bot admin chatlari, partiyalab (Excel export uchun).
+
+    ``(ssilka nomi, chat_id, nomi, turi, member_count, added_by)``; tartib — ssilkalar
+    ro‘yxatidagidek (yangisi birinchi), ssilka ichida qo‘shilgan vaqti bo‘yicha.
+    """
+    return _stream_rows("""
+        SELECT rl.name, c.chat_id, c.title, c.type, c.member_count, rlc.added_by
+        FROM referral_links rl
+        JOIN referral_link_chats rlc ON rlc.link_id = rl.id
+        JOIN chats c ON c.chat_id = rlc.chat_id
+        WHERE c.is_bot_admin=1
+        ORDER BY rl.id DESC, rlc.added_at DESC
+    """, (), chunk_size)
+
+
 async def count_referral_chats_member_gt_10(link_id: int) -> int:
-    async with aiosqlite.connect(DB_PATH) as db:
-        cursor = await db.execute("""
-            SELECT COUNT(*)
-            FROM referral_link_chats rlc
-            JOIN chats c ON c.chat_id = rlc.chat_id
-            WHERE rlc.link_id=?
-              AND c.is_bot_admin=1
-              AND c.member_count > 10
-        """, (link_id,))
+    async with _pool.read() as db:
+        cursor = await db.execute("SELECT member_gt_10 FROM referral_stats_cache WHERE link_id=?", (link_id,))
         row = await cursor.fetchone()
-        return int(row[0] or 0)
+        return int(row[0] or 0) if row else 0
 
 
 async def update_chat_member_count(chat_id: int, member_count: int | None):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.write() as db:
         await db.execute("""
             UPDATE chats
             SET member_count=?,
-                member_count_updated_at=CURRENT_TIMESTAMP,
-                updated_at=CURRENT_TIMESTAMP
+                member_count_updated_at=CURRENT_TIMESTAMP
             WHERE chat_id=?
         """, (None if member_count is None else int(member_count), chat_id))
         await db.commit()
 
+async def list_stale_member_counts(max_age: int, priority_max_age: int, limit: int):
+    """A'zolar soni eskirgan faol chatlar: ``(chat_id, kechikish)``, eng kechikkani birinchi.
+
+    Kechikish — yoshi / ruxsat etilgan yoshi; bot admin yoki referral orqali kelgan
+    chatlar uchun ``priority_max_age``, qolganlar uchun ``max_age``.
+    Hali umuman olinmagan son uchun kechikish juda katta (navbat boshida turadi).
+    """
+    inactive = ", ".join(f"'{status}'" for status in INACTIVE_BOT_STATUSES)
+    async with _pool.read() as db:
+        cursor = await db.execute(f"""
+            WITH aged AS (
+                SELECT c.chat_id,
+                       strftime('%s', 'now') - strftime('%s', c.member_count_updated_at) AS age,
+                       CASE
+                           WHEN c.is_bot_admin=1
+                                OR EXISTS (SELECT 1 FROM referral_link_chats rlc WHERE rlc.chat_id = c.chat_id)
+                           THEN ? ELSE ?
+                       END AS max_age
+                FROM chats c
+                WHERE COALESCE(c.bot_status, 'unknown') NOT IN ({inactive}) AND c.is_reachable=1
+            )
+            SELECT chat_id, CASE WHEN age IS NULL THEN 1e9 ELSE CAST(age AS REAL) / max_age END AS overdue
+            FROM aged
+            WHERE age IS NULL OR age > max_age
+            ORDER BY overdue DESC
+            LIMIT ?
+        """, (max(int(priority_max_age), 1), max(int(max_age), 1), int(limit)))
+        return await cursor.fetchall()
+
+
 async def get_chats_without_referral():
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.read() as db:
         cursor = await db.execute("""
             SELECT c.chat_id, c.title, c.type, c.invite_link, c.is_bot_admin, COALESCE(c.bot_status, 'unknown')
             FROM chats c
@@ -1041,7 +2099,7 @@ async def get_chats_without_referral():
 
 
 async def assign_chat_to_referral(link_id: int, chat_id: int) -> bool:
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.write() as db:
         cur = await db.execute("SELECT 1 FROM referral_links WHERE id=?", (link_id,))
         if not await cur.fetchone():
             return False
@@ -1062,7 +2120,7 @@ async def add_panel_admin(user_id: int, full_name: str = "", username: str = "",
     expires_at = None
     if expires_days and int(expires_days) > 0:
         expires_at = (now_samarkand() + timedelta(days=int(expires_days))).strftime("%Y-%m-%d %H:%M:%S")
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.write() as db:
         await db.execute("""
         INSERT INTO panel_admins (user_id, full_name, username, is_active, created_by, expires_at)
         VALUES (?, ?, ?, 1, ?, ?)
@@ -1077,7 +2135,7 @@ async def add_panel_admin(user_id: int, full_name: str = "", username: str = "",
 
 
 async def remove_panel_admin(user_id: int):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.write() as db:
         await db.execute("DELETE FROM panel_admin_permissions WHERE user_id=?", (user_id,))
         cur = await db.execute("DELETE FROM panel_admins WHERE user_id=?", (user_id,))
         await db.commit()
@@ -1085,7 +2143,7 @@ async def remove_panel_admin(user_id: int):
 
 
 async def list_panel_admins():
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.read() as db:
         cursor = await db.execute("""
             SELECT user_id, full_name, username, is_active, created_by, created_at, expires_at
             FROM panel_admins
@@ -1095,7 +2153,7 @@ async def list_panel_admins():
 
 
 async def get_panel_admin(user_id: int):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.read() as db:
         cursor = await db.execute("""
             SELECT user_id, full_name, username, is_active, created_by, created_at, expires_at
             FROM panel_admins
@@ -1105,7 +2163,7 @@ async def get_panel_admin(user_id: int):
 
 
 async def set_panel_admin_permission(user_id: int, permission: str, allowed: bool):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.write() as db:
         await db.execute("""
         INSERT INTO panel_admin_permissions (user_id, permission, allowed)
         VALUES (?, ?, ?)
@@ -1117,7 +2175,7 @@ async def set_panel_admin_permission(user_id: int, permission: str, allowed: boo
 
 
 async def get_panel_admin_permissions(user_id: int) -> set[str]:
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.read() as db:
         cursor = await db.execute("""
             SELECT permission
             FROM panel_admin_permissions
@@ -1137,7 +2195,7 @@ async def panel_admin_has_permission(user_id: int, permission: str) -> bool:
 # ---------------- CRUD ROLE PERMISSIONS ----------------
 
 async def create_panel_role(name: str, description: str = "", created_by: int | None = None) -> int:
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.write() as db:
         role_name = name.strip()
         await db.execute("""
             INSERT INTO panel_roles (name, description, created_by)
@@ -1153,7 +2211,7 @@ async def create_panel_role(name: str, description: str = "", created_by: int |
 
 
 async def update_panel_role(role_id: int, name: str, description: str = "") -> bool:
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.write() as db:
         cur = await db.execute("""
             UPDATE panel_roles
             SET name=?, description=?, updated_at=CURRENT_TIMESTAMP
@@ -1164,14 +2222,14 @@ async def update_panel_role(role_id: int, name: str, description: str = "") -> b
 
 
 async def delete_panel_role(role_id: int) -> bool:
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.write() as db:
         cur = await db.execute("DELETE FROM panel_roles WHERE id=?", (role_id,))
         await db.commit()
         return cur.rowcount > 0
 
 
 async def list_panel_roles():
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.read() as db:
         cur = await db.execute("""
             SELECT id, name, COALESCE(description, ''), created_by, created_at
             FROM panel_roles
@@ -1181,7 +2239,7 @@ async def list_panel_roles():
 
 
 async def get_panel_role(role_id: int):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.read() as db:
         cur = await db.execute("""
             SELECT id, name, COALESCE(description, ''), created_by, created_at
             FROM panel_roles
@@ -1191,7 +2249,7 @@ async def get_panel_role(role_id: int):
 
 
 async def set_panel_role_permission(role_id: int, permission: str, allowed: bool):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.write() as db:
         await db.execute("""
             INSERT INTO panel_role_permissions (role_id, permission, allowed)
             VALUES (?, ?, ?)
@@ -1203,7 +2261,7 @@ async def set_panel_role_permission(role_id: int, permission: str, allowed: bool
 
 
 async def get_panel_role_permissions(role_id: int) -> set[str]:
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.read() as db:
         cur = await db.execute("""
             SELECT permission
             FROM panel_role_permissions
@@ -1213,7 +2271,7 @@ async def get_panel_role_permissions(role_id: int) -> set[str]:
 
 
 async def assign_role_to_admin(user_id: int, role_id: int, assigned_by: int | None = None):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.write() as db:
         await db.execute("""
             INSERT OR IGNORE INTO panel_admin_roles (user_id, role_id, assigned_by)
             VALUES (?, ?, ?)
@@ -1222,14 +2280,14 @@ async def assign_role_to_admin(user_id: int, role_id: int, assigned_by: int | No
 
 
 async def remove_role_from_admin(user_id: int, role_id: int):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.write() as db:
         cur = await db.execute("DELETE FROM panel_admin_roles WHERE user_id=? AND role_id=?", (user_id, role_id))
         await db.commit()
         return cur.rowcount > 0
 
 
 async def get_admin_roles(user_id: int):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.read() as db:
         cur = await db.execute("""
             SELECT r.id, r.name, COALESCE(r.description, '')
             FROM panel_roles r
@@ -1243,7 +2301,7 @@ async def get_admin_roles(user_id: int):
 async def get_admin_effective_permissions(user_id: int) -> set[str]:
     """Adminning o'ziga berilgan eski huquqlari + role orqali berilgan CRUD huquqlari."""
     perms = await get_panel_admin_permissions(user_id)
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.read() as db:
         cur = await db.execute("""
             SELECT rp.permission
             FROM panel_role_permissions rp
@@ -1270,13 +2328,13 @@ async def set_panel_admin_expiry(user_id: int, expires_days: int | None):
     expires_at = None
     if expires_days and int(expires_days) > 0:
         expires_at = (now_samarkand() + timedelta(days=int(expires_days))).strftime("%Y-%m-%d %H:%M:%S")
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.write() as db:
         await db.execute("UPDATE panel_admins SET expires_at=?, updated_at=CURRENT_TIMESTAMP WHERE user_id=?", (expires_at, user_id))
         await db.commit()
 
 
 async def disable_expired_panel_admins() -> int:
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.write() as db:
         cur = await db.execute("""
             UPDATE panel_admins
             SET is_active=0, updated_at=CURRENT_TIMESTAMP
@@ -1287,7 +2345,7 @@ async def disable_expired_panel_admins() -> int:
 
 
 async def add_admin_audit_log(actor_id: int | None, target_user_id: int | None, action: str, details: str = ""):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.write() as db:
         await db.execute("""
             INSERT INTO admin_audit_logs (actor_id, target_user_id, action, details)
             VALUES (?, ?, ?, ?)
@@ -1296,7 +2354,7 @@ async def add_admin_audit_log(actor_id: int | None, target_user_id: int | None,
 
 
 async def get_admin_audit_logs(limit: int = 30):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.read() as db:
         cur = await db.execute("""
             SELECT actor_id, target_user_id, action, details, created_at
             FROM admin_audit_logs
@@ -1315,7 +2373,7 @@ async def set_private_log_chat_id(chat_id: int | None):
 
 
 async def add_private_log_chat(chat_id: int, title: str | None = None, chat_type: str | None = None, added_by: int | None = None):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.write() as db:
         await db.execute("""
             INSERT INTO private_log_chats (chat_id, title, type, added_by)
             VALUES (?, ?, ?, ?)
@@ -1334,21 +2392,21 @@ async def add_private_log_chat(chat_id: int, title: str | None = None, chat_type
 
 
 async def remove_private_log_chat(chat_id: int) -> bool:
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.write() as db:
         cur = await db.execute("DELETE FROM private_log_chats WHERE chat_id=?", (chat_id,))
         await db.commit()
         return cur.rowcount > 0
 
 
 async def clear_private_log_chats():
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.write() as db:
         await db.execute("DELETE FROM private_log_chats")
         await db.execute("DELETE FROM bot_private_settings WHERE key='private_log_chat_id'")
         await db.commit()
 
 
 async def list_private_log_chats():
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.read() as db:
         cur = await db.execute("""
             SELECT chat_id, title, type, added_by, added_at
             FROM private_log_chats
@@ -1361,7 +2419,7 @@ async def get_private_log_chat_id() -> int | None:
     rows = await list_private_log_chats()
     if rows:
         return int(rows[0][0])
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.read() as db:
         cur = await db.execute("SELECT value FROM bot_private_settings WHERE key='private_log_chat_id'")
         row = await cur.fetchone()
         if not row or not row[0]:
@@ -1376,94 +2434,153 @@ async def get_private_log_chat_ids() -> list[int]:
     return [int(row[0]) for row in await list_private_log_chats()]
 
 
-async def save_stats_summary_cache(stats: dict):
-    """Umumiy statistikani cache jadvaliga saqlaydi."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute("""
-            INSERT INTO stats_cache (
-                id, chats_count, member_chats, bot_admin_chats, not_member_chats,
-                groups_count, channels_count, group_member_chats, channel_member_chats,
-                group_admin_chats, channel_admin_chats, users_count, unsafe_ext_count,
-                bad_words_count, updated_at
-            ) VALUES (1, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-            ON CONFLICT(id) DO UPDATE SET
-                chats_count=excluded.chats_count,
-                member_chats=excluded.member_chats,
-                bot_admin_chats=excluded.bot_admin_chats,
-                not_member_chats=excluded.not_member_chats,
-                groups_count=excluded.groups_count,
-                channels_count=excluded.channels_count,
-                group_member_chats=excluded.group_member_chats,
-                channel_member_chats=excluded.channel_member_chats,
-                group_admin_chats=excluded.group_admin_chats,
-                channel_admin_chats=excluded.channel_admin_chats,
-                users_count=excluded.users_count,
-                unsafe_ext_count=excluded.unsafe_ext_count,
-                bad_words_count=excluded.bad_words_count,
-                updated_at=CURRENT_TIMESTAMP
-        """, (
-            stats.get("chats_count", 0), stats.get("member_chats", 0), stats.get("bot_admin_chats", 0),
-            stats.get("not_member_chats", 0), stats.get("groups_count", 0), stats.get("channels_count", 0),
-            stats.get("group_member_chats", 0), stats.get("channel_member_chats", 0),
-            stats.get("group_admin_chats", 0), stats.get("channel_admin_chats", 0), stats.get("users_count", 0),
-            stats.get("unsafe_ext_count", 0), stats.get("bad_words_count", 0),
-        ))
-        await db.commit()
+async def _write_stats_cache(db: aiosqlite.Connection, stats: dict):
+    """updated_at — oxirgi to‘liq tekshiruv vaqti; triggerlar uni o‘zgartirmaydi."""
+    await db.execute(f"""
+        INSERT INTO stats_cache (id, {', '.join(STATS_KEYS)}, updated_at)
+        VALUES (1, {', '.join('?' * len(STATS_KEYS))}, CURRENT_TIMESTAMP)
+        ON CONFLICT(id) DO UPDATE SET
+            {', '.join(f'{key}=excluded.{key}' for key in STATS_KEYS)},
+            updated_at=CURRENT_TIMESTAMP
+    """, tuple(int(stats.get(key, 0)) for key in STATS_KEYS))
 
 
 async def get_stats_summary_cached():
-    """Tugma bosilganda faqat cache'dan o'qiladi; cache bo'lmasa SQL count bilan fallback qiladi."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        cursor = await db.execute("""
-            SELECT chats_count, member_chats, bot_admin_chats, not_member_chats,
-                   groups_count, channels_count, group_member_chats, channel_member_chats,
-                   group_admin_chats, channel_admin_chats, users_count, unsafe_ext_count,
-                   bad_words_count, updated_at
-            FROM stats_cache WHERE id=1
-        """)
-        row = await cursor.fetchone()
-    if not row:
+    """Panel uchun: triggerlar saqlaydigan stats_cache dan bitta qator (O(1), doim joriy)."""
+    async with _pool.read() as db:
+        stats = await _read_stats_cache(db)
+    if stats is None:
         stats = await get_stats_summary()
         stats["updated_at"] = None
-        return stats
-    keys = [
-        "chats_count", "member_chats", "bot_admin_chats", "not_member_chats",
-        "groups_count", "channels_count", "group_member_chats", "channel_member_chats",
-        "group_admin_chats", "channel_admin_chats", "users_count", "unsafe_ext_count",
-        "bad_words_count", "updated_at",
+    return stats
+
+
+# referral_stats_cache: ssilkaga bog‘langan chat qaysi hisoblagichga kirishi ({r} — chats qatori).
+_REFERRAL_STAT_PREDICATES = {
+    "groups_count": "{r}.is_bot_admin = 1",
+    "admin_count": "{r}.is_bot_admin = 1",
+    "member_count": "NOT ({inactive})",
+    "not_member_count": "{inactive}",
+    "member_gt_10": "{r}.is_bot_admin = 1 AND {r}.member_count > 10",
+}
+
+
+def _referral_stats_trigger_statements() -> list[str]:
+    """referral_stats_cache ni ssilka-chat bog‘lanishi va chat statusi o‘zgarganda yangilovchi triggerlar."""
+    keys = list(_REFERRAL_STAT_PREDICATES)
+
+    def apply(sign: str, r: str) -> str:
+        # chats ham member_count ustuniga ega, shuning uchun jadval nomi bilan.
+        return ", ".join(
+            f"{k} = referral_stats_cache.{k} {sign} {_row_flag(_REFERRAL_STAT_PREDICATES[k], r)}" for k in keys
+        )
+
+    def apply_link_chat(sign: str, row: str) -> str:
+        return f"""UPDATE referral_stats_cache SET {apply(sign, 'c')}, updated_at=CURRENT_TIMESTAMP
+            FROM chats c
+            WHERE referral_stats_cache.link_id = {row}.link_id AND c.chat_id = {row}.chat_id;"""
+
+    chat_delta = ", ".join(
+        f"{k} = {k} + {_row_flag(_REFERRAL_STAT_PREDICATES[k], 'NEW')} - {_row_flag(_REFERRAL_STAT_PREDICATES[k], 'OLD')}"
+        for k in keys
+    )
+    return [
+        """CREATE TRIGGER trg_refstats_links_insert AFTER INSERT ON referral_links BEGIN
+            INSERT OR IGNORE INTO referral_stats_cache (link_id) VALUES (NEW.id);
+        END""",
+        """CREATE TRIGGER trg_refstats_links_delete AFTER DELETE ON referral_links BEGIN
+            DELETE FROM referral_stats_cache WHERE link_id = OLD.id;
+        END""",
+        f"""CREATE TRIGGER trg_refstats_link_chats_insert AFTER INSERT ON referral_link_chats BEGIN
+            {apply_link_chat('+', 'NEW')}
+        END""",
+        f"""CREATE TRIGGER trg_refstats_link_chats_delete AFTER DELETE ON referral_link_chats BEGIN
+            {apply_link_chat('-', 'OLD')}
+        END""",
+        f"""CREATE TRIGGER trg_refstats_link_chats_update AFTER UPDATE OF link_id, chat_id ON referral_link_chats BEGIN
+            {apply_link_chat('-', 'OLD')}
+            {apply_link_chat('+', 'NEW')}
+        END""",
+        # member_count har yangilanishida emas, faqat 10 chegarasidan o‘tganda ishlaydi.
+        f"""CREATE TRIGGER trg_refstats_chats_update AFTER UPDATE OF is_bot_admin, bot_status, member_count ON chats
+        WHEN OLD.is_bot_admin IS NOT NEW.is_bot_admin
+          OR OLD.bot_status IS NOT NEW.bot_status
+          OR (OLD.member_count > 10) IS NOT (NEW.member_count > 10)
+        BEGIN
+            UPDATE referral_stats_cache SET {chat_delta}, updated_at=CURRENT_TIMESTAMP
+            WHERE link_id IN (SELECT link_id FROM referral_link_chats WHERE chat_id = NEW.chat_id);
+        END""",
+        # Chat o‘chirilganda bog‘lanishlar chat hali mavjud paytida o‘chiriladi, aks holda
+        # FK cascade triggeri chats qatorini topa olmay hisoblagichni kamaytirmasdi.
+        """CREATE TRIGGER trg_refstats_chats_delete BEFORE DELETE ON chats BEGIN
+            DELETE FROM referral_link_chats WHERE chat_id = OLD.chat_id;
+        END""",
     ]
-    return dict(zip(keys, row))
+
+
+async def _create_referral_stats_triggers(db: aiosqlite.Connection):
+    cursor = await db.execute("SELECT name FROM sqlite_master WHERE type='trigger' AND name LIKE 'trg_refstats_%'")
+    for (name,) in await cursor.fetchall():
+        await db.execute(f"DROP TRIGGER IF EXISTS {name}")
+    for statement in _referral_stats_trigger_statements():
+        await db.execute(statement)
+
+
+def _referral_stats_select() -> str:
+    """Har ssilka uchun hisoblagichlarni to‘liq hisoblovchi so‘rov (tiklash va tekshiruv uchun)."""
+    columns = ",\n".join(
+        f"COALESCE(SUM({_row_flag('{r}.chat_id IS NOT NULL AND (' + template + ')', 'c')}), 0) AS {key}"
+        for key, template in _REFERRAL_STAT_PREDICATES.items()
+    )
+    return f"""
+        SELECT rl.id, {columns}
+        FROM referral_links rl
+        LEFT JOIN (referral_link_chats rlc JOIN chats c ON c.chat_id = rlc.chat_id) ON rlc.link_id = rl.id
+        GROUP BY rl.id
+    """
+
+
+async def _rebuild_referral_stats(db: aiosqlite.Connection):
+    keys = list(_REFERRAL_STAT_PREDICATES)
+    await db.execute("DELETE FROM referral_stats_cache WHERE link_id NOT IN (SELECT id FROM referral_links)")
+    await db.execute(f"""
+        INSERT INTO referral_stats_cache (link_id, {', '.join(keys)}, updated_at)
+        SELECT *, CURRENT_TIMESTAMP FROM ({_referral_stats_select()})
+        WHERE true
+        ON CONFLICT(link_id) DO UPDATE SET
+            {', '.join(f'{k}=excluded.{k}' for k in keys)},
+            updated_at=CURRENT_TIMESTAMP
+    """)
 
 
 async def rebuild_referral_stats_cache():
-    """Referral ssilkalar statistikasi cache'ini chats jadvalidagi oxirgi statuslar asosida yangilaydi."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute("DELETE FROM referral_stats_cache WHERE link_id NOT IN (SELECT id FROM referral_links)")
-        await db.execute("""
-            INSERT INTO referral_stats_cache (link_id, groups_count, admin_count, member_count, not_member_count, updated_at)
-            SELECT
-                rl.id,
-                COALESCE(SUM(CASE WHEN c.is_bot_admin=1 THEN 1 ELSE 0 END), 0) AS groups_count,
-                COALESCE(SUM(CASE WHEN c.is_bot_admin=1 THEN 1 ELSE 0 END), 0) AS admin_count,
-                COALESCE(SUM(CASE WHEN COALESCE(c.bot_status, 'unknown') NOT IN ('not_member','left','kicked') THEN 1 ELSE 0 END), 0) AS member_count,
-                COALESCE(SUM(CASE WHEN COALESCE(c.bot_status, 'unknown') IN ('not_member','left','kicked') THEN 1 ELSE 0 END), 0) AS not_member_count,
-                CURRENT_TIMESTAMP
-            FROM referral_links rl
-            LEFT JOIN referral_link_chats rlc ON rlc.link_id = rl.id
-            LEFT JOIN chats c ON c.chat_id = rlc.chat_id
-            GROUP BY rl.id
-            ON CONFLICT(link_id) DO UPDATE SET
-                groups_count=excluded.groups_count,
-                admin_count=excluded.admin_count,
-                member_count=excluded.member_count,
-                not_member_count=excluded.not_member_count,
-                updated_at=CURRENT_TIMESTAMP
-        """)
+    """Referral statistikasi cache'ini noldan qayta hisoblaydi (triggerlardan keyin faqat tuzatish uchun)."""
+    async with _pool.write() as db:
+        await _rebuild_referral_stats(db)
         await db.commit()
 
 
+async def check_referral_stats_cache() -> dict:
+    """Trigger hisoblagichlarini to‘liq hisob bilan solishtiradi; {link_id: (cache, haqiqiy)} qaytaradi."""
+    keys = list(_REFERRAL_STAT_PREDICATES)
+    async with _pool.read() as db:
+        await db.execute("BEGIN")
+        try:
+            cursor = await db.execute(_referral_stats_select())
+            actual = {row[0]: tuple(row[1:]) for row in await cursor.fetchall()}
+            cursor = await db.execute(f"SELECT link_id, {', '.join(keys)} FROM referral_stats_cache")
+            cached = {row[0]: tuple(row[1:]) for row in await cursor.fetchall()}
+        finally:
+            await db.execute("COMMIT")
+    return {
+        link_id: (cached.get(link_id), actual.get(link_id))
+        for link_id in actual.keys() | cached.keys()
+        if cached.get(link_id) != actual.get(link_id)
+    }
+
+
 async def get_chat_by_id(chat_id: int):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _pool.read() as db:
         cursor = await db.execute("""
             SELECT chat_id, title, type, invite_link, is_bot_admin, COALESCE(bot_status, 'unknown')
             FROM chats WHERE chat_id=?
@@ -1472,12 +2589,8 @@ async def get_chat_by_id(chat_id: int):
 
 
 async def get_referral_chat_count(link_id: int) -> int:
-    async with aiosqlite.connect(DB_PATH) as db:
-        cursor = await db.execute("""
-            SELECT COUNT(*)
-            FROM referral_link_chats rlc
-            JOIN chats c ON c.chat_id = rlc.chat_id
-            WHERE rlc.link_id=? AND c.is_bot_admin=1
-        """, (link_id,))
+    """Ssilka orqali bot admin bo‘lgan chatlar soni (referral_stats_cache.admin_count)."""
+    async with _pool.read() as db:
+        cursor = await db.execute("SELECT admin_count FROM referral_stats_cache WHERE link_id=?", (link_id,))
         row = await cursor.fetchone()
-        return int(row[0] or 0)
+        return int(row[0] or 0) if row else 0
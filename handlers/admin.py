@@ -1,4 +1,9 @@
 from .common import *
+from services.broadcast import broadcast_engine, broadcast_job_kb, broadcast_progress_text
+from services.export_cache import export_cache
+from services.exports import DATA_FORMATS, export_chats_file, export_data_file, export_referral_chats_xlsx, export_users_file
+from services.member_counts import is_member_count_stale, request_member_count_refresh
+from utils.pagination import fits_callback_data, page_ref, parse_page_ref
 from utils.timezone import format_samarkand
 
 router = Router()
@@ -35,116 +40,6 @@ async def refresh_referral_statuses(bot, link_id: int | None = None):
             await refresh_one_chat_status(bot, chat_id)
 
 
-async def count_referral_chats_with_members_gt_10(bot, link_id: int) -> int:
-    """Bazadagi saqlangan member_count bo‘yicha 10+ a'zoli chatlar soni.
-
-    Muhim: export/statistika paytida Telegram API'ga 30 000 marta so‘rov yubormaydi,
-    shu sabab bot qotib qolmaydi. Member count bazaga detail sahifada yoki alohida
-    yangilash jarayonlarida saqlanadi.
-    """
-    return await count_referral_chats_member_gt_10(link_id)
-
-
-async def refresh_missing_member_counts_for_referrals(bot, link_id: int | None = None, concurrency: int = 5):
-    """A'zolar soni bazada yo‘q bo‘lgan chatlar uchun Telegramdan olib, bazaga saqlaydi.
-
-    Bu funksiya exportdan oldin ishlaydi. Semaphore sababli 30 000 ta chat bo‘lsa ham
-    bot event loop qotmaydi va Telegramga birdaniga minglab so‘rov ketmaydi.
-    """
-    link_ids = [link_id] if link_id is not None else [row[0] for row in await get_referral_stats()]
-
-    chat_ids: list[int] = []
-    seen: set[int] = set()
-    for lid in link_ids:
-        for chat in await get_referral_chats(lid):
-            chat_id = int(chat[0])
-            member_count = chat[7] if len(chat) > 7 else None
-            if chat_id not in seen and member_count is None:
-                seen.add(chat_id)
-                chat_ids.append(chat_id)
-
-    if not chat_ids:
-        return
-
-    semaphore = asyncio.Semaphore(concurrency)
-
-    async def refresh_one(chat_id: int):
-        async with semaphore:
-            try:
-                count = int(await bot.get_chat_member_count(chat_id))
-                await update_chat_member_count(chat_id, count)
-                await asyncio.sleep(0.05)
-            except (TelegramForbiddenError, TelegramBadRequest):
-                await update_chat_member_count(chat_id, None)
-            except Exception as exc:
-                logger.warning("A'zolar sonini yangilashda xato. chat_id=%s error=%s", chat_id, exc)
-
-    await asyncio.gather(*(refresh_one(cid) for cid in chat_ids), return_exceptions=True)
-
-
-async def refresh_member_counts_for_rows(bot, rows, concurrency: int = 5):
-    """Detail sahifada ko‘rinayotgan chatlarning a'zolar sonini yangilaydi.
-
-    Faqat member_count bazada NULL bo‘lganlarini Telegramdan oladi.
-    30 000 ta chatni birdaniga emas, faqat ochilgan sahifadagi chatlarni yangilaydi.
-    """
-    missing_chat_ids = []
-    seen = set()
-
-    for row in rows or []:
-        try:
-            chat_id = int(row[0])
-        except Exception:
-            continue
-
-        member_count = row[7] if len(row) > 7 else None
-        if member_count is None and chat_id not in seen:
-            seen.add(chat_id)
-            missing_chat_ids.append(chat_id)
-
-    if not missing_chat_ids:
-        return
-
-    semaphore = asyncio.Semaphore(concurrency)
-
-    async def refresh_one(chat_id: int):
-        async with semaphore:
-            try:
-                count = int(await bot.get_chat_member_count(chat_id))
-                await update_chat_member_count(chat_id, count)
-                await asyncio.sleep(0.05)
-            except (TelegramForbiddenError, TelegramBadRequest):
-                # Bot kira olmaydigan chatlarda NULL qoldiramiz, keyin yana urinib ko‘rishi mumkin.
-                logger.warning("A'zolar sonini olib bo‘lmadi. chat_id=%s", chat_id)
-            except Exception as exc:
-                logger.warning("A'zolar sonini yangilashda xato. chat_id=%s error=%s", chat_id, exc)
-
-    await asyncio.gather(*(refresh_one(chat_id) for chat_id in missing_chat_ids), return_exceptions=True)
-
-
-async def build_all_referral_excel_data(bot):
-    """Barcha giper ssilkalar uchun Excelga tayyor data yig‘adi."""
-    # Avval bazada yo‘q a'zolar sonlarini real Telegramdan olib qo‘yamiz.
-    await refresh_missing_member_counts_for_referrals(bot)
-
-    bot_username = (await bot.me()).username
-    result = []
-    for row in await get_referral_stats():
-        link_id, name, code, groups_count, admin_count, created_at = row[:6]
-        public_url = referral_private_url(bot_username, code)
-        chats = await get_referral_chats(link_id)
-        member_gt_10_count = sum(1 for chat in chats if len(chat) > 7 and chat[7] is not None and int(chat[7]) > 10)
-
-        result.append({
-            "name": name,
-            "url": public_url,
-            "admin_count": admin_count,
-            "member_gt_10_count": member_gt_10_count,
-            "chats": chats,
-        })
-    return result
-
-
 async def referral_menu_kb(user_id: int) -> InlineKeyboardMarkup:
     perms = await get_admin_effective_permissions(user_id) if not is_super_admin(user_id) else set(PANEL_PERMISSIONS)
     rows = []
@@ -215,17 +110,18 @@ async def referral_list(call: types.CallbackQuery):
     page = int(parts[2]) if len(parts) > 2 and parts[2].isdigit() else 0
 
     await call.answer("✅ Ssilka statistikasi bazadan olindi")
-    rows = await get_referral_stats()
-    total = len(rows)
-    if not rows:
+    page = max(0, page)
+    page_rows, total = await get_referral_summary_page(REF_LINKS_PER_PAGE, page * REF_LINKS_PER_PAGE)
+    if not total:
         await safe_edit_text(call.message, "🔗 Hozircha ssilka yaratilmagan.", reply_markup=await referral_menu_kb(call.from_user.id))
         return await call.answer()
 
     max_page = max((total - 1) // REF_LINKS_PER_PAGE, 0)
-    page = max(0, min(page, max_page))
+    if page > max_page:
+        page = max_page
+        page_rows, total = await get_referral_summary_page(REF_LINKS_PER_PAGE, page * REF_LINKS_PER_PAGE)
     start = page * REF_LINKS_PER_PAGE
     end = start + REF_LINKS_PER_PAGE
-    page_rows = rows[start:end]
 
     bot_username = (await call.bot.me()).username
     text = (
@@ -236,7 +132,7 @@ async def referral_list(call: types.CallbackQuery):
 
     for number, row in enumerate(page_rows, start=start + 1):
         link_id, name, code, groups_count, admin_count, created_at = row[:6]
-        member_gt_10_count = await count_referral_chats_with_members_gt_10(call.bot, link_id)
+        member_gt_10_count = row[9]
         public_url = referral_private_url(bot_username, code)
         text += (
             f"{number}. 🔹 <b>{escape(name)}</b>\n"
@@ -274,9 +170,8 @@ async def referral_detail(call: types.CallbackQuery):
     back_page = int(parts[4]) if len(parts) > 4 and parts[4].isdigit() else 0
 
     await call.answer("✅ Ssilka ma’lumoti bazadan olindi")
-    stats_rows = await get_referral_stats()
-    current_link = next((row for row in stats_rows if row[0] == link_id), None)
-    total = await get_referral_chat_count(link_id)
+    current_link = await get_referral_link_stats(link_id)
+    total = current_link[4] if current_link else 0
 
     max_page = max((total - 1) // REF_GROUPS_PER_PAGE, 0)
     page = max(0, min(page, max_page))
@@ -284,14 +179,12 @@ async def referral_detail(call: types.CallbackQuery):
     end = start + REF_GROUPS_PER_PAGE
     page_chats = await get_referral_chats(link_id, limit=REF_GROUPS_PER_PAGE, offset=start)
 
-    # Shu sahifadagi chatlarda a'zolar soni bazada yo‘q bo‘lsa, Telegramdan olib bazaga yozamiz.
-    # Keyin ro‘yxatni qayta o‘qiymiz, shunda "bazada yo‘q" o‘rniga real son chiqadi.
-    await refresh_member_counts_for_rows(call.bot, page_chats)
-    page_chats = await get_referral_chats(link_id, limit=REF_GROUPS_PER_PAGE, offset=start)
+    # Sahifa bazadan chiziladi; a'zolar soni yo‘q chatlar servis navbatining boshiga qo‘yiladi.
+    request_member_count_refresh(row[0] for row in page_chats if row[7] is None)
 
     if current_link:
         link_id, link_name, _, groups_count, admin_count, _ = current_link[:6]
-        member_gt_10_count = await count_referral_chats_with_members_gt_10(call.bot, link_id)
+        member_gt_10_count = current_link[9]
         text = (
             f"📄 <b>{escape(link_name)}</b> orqali bot admin bo‘lgan guruh/kanallar\n"
             f"Sahifa: <b>{page + 1}/{max_page + 1}</b> | "
@@ -360,14 +253,11 @@ async def referral_export_handler(call: types.CallbackQuery):
     export_type = parts[2]
 
     if export_type == "xlsx" and len(parts) > 3 and parts[3] == "all":
-        await call.answer("⏳ Excel tayyorlanmoqda. A’zolar soni yo‘q bo‘lsa avval Telegramdan olinadi...", show_alert=True)
-        referral_data = await build_all_referral_excel_data(call.bot)
-        file_path = await asyncio.to_thread(
-            export_all_referral_chats_to_xlsx,
-            referral_data,
-            "giper_links.xlsx"
+        await call.answer("⏳ Excel tayyorlanmoqda...")
+        await export_cache.send(
+            call.message, "referrals_xlsx", await get_export_version("referrals"), "xlsx",
+            export_referral_chats_xlsx, "giper_links.xlsx", caption="✅ Excel tayyor.",
         )
-        await call.message.answer_document(types.FSInputFile(file_path), caption="✅ Excel tayyor.")
         return
 
     link_id = int(parts[3])
@@ -382,37 +272,25 @@ async def referral_export_handler(call: types.CallbackQuery):
     bot_username = (await call.bot.me()).username
     public_url = referral_private_url(bot_username, code)
 
-    # TXT/PDF exportda ham a'zolar soni yo‘q bo‘lsa avval Telegramdan olib bazaga yozamiz.
-    await refresh_missing_member_counts_for_referrals(call.bot, link_id=link_id)
-    chats = await get_referral_chats(link_id)
-
-    safe_name = re.sub(r"[^a-zA-Z0-9_-]+", "_", str(link_name or link_id)).strip("_")[:40] or str(link_id)
     if export_type == "txt":
-        await call.answer("⏳ TXT tayyorlanmoqda...")
-        file_path = await asyncio.to_thread(
-            export_referral_chats_to_txt,
-            link_name,
-            public_url,
-            chats,
-            f"referral_chats.txt"
-        )
-        caption = "✅ TXT tayyor."
+        render = export_referral_chats_to_txt
     elif export_type == "pdf":
-        await call.answer("⏳ PDF tayyorlanmoqda...")
-        file_path = await asyncio.to_thread(
-            export_referral_chats_to_pdf,
-            link_name,
-            public_url,
-            chats,
-            f"referral_chats.pdf"
-        )
-        caption = "✅ PDF tayyor."
+        render = export_referral_chats_to_pdf
     else:
         await call.answer("❌ Noto‘g‘ri export turi.", show_alert=True)
         return
 
-    await call.message.answer_document(types.FSInputFile(file_path), caption=caption)
-    await call.answer("✅ Fayl yuborildi")
+    async def build(path: str):
+        # A'zolar soni bazadan olinadi; yangilab turishni services/member_counts.py bajaradi.
+        chats = await get_referral_chats(link_id)
+        await asyncio.to_thread(render, link_name, public_url, chats, path)
+
+    safe_name = re.sub(r"[^a-zA-Z0-9_-]+", "_", str(link_name or link_id)).strip("_")[:40] or str(link_id)
+    await call.answer(f"⏳ {export_type.upper()} tayyorlanmoqda...")
+    await export_cache.send(
+        call.message, f"referral_{export_type}:{link_id}", await get_export_version("referral", link_id), export_type,
+        build, f"referral_{safe_name}.{export_type}", caption=f"✅ {export_type.upper()} tayyor.",
+    )
 
 
 @router.callback_query(F.data.startswith("ref:edit:"))
@@ -560,14 +438,14 @@ async def referral_pick_chat(call: types.CallbackQuery):
     parts = call.data.split(":")
     chat_id = int(parts[2])
     back_page = int(parts[3]) if len(parts) > 3 and parts[3].isdigit() else 0
-    links = await get_referral_stats()
+    links, _ = await get_referral_summary_page(40)
 
     if not links:
         await safe_edit_text(call.message, "🔗 Avval giper ssilka yarating.", reply_markup=await referral_menu_kb(call.from_user.id))
         return await call.answer()
 
     rows = []
-    for row in links[:40]:
+    for row in links:
         link_id, name, code, groups_count, admin_count, created_at = row[:6]
         rows.append([InlineKeyboardButton(
             text=f"{name[:35]} ({groups_count})",
@@ -649,20 +527,55 @@ async def statistics_handler(call: types.CallbackQuery):
         f"🦠 Global xavfli kengaytmalar: <b>{stats['unsafe_ext_count']}</b>\n"
         f"🚫 Global yomon so‘zlar: <b>{stats['bad_words_count']}</b>\n\n"
         f"ℹ️ Oxirgi fon tekshiruv: <code>{escape(format_samarkand(stats.get('updated_at')) if stats.get('updated_at') else 'hali cache yo‘q')}</code>\n"
-        "Bot statistikani har 30 daqiqada avtomatik yangilaydi."
+        "Hisoblagichlar real vaqtda yangilanadi, fon tekshiruv har 30 daqiqada."
     )
 
     await safe_edit_text(call.message, text, reply_markup=stats_kb())
 
 
+async def load_keyset_page(fetch, per_page: int, parts: list[str], key_of, key_size: int):
+    """Kursorli sahifa: ``(rows, page, current_ref, prev_ref, next_ref)``.
+
+    ``parts`` — callback_data'dagi sahifa havolasi bo‘laklari (``utils.pagination``).
+    Havolalar None bo‘lsa tegishli tugma chiqmaydi.
+    """
+    page, backward, cursor = parse_page_ref(parts, key_size)
+    rows, has_more = await fetch(per_page, cursor, backward)
+    if cursor is not None and backward and not has_more:
+        # Ro‘yxat boshiga yetdik — bu birinchi sahifa.
+        page, cursor, backward = 0, None, False
+        if len(rows) < per_page:
+            rows, has_more = await fetch(per_page)
+        else:
+            has_more = True
+    elif cursor is not None and not rows:
+        # Kursordan keyin qator qolmagan (masalan o‘chirilgan) — boshidan ko‘rsatamiz.
+        page, cursor, backward = 0, None, False
+        rows, has_more = await fetch(per_page)
+
+    has_prev = has_more if backward else cursor is not None
+    has_next = True if backward else has_more
+    current_ref = page_ref(page, "p" if backward else "n", cursor)
+    prev_ref = page_ref(page - 1, "p", key_of(rows[0])) if rows and has_prev else None
+    next_ref = page_ref(page + 1, "n", key_of(rows[-1])) if rows and has_next else None
+    return rows, page, current_ref, prev_ref, next_ref
+
+
+def _chat_page_key(row) -> tuple[int, int]:
+    return row[6], row[0]
+
+
+def _chats_back_ref(parts: list[str]) -> str:
+    page, backward, cursor = parse_page_ref(parts, 2)
+    return page_ref(page, "p" if backward else "n", cursor)
+
+
 @router.callback_query(F.data.startswith("chats:page:"))
 async def chats_page_handler(call: types.CallbackQuery):
     if await deny_if_no_permission(call, "chats.read"):
         return
 
-    parts = call.data.split(":")
-    page = int(parts[2]) if len(parts) > 2 and parts[2].isdigit() else 0
-    await call.answer("⏳ A’zolar soni Telegramdan tekshirilyapti...")
+    await call.answer()
     total = await get_chat_count()
 
     if total == 0:
@@ -670,10 +583,12 @@ async def chats_page_handler(call: types.CallbackQuery):
         return
 
     max_page = max((total - 1) // CHATS_PER_PAGE, 0)
-    page = max(0, min(page, max_page))
+    chats, page, current_ref, prev_ref, next_ref = await load_keyset_page(
+        get_chats_page, CHATS_PER_PAGE, call.data.split(":")[2:], _chat_page_key, 2
+    )
+    # Sahifa raqami faqat ko‘rsatish uchun; ro‘yxat kursor bo‘yicha olinadi.
+    page = min(page, max_page)
     start = page * CHATS_PER_PAGE
-    end = start + CHATS_PER_PAGE
-    chats = await get_all_chats(limit=CHATS_PER_PAGE, offset=start)
 
     text = (
         f"📋 <b>Guruh/kanallar ro‘yxati</b>\n"
@@ -681,29 +596,40 @@ async def chats_page_handler(call: types.CallbackQuery):
         "Status: <b>bazadagi oxirgi fon tekshiruv natijasi</b>\n\n"
     )
     kb_rows = []
+    # Sahifa darhol bazadan chiziladi; eskirgan sonlar fonda yangilanadi.
+    stale_ids = [row[0] for row in chats if is_member_count_stale(row[8], important=bool(row[4]))]
+    request_member_count_refresh(stale_ids)
 
     for number, row in enumerate(chats, start=start + 1):
-        chat_id, title, chat_type, invite_link, is_admin, bot_status = row
-        member_count = await get_chat_member_count_text(call.bot, chat_id)
+        chat_id, title, chat_type, invite_link, is_admin, bot_status, _, member_count_db, member_count_ts = row
+        member_count = format_member_count(member_count_db, member_count_ts)
         text += (
             f"{number}. <b>{escape(title or str(chat_id))}</b>\n"
             f"   Turi: <code>{escape(str(chat_type))}</code> | {render_bot_status(is_admin, bot_status)}\n"
             f"   👥 A’zolar soni: <b>{escape(member_count)}</b>\n"
             f"   ID: <code>{chat_id}</code>\n\n"
         )
+        detail_data = f"chats:detail:{chat_id}:{current_ref}"
+        if not fits_callback_data(detail_data):
+            detail_data = f"chats:detail:{chat_id}:0"
         kb_rows.append([InlineKeyboardButton(
             text=f"{number}. {(title or str(chat_id))[:32]}",
-            callback_data=f"chats:detail:{chat_id}:{page}"
+            callback_data=detail_data
         )])
 
+    if stale_ids:
+        text += f"🔄 {len(stale_ids)} ta chatning a’zolar soni fonda yangilanmoqda.\n"
+
     nav = []
-    if page > 0:
-        nav.append(InlineKeyboardButton(text="⬅️ Oldingi", callback_data=f"chats:page:{page - 1}"))
-    if end < total:
-        nav.append(InlineKeyboardButton(text="➡️ Keyingi", callback_data=f"chats:page:{page + 1}"))
+    if prev_ref:
+        nav.append(InlineKeyboardButton(text="⬅️ Oldingi", callback_data=f"chats:page:{prev_ref}"))
+    if next_ref:
+        nav.append(InlineKeyboardButton(text="➡️ Keyingi", callback_data=f"chats:page:{next_ref}"))
     if nav:
         kb_rows.append(nav)
 
+    if stale_ids:
+        kb_rows.append([InlineKeyboardButton(text="🔄 Yangilash", callback_data=f"chats:page:{current_ref}")])
     kb_rows.append([InlineKeyboardButton(text="⬅️ Statistikaga qaytish", callback_data="stats")])
     kb_rows.append([InlineKeyboardButton(text="🏠 Asosiy menyu", callback_data="menu:main")])
 
@@ -717,10 +643,11 @@ async def chat_detail_handler(call: types.CallbackQuery):
 
     parts = call.data.split(":")
     chat_id = int(parts[2])
-    back_page = int(parts[3]) if len(parts) > 3 and parts[3].isdigit() else 0
+    back_ref = _chats_back_ref(parts[3:])
 
     # Detail sahifasida bitta chatni qo‘lda tekshirish mumkin; bu 10 000+ chatni aylantirmaydi.
     await refresh_one_chat_status(call.bot, chat_id)
+    await flush_writes()
     row = await get_chat_by_id(chat_id)
     if not row:
         await safe_edit_text(call.message, "❌ Bu chat bazadan topilmadi.", reply_markup=stats_kb())
@@ -745,9 +672,9 @@ async def chat_detail_handler(call: types.CallbackQuery):
         text += "✅ Bot admin."
 
     kb = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🔄 Statusni tekshirish", callback_data=f"chats:detail:{chat_id}:{back_page}")],
-        [InlineKeyboardButton(text="🗑 Bazadan o‘chirish", callback_data=f"chats:delete:{chat_id}:{back_page}")],
-        [InlineKeyboardButton(text="⬅️ Ro‘yxatga qaytish", callback_data=f"chats:page:{back_page}")],
+        [InlineKeyboardButton(text="🔄 Statusni tekshirish", callback_data=f"chats:detail:{chat_id}:{back_ref}")],
+        [InlineKeyboardButton(text="🗑 Bazadan o‘chirish", callback_data=f"chats:delete:{chat_id}:{back_ref}")],
+        [InlineKeyboardButton(text="⬅️ Ro‘yxatga qaytish", callback_data=f"chats:page:{back_ref}")],
         [InlineKeyboardButton(text="🏠 Asosiy menyu", callback_data="menu:main")],
     ])
     await safe_edit_text(call.message, text, reply_markup=kb)
@@ -761,13 +688,13 @@ async def chat_delete_handler(call: types.CallbackQuery):
 
     parts = call.data.split(":")
     chat_id = int(parts[2])
-    back_page = int(parts[3]) if len(parts) > 3 and parts[3].isdigit() else 0
+    back_ref = _chats_back_ref(parts[3:])
     deleted = await delete_chat(chat_id)
     await call.answer("✅ Bazadan o‘chirildi." if deleted else "❌ Bazada topilmadi.", show_alert=True)
     await safe_edit_text(call.message, 
         "✅ Chat bazadan o‘chirildi." if deleted else "❌ Chat bazada topilmadi.",
         reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="⬅️ Ro‘yxatga qaytish", callback_data=f"chats:page:{back_page}")],
+            [InlineKeyboardButton(text="⬅️ Ro‘yxatga qaytish", callback_data=f"chats:page:{back_ref}")],
             [InlineKeyboardButton(text="🏠 Asosiy menyu", callback_data="menu:main")],
         ])
     )
@@ -775,28 +702,29 @@ async def chat_delete_handler(call: types.CallbackQuery):
 
 @router.callback_query(F.data == "logs")
 async def logs_handler(call: types.CallbackQuery):
-    await _render_logs_page(call, 0)
+    await _render_logs_page(call, [])
 
 
 @router.callback_query(F.data.startswith("logs:page:"))
 async def logs_page_handler(call: types.CallbackQuery):
-    page = int(call.data.split(":")[2]) if call.data and call.data.split(":")[2].isdigit() else 0
-    await _render_logs_page(call, page)
+    await _render_logs_page(call, call.data.split(":")[2:])
 
 
-async def _render_logs_page(call: types.CallbackQuery, page: int):
+async def _render_logs_page(call: types.CallbackQuery, ref_parts: list[str]):
     if await deny_if_no_permission(call, "logs.read"):
         return
     per_page = 10
     total = await get_security_log_count()
     max_page = max((total - 1) // per_page, 0)
-    page = max(0, min(page, max_page))
-    rows = await get_security_logs(per_page, page * per_page)
+    rows, page, _, prev_ref, next_ref = await load_keyset_page(
+        get_security_logs_page, per_page, ref_parts, lambda row: (row[6],), 1
+    )
+    page = min(page, max_page)
     if not rows:
         text = "🧾 Hozircha loglar yo‘q."
     else:
         text = f"🧾 <b>Xavfsizlik loglari</b>\nSahifa: <b>{page + 1}/{max_page + 1}</b> | Jami: <b>{total}</b>\n\n"
-        for chat_id, user_id, action, reason, file_name, created_at in rows:
+        for chat_id, user_id, action, reason, file_name, created_at, _ in rows:
             text += (
                 f"• <b>{escape(action)}</b> — {escape(reason or '—')}\n"
                 f"  Chat: <code>{chat_id}</code> | User: <code>{user_id}</code>\n"
@@ -804,10 +732,10 @@ async def _render_logs_page(call: types.CallbackQuery, page: int):
             )
     kb_rows = []
     nav = []
-    if page > 0:
-        nav.append(InlineKeyboardButton(text="⬅️ Oldingi", callback_data=f"logs:page:{page-1}"))
-    if (page + 1) * per_page < total:
-        nav.append(InlineKeyboardButton(text="➡️ Keyingi", callback_data=f"logs:page:{page+1}"))
+    if prev_ref:
+        nav.append(InlineKeyboardButton(text="⬅️ Oldingi", callback_data=f"logs:page:{prev_ref}"))
+    if next_ref:
+        nav.append(InlineKeyboardButton(text="➡️ Keyingi", callback_data=f"logs:page:{next_ref}"))
     if nav:
         kb_rows.append(nav)
     kb_rows.append([InlineKeyboardButton(text="⬅️ Orqaga", callback_data="menu:main")])
@@ -819,20 +747,23 @@ async def _render_logs_page(call: types.CallbackQuery, page: int):
 async def export_txt_handler(call: types.CallbackQuery):
     if await deny_if_no_permission(call, "exports.action"):
         return
-    chats = await get_all_chats()
-    file_path = export_chats_to_txt(chats)
-    await call.message.answer_document(types.FSInputFile(file_path))
-    await call.answer("✅ TXT tayyor")
+    # Callback javobi kutib qolmasin: fayl fonda (oqim bilan) tayyorlanadi yoki keshdan olinadi.
+    await call.answer("⏳ TXT tayyorlanmoqda...")
+    await export_cache.send(
+        call.message, "chats_txt", await get_export_version("chats"), "txt",
+        lambda path: export_chats_file("txt", path), "chats.txt", caption="✅ TXT tayyor",
+    )
 
 
 @router.callback_query(F.data == "export:pdf")
 async def export_pdf_handler(call: types.CallbackQuery):
     if await deny_if_no_permission(call, "exports.action"):
         return
-    chats = await get_all_chats()
-    file_path = export_chats_to_pdf(chats)
-    await call.message.answer_document(types.FSInputFile(file_path))
-    await call.answer("✅ PDF tayyor")
+    await call.answer("⏳ PDF tayyorlanmoqda...")
+    await export_cache.send(
+        call.message, "chats_pdf", await get_export_version("chats"), "pdf",
+        lambda path: export_chats_file("pdf", path), "chats.pdf", caption="✅ PDF tayyor",
+    )
 
 
 @router.callback_query(F.data.startswith("export:users:"))
@@ -840,17 +771,79 @@ async def export_users_handler(call: types.CallbackQuery):
     if await deny_if_no_permission(call, "exports.action"):
         return
     export_type = call.data.split(":")[-1]
-    users = await get_all_users()
-    if export_type == "txt":
-        file_path = export_users_to_txt(users)
-        answer = "✅ Foydalanuvchilar TXT tayyor"
-    elif export_type == "pdf":
-        file_path = export_users_to_pdf(users)
-        answer = "✅ Foydalanuvchilar PDF tayyor"
-    else:
+    if export_type not in {"txt", "pdf"}:
+        return await call.answer("❌ Noto‘g‘ri eksport turi.", show_alert=True)
+    await call.answer(f"⏳ Foydalanuvchilar {export_type.upper()} tayyorlanmoqda...")
+    await export_cache.send(
+        call.message, f"users_{export_type}", await get_export_version("users"), export_type,
+        lambda path: export_users_file(export_type, path), f"users.{export_type}",
+        caption=f"✅ Foydalanuvchilar {export_type.upper()} tayyor",
+    )
+
+
+DATA_EXPORT_LABELS = {
+    "chats": "💬 Chatlar",
+    "users": "👥 Foydalanuvchilar",
+    "security_logs": "🧾 Xavfsizlik loglari",
+    "referrals": "🔗 Giper ssilka chatlari",
+    "admin_audit_logs": "👮 Admin audit",
+}
+
+
+def _data_export_allowed(user_id: int, dataset: str) -> bool:
+    # Audit log panelda ham faqat superadminga ko‘rinadi.
+    return dataset != "admin_audit_logs" or is_super_admin(user_id)
+
+
+@router.callback_query(F.data == "export:data")
+async def export_data_menu(call: types.CallbackQuery):
+    if await deny_if_no_permission(call, "exports.action"):
+        return
+    rows = [
+        [
+            InlineKeyboardButton(text=f"{label} CSV", callback_data=f"export:data:{dataset}:csv"),
+            InlineKeyboardButton(text=f"{label} JSONL", callback_data=f"export:data:{dataset}:jsonl"),
+        ]
+        for dataset, label in DATA_EXPORT_LABELS.items()
+        if _data_export_allowed(call.from_user.id, dataset)
+    ]
+    rows.append([InlineKeyboardButton(text="⬅️ Asosiy menyu", callback_data="menu:main")])
+    await safe_edit_text(
+        call.message,
+        "🗂 <b>CSV / JSONL eksport</b>\n\n"
+        "Jadvaldagi barcha ustunlar, vaqtlar UTC. JSONL gzip bilan siqiladi. "
+        "Katta fayllar Telegram limitiga sig‘ishi uchun bir nechta qismga bo‘linadi.",
+        reply_markup=InlineKeyboardMarkup(inline_keyboard=rows),
+    )
+    await call.answer()
+
+
+@router.callback_query(F.data.startswith("export:data:"))
+async def export_data_handler(call: types.CallbackQuery):
+    if await deny_if_no_permission(call, "exports.action"):
+        return
+    parts = call.data.split(":")
+    dataset, fmt = (parts[2], parts[3]) if len(parts) == 4 else (None, None)
+    if dataset not in DATA_EXPORT_LABELS or fmt not in DATA_FORMATS:
         return await call.answer("❌ Noto‘g‘ri eksport turi.", show_alert=True)
-    await call.message.answer_document(types.FSInputFile(file_path))
-    await call.answer(answer)
+    if not _data_export_allowed(call.from_user.id, dataset):
+        return await call.answer("⛔ Ruxsat yo‘q.", show_alert=True)
+    ext = DATA_FORMATS[fmt]
+    label = DATA_EXPORT_LABELS[dataset]
+    await call.answer(f"⏳ {fmt.upper()} tayyorlanmoqda...")
+    paths = await export_data_file(dataset, fmt, export_cache.temp_path(ext))
+    try:
+        for number, path in enumerate(paths, start=1):
+            name, caption = f"{dataset}.{ext}", f"✅ {label} {fmt.upper()}"
+            if len(paths) > 1:
+                name, caption = f"{dataset}.{number}.{ext}", f"{caption} — {number}/{len(paths)} qism"
+            await call.message.answer_document(types.FSInputFile(path, filename=name), caption=caption)
+    finally:
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
 
 
 @router.callback_query(F.data == "bw:menu")
@@ -1314,64 +1307,71 @@ async def broadcast_media_post(message: types.Message, state: FSMContext):
 
     data = await state.get_data()
     target = data.get("broadcast_target", "chats")
-    recipients: list[int] = []
-
-    if target in {"users", "all"}:
-        users = await get_all_users()
-        recipients.extend(int(user_id) for user_id, *_ in users if int(user_id) != message.from_user.id)
-
-    if target in {"chats", "all"}:
-        chats = await get_all_chats()
-        recipients.extend(int(chat_id) for chat_id, *_ in chats)
-
-    recipients = list(dict.fromkeys(recipients))
-    sent = 0
-    failed = 0
-
-    progress = await message.answer(f"⏳ Ommaviy yuborish boshlandi. Jami: <b>{len(recipients)}</b>")
-
-    for index, chat_id in enumerate(recipients, start=1):
-        try:
-            await message.copy_to(chat_id)
-            sent += 1
-        except Exception as exc:
-            logger.warning("Broadcast yuborilmadi. chat_id=%s error=%s", chat_id, exc)
-            failed += 1
-        await asyncio.sleep(0.07)
+    # Qabul qiluvchilar bazada yaratiladi; yuborishni fon servisi bajaradi, handler darhol bo‘shaydi.
+    job_id = await create_broadcast_job(
+        message.from_user.id, target, message.chat.id, message.message_id, exclude_user_id=message.from_user.id
+    )
+    job = await get_broadcast_job(job_id)
+    progress = await message.answer(broadcast_progress_text(job), reply_markup=broadcast_job_kb(job))
+    await set_broadcast_progress_message(job_id, progress.chat.id, progress.message_id)
+    broadcast_engine.launch(job_id)
+    await state.clear()
 
-        if index % 25 == 0:
-            await safe_edit_text(progress, f"⏳ Yuborilmoqda...\n✅ Yuborildi: <b>{sent}</b>\n❌ Xato: <b>{failed}</b>\n📌 Tekshirildi: <b>{index}/{len(recipients)}</b>")
 
-    await safe_edit_text(progress, f"✅ <b>Ommaviy xabar yakunlandi</b>\n\n📨 Yuborildi: <b>{sent}</b> ta\n❌ Xato: <b>{failed}</b> ta", reply_markup=back_to_main_kb())
-    await state.clear()
+@router.callback_query(F.data.startswith("bc:"))
+async def broadcast_job_action(call: types.CallbackQuery):
+    if await deny_if_no_permission(call, "broadcast.action"):
+        return
+    parts = call.data.split(":")
+    if len(parts) != 3 or not parts[2].isdigit():
+        return await call.answer("Noto‘g‘ri so‘rov.", show_alert=True)
+    action, job_id = parts[1], int(parts[2])
+    handlers = {
+        "pause": (broadcast_engine.pause, "⏸ Pauza qilindi"),
+        "resume": (broadcast_engine.resume, "▶️ Davom ettirilmoqda"),
+        "cancel": (broadcast_engine.cancel, "🛑 Bekor qilindi"),
+    }
+    if action in handlers:
+        func, done_text = handlers[action]
+        ok = await func(job_id)
+        await call.answer(done_text if ok else "Bu holatda amal bajarilmaydi.")
+    else:
+        await call.answer()
+    job = await get_broadcast_job(job_id)
+    if not job:
+        return await safe_edit_text(call.message, "❌ Vazifa topilmadi.", reply_markup=back_to_main_kb())
+    await safe_edit_text(call.message, broadcast_progress_text(job), reply_markup=broadcast_job_kb(job))
 
 
 @router.callback_query(F.data.startswith("users:page:"))
 async def users_pagination(call: types.CallbackQuery):
     if await deny_if_no_permission(call, "users.read"):
         return
-    page = int(call.data.split(":")[2])
     total = await get_user_count()
     if total <= 0:
         return await safe_edit_text(call.message, "👥 Hozircha foydalanuvchilar yo‘q.", reply_markup=back_to_main_kb())
     max_page = max((total - 1) // USERS_PER_PAGE, 0)
-    page = max(0, min(page, max_page))
-    start = page * USERS_PER_PAGE
-    end = start + USERS_PER_PAGE
-    users = await get_all_users(USERS_PER_PAGE, start)
+    users, page, _, prev_ref, next_ref = await load_keyset_page(
+        get_users_page, USERS_PER_PAGE, call.data.split(":")[2:], lambda row: (row[6], row[0]), 2
+    )
+    page = min(page, max_page)
     rows = []
     for u in users:
         name = f"{u[1] or ''} {u[2] or ''}".strip() or "Noma’lum"
         rows.append([InlineKeyboardButton(text=f"{name} ({u[0]})", callback_data=f"user:detail:{u[0]}")])
     nav = []
-    if page > 0:
-        nav.append(InlineKeyboardButton(text="⬅️ Oldingi", callback_data=f"users:page:{page-1}"))
-    if end < total:
-        nav.append(InlineKeyboardButton(text="➡️ Keyingi", callback_data=f"users:page:{page+1}"))
+    if prev_ref:
+        nav.append(InlineKeyboardButton(text="⬅️ Oldingi", callback_data=f"users:page:{prev_ref}"))
+    if next_ref:
+        nav.append(InlineKeyboardButton(text="➡️ Keyingi", callback_data=f"users:page:{next_ref}"))
     if nav:
         rows.append(nav)
     rows.append([InlineKeyboardButton(text="⬅️ Orqaga", callback_data="menu:main")])
-    await safe_edit_text(call.message, f"👥 <b>Foydalanuvchilar</b>\nJami: <b>{len(users)}</b>", reply_markup=InlineKeyboardMarkup(inline_keyboard=rows))
+    await safe_edit_text(
+        call.message,
+        f"👥 <b>Foydalanuvchilar</b>\nSahifa: <b>{page + 1}/{max_page + 1}</b> | Jami: <b>{total}</b>",
+        reply_markup=InlineKeyboardMarkup(inline_keyboard=rows),
+    )
     await call.answer()
 
 
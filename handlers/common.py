@@ -9,13 +9,17 @@ from pathlib import Path
 
 from aiogram import Router, types, F
 from aiogram.enums import ChatMemberStatus
-from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command, CommandObject
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import ChatPermissions, InlineKeyboardButton, InlineKeyboardMarkup
 
 from config import ADMIN_ID
+from services.bad_word_filter import matcher_for
+from services.bot_rights import fetch_bot_rights
+from services.member_counts import member_count_refresher
+from services.rate_limiter import background_requests
 from database import (
     add_panel_admin,
     remove_panel_admin,
@@ -50,14 +54,23 @@ from database import (
     add_whitelist_user,
     get_all_chats,
     get_all_users,
+    get_chats_page,
+    get_users_page,
     get_user_count,
     get_chat_count,
     get_mute_minutes,
     get_referral_chats,
     get_referral_stats,
+    get_referral_summary_page,
+    get_referral_link_stats,
     get_chats_without_referral,
     assign_chat_to_referral,
     get_security_logs,
+    create_broadcast_job,
+    get_broadcast_job,
+    set_broadcast_progress_message,
+    get_security_logs_page,
+    get_export_version,
     get_security_log_count,
     get_settings,
     get_global_settings,
@@ -77,6 +90,7 @@ from database import (
     reset_warning,
     set_mute_minutes,
     update_chat_bot_status,
+    set_user_reachable,
     update_chat_member_count,
     count_referral_chats_member_gt_10,
     update_setting,
@@ -96,6 +110,7 @@ from database import (
     get_stats_summary_cached,
     get_chat_by_id,
     get_referral_chat_count,
+    flush_writes,
 )
 from utils.file_export import (
     export_chats_to_pdf, export_chats_to_txt,
@@ -345,6 +360,7 @@ def main_menu_kb() -> InlineKeyboardMarkup:
             InlineKeyboardButton(text="👥 User TXT", callback_data="export:users:txt"),
             InlineKeyboardButton(text="👥 User PDF", callback_data="export:users:pdf"),
         ],
+        [InlineKeyboardButton(text="🗂 CSV / JSONL eksport", callback_data="export:data")],
         [InlineKeyboardButton(text="🔐 Maxfiy guruh", callback_data="secret:menu")],
     ])
 
@@ -382,6 +398,7 @@ async def panel_menu_kb(user_id: int) -> InlineKeyboardMarkup:
             InlineKeyboardButton(text="👥 User TXT", callback_data="export:users:txt"),
             InlineKeyboardButton(text="👥 User PDF", callback_data="export:users:pdf"),
         ])
+        rows.append([InlineKeyboardButton(text="🗂 CSV / JSONL eksport", callback_data="export:data")])
     if module_has_any(perms, "secret_logs"):
         rows.append([InlineKeyboardButton(text="🔐 Maxfiy guruh", callback_data="secret:menu")])
     if not rows:
@@ -448,20 +465,10 @@ def is_archive(filename: str) -> bool:
 
 
 def contains_bad_word(text: str, words: list[str]) -> bool:
+    """Ro‘yxat avtomati services.bad_word_filter keshidan olinadi (har chaqiruvda qurilmaydi)."""
     if not text or not words:
         return False
-    # Katta ro‘yxatda ham xavfsiz ishlashi uchun eng uzun so‘zlardan boshlaymiz.
-    words = sorted({w.strip().lower() for w in words if w.strip()}, key=len, reverse=True)
-    pattern = r"(?<![\w'])(" + "|".join(re.escape(w) for w in words) + r")(?![\w'])"
-    return bool(re.search(pattern, text.lower(), flags=re.IGNORECASE | re.UNICODE))
-
-
-async def delete_later(message: types.Message, seconds: int = 5):
-    await asyncio.sleep(seconds)
-    try:
-        await message.delete()
-    except Exception:
-        pass
+    return matcher_for(words).search(text)
 
 
 async def mute_user(bot, chat_id: int, user_id: int, minutes: int):
@@ -511,16 +518,11 @@ async def get_chat_link(chat: types.Chat):
 async def refresh_one_chat_status(bot, chat_id: int) -> tuple[int, str]:
     """Telegramdan botning real statusini tekshiradi va bazani yangilaydi."""
     try:
-        bot_id = (await bot.me()).id
-        member = await bot.get_chat_member(chat_id, bot_id)
-        status = getattr(member.status, "value", str(member.status))
-        is_admin = 1 if member.status in {ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.CREATOR} else 0
+        rights = await fetch_bot_rights(bot, chat_id)
+        status = rights["status"]
+        is_admin = 1 if status in {ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.CREATOR} else 0
         await update_chat_bot_status(chat_id, is_admin, status)
         return is_admin, status
-    except (TelegramForbiddenError, TelegramBadRequest):
-        # Bot guruh/kanaldan chiqarilgan, bloklangan yoki chat topilmadi.
-        await update_chat_bot_status(chat_id, 0, "not_member")
-        return 0, "not_member"
     except Exception as exc:
         logger.exception("Chat statusini tekshirishda xato. chat_id=%s: %s", chat_id, exc)
         await update_chat_bot_status(chat_id, 0, "unknown")
@@ -540,23 +542,30 @@ async def refresh_all_chat_statuses(bot):
         async with semaphore:
             return await refresh_one_chat_status(bot, chat_id)
 
-    await asyncio.gather(*(refresh_limited(int(chat[0])) for chat in chats), return_exceptions=True)
+    # gather task'lari kontekstni shu yerdan oladi — so‘rovlar fon ustuvorligida ketadi.
+    with background_requests():
+        await asyncio.gather(*(refresh_limited(int(chat[0])) for chat in chats), return_exceptions=True)
+    await flush_writes()
     return await get_all_chats()
 
 
 
 async def get_chat_member_count_text(bot, chat_id: int) -> str:
-    """Guruh/kanaldagi real a'zolar sonini Telegramdan oladi va bazaga saqlaydi."""
+    """Guruh/kanaldagi real a'zolar sonini Telegramdan oladi va bazaga saqlaydi (umumiy byudjet ichida)."""
     try:
-        count = int(await bot.get_chat_member_count(chat_id))
-        await update_chat_member_count(chat_id, count)
-        return f"{count:,}".replace(",", " ")
-    except (TelegramForbiddenError, TelegramBadRequest):
-        return "bot kira olmaydi"
+        count = await member_count_refresher.fetch(bot, chat_id)
+        return format_member_count(count, 0)
     except Exception as exc:
         logger.warning("A'zolar sonini olishda xato. chat_id=%s error=%s", chat_id, exc)
         return "aniqlanmadi"
 
+def format_member_count(member_count: int | None, member_count_ts: int | None) -> str:
+    """Bazadagi a'zolar sonini ko‘rsatish uchun (Telegramga so‘rov yubormaydi)."""
+    if member_count is not None:
+        return f"{int(member_count):,}".replace(",", " ")
+    return "yangilanmoqda..." if member_count_ts is None else "bot kira olmaydi"
+
+
 def render_bot_status(is_admin: int, bot_status: str | None = None) -> str:
     if bot_status in {"not_member", "left", "kicked"}:
         return "🚪 bot a’zo emas"
@@ -1,4 +1,8 @@
 from .common import *
+from services.bad_word_filter import has_bad_word
+from services.bot_rights import forget_bot_rights, get_bot_rights, remember_bot_member
+from services.delete_scheduler import delete_scheduler, schedule_delete
+from services.member_counts import request_member_count_refresh
 
 router = Router()
 
@@ -27,6 +31,15 @@ async def chat_member_handler(event: types.ChatMemberUpdated):
     chat = event.chat
     old_status = event.old_chat_member.status
     status = event.new_chat_member.status
+    remember_bot_member(chat.id, event.new_chat_member)
+
+    if chat.type == "private":
+        # Foydalanuvchi botni bloklasa "kicked", blokdan chiqarsa "member" keladi.
+        if status == ChatMemberStatus.KICKED:
+            await set_user_reachable(chat.id, False, "blocked")
+        else:
+            await set_user_reachable(chat.id, True)
+        return
 
     if chat.type in {"group", "supergroup", "channel"}:
         is_admin_flag = 1 if _is_admin_status(status) else 0
@@ -40,11 +53,7 @@ async def chat_member_handler(event: types.ChatMemberUpdated):
         )
 
         if _is_active_chat_status(status):
-            try:
-                member_count = int(await event.bot.get_chat_member_count(chat.id))
-                await update_chat_member_count(chat.id, member_count)
-            except Exception as exc:
-                logger.warning("A'zolar sonini saqlab bo‘lmadi. chat_id=%s error=%s", chat.id, exc)
+            request_member_count_refresh([chat.id])
 
         # Referral tracking faqat bot admin qilinganda emas, bot chatga qo‘shilgan
         # har qanday holatda ishlashi kerak. Shunda admin panelda "qo‘shilgan" va
@@ -63,7 +72,7 @@ async def chat_member_handler(event: types.ChatMemberUpdated):
         if chat.type in {"group", "supergroup"} and (became_active or became_admin):
             try:
                 info = await event.bot.send_message(chat.id, GROUP_START_TEXT)
-                asyncio.create_task(delete_later(info, 5))
+                schedule_delete(info, 5)
             except Exception as exc:
                 logger.exception("Guruhga ishga tushish xabarini yuborib bo‘lmadi: %s", exc)
 
@@ -88,21 +97,23 @@ async def service_left_member(message: types.Message):
 
 
 async def get_bot_delete_status(bot, chat_id: int) -> tuple[bool, str]:
-    """Bot guruhdagi xabarlarni o‘chira olishini tekshiradi."""
-    try:
-        me = await bot.get_me()
-        member = await bot.get_chat_member(chat_id, me.id)
-        status = member.status
-        if status == ChatMemberStatus.CREATOR:
-            return True, "creator"
-        if status == ChatMemberStatus.ADMINISTRATOR and getattr(member, "can_delete_messages", False):
-            return True, "administrator_can_delete"
-        if status == ChatMemberStatus.ADMINISTRATOR:
-            return False, "bot admin, lekin xabar o‘chirish huquqi yo‘q"
-        return False, f"bot admin emas: {getattr(status, 'value', status)}"
-    except Exception as exc:
-        logger.exception("Bot delete huquqini tekshirishda xato: %s", exc)
+    """Bot guruhdagi xabarlarni o‘chira olishini tekshiradi (services.bot_rights cache'idan)."""
+    rights = await get_bot_rights(bot, chat_id)
+    status = rights["status"]
+    if status == ChatMemberStatus.CREATOR:
+        return True, "creator"
+    if status == ChatMemberStatus.ADMINISTRATOR and rights["can_delete_messages"]:
+        return True, "administrator_can_delete"
+    if status == ChatMemberStatus.ADMINISTRATOR:
+        return False, "bot admin, lekin xabar o‘chirish huquqi yo‘q"
+    if status == "unknown":
         return False, "bot huquqini tekshirib bo‘lmadi"
+    return False, f"bot admin emas: {status}"
+
+
+async def bot_can_restrict(bot, chat_id: int) -> bool:
+    """Mute qilishdan oldin cache'dagi ``can_restrict_members`` tekshiriladi (API so‘rovisiz)."""
+    return (await get_bot_rights(bot, chat_id))["can_restrict_members"]
 
 
 def file_reason(doc: types.Document, filename: str, settings: dict, unsafe_exts: set[str]) -> str | None:
@@ -198,6 +209,8 @@ async def process_unsafe_document(message: types.Message):
         except Exception as exc:
             logger.exception("Zararli faylni guruhdan o‘chirishda xato: %s", exc)
             delete_status = "delete so‘rovida xato"
+            # Huquq olib qo‘yilgan bo‘lishi mumkin — keyingi safar Telegramdan qayta so‘raladi.
+            forget_bot_rights(message.chat.id)
     else:
         logger.warning("Zararli fayl topildi, lekin bot o‘chira olmadi: %s", delete_status)
 
@@ -224,17 +237,25 @@ async def process_unsafe_document(message: types.Message):
     )
 
     if warn_count >= settings["max_warnings"]:
-        try:
-            await mute_user(message.bot, message.chat.id, message.from_user.id, settings["mute_minutes"])
-            await reset_warning(message.chat.id, message.from_user.id)
-            text += f"\n🔇 Limit oshgani uchun {settings['mute_minutes']} daqiqaga yozish cheklovi qo‘yildi."
-            await add_security_log(message.chat.id, message.from_user.id, "Mute", "fayl ogohlantirish limiti", filename)
-        except Exception as exc:
-            logger.exception("Mute xatosi: %s", exc)
+        if not await bot_can_restrict(message.bot, message.chat.id):
+            # Ogohlantirishlar saqlanadi: huquq berilgach keyingi qoidabuzarlikda mute qilinadi.
+            logger.warning("Mute qilinmadi: botda cheklash huquqi yo‘q. chat_id=%s", message.chat.id)
+        else:
+            try:
+                await mute_user(message.bot, message.chat.id, message.from_user.id, settings["mute_minutes"])
+                await reset_warning(message.chat.id, message.from_user.id)
+                text += f"\n🔇 Limit oshgani uchun {settings['mute_minutes']} daqiqaga yozish cheklovi qo‘yildi."
+                await add_security_log(message.chat.id, message.from_user.id, "Mute", "fayl ogohlantirish limiti", filename)
+            except Exception as exc:
+                logger.exception("Mute xatosi: %s", exc)
+                forget_bot_rights(message.chat.id)
 
+    if delete_scheduler.is_saturated():
+        # Spam to‘lqini: ogohlantirish yozilmaydi (log va hisoblagich saqlangan), API yuklanmaydi.
+        return
     try:
         info = await message.answer(text)
-        asyncio.create_task(delete_later(info, 5))
+        schedule_delete(info, 5)
     except Exception:
         pass
 
@@ -262,8 +283,7 @@ async def bad_words_guard(message: types.Message):
         return
 
     text = message.text or message.caption or ""
-    words = await list_bad_words(message.chat.id)
-    if not contains_bad_word(text, words):
+    if not await has_bad_word(message.chat.id, text):
         return
 
     settings = await get_settings(message.chat.id)
@@ -283,17 +303,23 @@ async def bad_words_guard(message: types.Message):
     )
 
     if warn_count >= settings["max_warnings"]:
-        try:
-            await mute_user(message.bot, message.chat.id, message.from_user.id, settings["mute_minutes"])
-            await reset_warning(message.chat.id, message.from_user.id)
-            warn_text += f"\n🔇 {settings['mute_minutes']} daqiqaga yozish cheklovi qo‘yildi."
-            await add_security_log(message.chat.id, message.from_user.id, "Mute", "yomon so‘z limiti", "")
-        except Exception as exc:
-            logger.exception("Mute xatosi: %s", exc)
+        if not await bot_can_restrict(message.bot, message.chat.id):
+            logger.warning("Mute qilinmadi: botda cheklash huquqi yo‘q. chat_id=%s", message.chat.id)
+        else:
+            try:
+                await mute_user(message.bot, message.chat.id, message.from_user.id, settings["mute_minutes"])
+                await reset_warning(message.chat.id, message.from_user.id)
+                warn_text += f"\n🔇 {settings['mute_minutes']} daqiqaga yozish cheklovi qo‘yildi."
+                await add_security_log(message.chat.id, message.from_user.id, "Mute", "yomon so‘z limiti", "")
+            except Exception as exc:
+                logger.exception("Mute xatosi: %s", exc)
+                forget_bot_rights(message.chat.id)
 
+    if delete_scheduler.is_saturated():
+        return
     try:
         warn = await message.answer(warn_text)
-        asyncio.create_task(delete_later(warn, 5))
+        schedule_delete(warn, 5)
     except Exception:
         pass
 
@@ -1,19 +1,13 @@
 from .common import *
 from urllib.parse import quote
-import asyncio
+from services.bot_rights import get_bot_rights
+from services.delete_scheduler import schedule_delete
 
 router = Router()
 
 ADD_RIGHTS = "delete_messages+restrict_members+invite_users+pin_messages"
 
 
-async def delete_after_5_seconds(message: types.Message):
-    try:
-        await asyncio.sleep(5)
-        await message.delete()
-    except Exception:
-        pass
-
 def add_group_url(bot_username: str, ref_code: str | None = None) -> str:
     """Botni guruh/superguruhga admin qilib qo‘shish uchun direct deep-link."""
     payload = ref_code or "new"
@@ -272,14 +266,8 @@ async def send_public_home(message_or_call, ref_code: str | None = None):
 
 async def _register_started_chat(message: types.Message, payload: str = ""):
     """Guruh/kanalda /start ref_xxx kelganda chatni saqlaydi va referralga bog‘laydi."""
-    try:
-        me = await message.bot.get_me()
-        bot_member = await message.bot.get_chat_member(message.chat.id, me.id)
-        is_bot_admin = 1 if bot_member.status in {ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.CREATOR} else 0
-        bot_status = getattr(bot_member.status, "value", str(bot_member.status))
-    except Exception:
-        is_bot_admin = 0
-        bot_status = "unknown"
+    bot_status = (await get_bot_rights(message.bot, message.chat.id))["status"]
+    is_bot_admin = 1 if bot_status in {ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.CREATOR} else 0
 
     await add_or_update_chat(
         message.chat.id,
@@ -297,6 +285,8 @@ async def _register_started_chat(message: types.Message, payload: str = ""):
 @router.message(Command("start", "panel", "help"))
 async def start_handler(message: types.Message, command: CommandObject):
     await add_or_update_user(message.from_user)
+    if message.chat.type == "private":
+        await set_user_reachable(message.from_user.id, True)
 
     payload = (command.args or "").strip() if command else ""
     # CommandObject args bo‘sh bo‘lsa, textdan ham payloadni ajratib olamiz.
@@ -308,10 +298,7 @@ async def start_handler(message: types.Message, command: CommandObject):
     if message.chat.type in {"group", "supergroup", "channel"}:
         await _register_started_chat(message, payload)
         # Foydalanuvchi yuborgan /start ni o'chirish
-        try:
-            asyncio.create_task(delete_after_5_seconds(message))
-        except Exception:
-            pass
+        schedule_delete(message, 5)
         sent = await message.answer(
             "✅ <b>Bot guruhga muvaffaqiyatli qo‘shildi!</b>\n\n"
             "Botning barcha imkoniyatlaridan foydalanish uchun uni administrator qiling.\n\n"
@@ -321,7 +308,7 @@ async def start_handler(message: types.Message, command: CommandObject):
             "• Guruh xavfsizligini avtomatik nazorat qiladi."
         )
 
-        asyncio.create_task(delete_after_5_seconds(sent))
+        schedule_delete(sent, 5)
         return
 
     # Referral/giper ssilka private chatda saqlanadi.
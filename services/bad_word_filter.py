@@ -0,0 +1,71 @@
+import asyncio
+
+from database import get_bad_words_version, list_bad_words, list_chat_bad_words
+from utils.cache import RuntimeCache
+from utils.word_matcher import WordMatcher
+
+# Katta ro‘yxatlar avtomatini event loopni to‘xtatmasdan threadda quramiz.
+BUILD_IN_THREAD_MIN_WORDS = 500
+
+_EMPTY_MATCHER = WordMatcher(())
+_global_matcher: tuple[int, WordMatcher] | None = None
+_chat_matchers: dict[int, tuple[int, WordMatcher]] = {}
+# Chaqiruvchi o‘zi bergan ro‘yxatlar (contains_bad_word) avtomati — ro‘yxat tarkibi bo‘yicha.
+_list_matchers = RuntimeCache("bad_word_lists", 10 * 60, 256)
+
+
+async def _build(words: list[str]) -> WordMatcher:
+    if not words:
+        return _EMPTY_MATCHER
+    if len(words) >= BUILD_IN_THREAD_MIN_WORDS:
+        return await asyncio.to_thread(WordMatcher, words)
+    return WordMatcher(words)
+
+
+async def get_global_matcher() -> WordMatcher:
+    """Global ro‘yxat avtomati barcha chatlar uchun bitta nusxada saqlanadi."""
+    global _global_matcher
+    # Versiya so‘zlarni o‘qishdan oldin olinadi: o‘qish paytida ro‘yxat o‘zgarsa, keyingi chaqiruv qayta quradi.
+    version = get_bad_words_version(None)
+    cached = _global_matcher
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    matcher = await _build(await list_bad_words(None))
+    _global_matcher = (version, matcher)
+    return matcher
+
+
+async def get_chat_matcher(chat_id: int) -> WordMatcher:
+    """Faqat shu chatga qo‘shilgan so‘zlar avtomati (so‘zi yo‘q chatlar umumiy bo‘sh avtomatni oladi)."""
+    version = get_bad_words_version(chat_id)
+    cached = _chat_matchers.get(chat_id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    matcher = await _build(await list_chat_bad_words(chat_id))
+    _chat_matchers[chat_id] = (version, matcher)
+    return matcher
+
+
+async def find_bad_word(chat_id: int | None, text: str) -> str | None:
+    """Chat uchun birlashgan (global + chat) ro‘yxatdan birinchi topilgan so‘zni qaytaradi."""
+    if not text:
+        return None
+    found = (await get_global_matcher()).find(text)
+    if found is None and chat_id is not None:
+        found = (await get_chat_matcher(chat_id)).find(text)
+    return found
+
+
+async def has_bad_word(chat_id: int | None, text: str) -> bool:
+    return await find_bad_word(chat_id, text) is not None
+
+
+def matcher_for(words) -> WordMatcher:
+    """Berilgan ro‘yxat avtomati; bir xil ro‘yxat uchun qayta qurilmaydi."""
+    key = tuple(sorted({w.strip().lower() for w in words if w and w.strip()}))
+    if not key:
+        return _EMPTY_MATCHER
+    matcher = _list_matchers.get(key, None)
+    if matcher is None:
+        matcher = _list_matchers.set(key, WordMatcher(key))
+    return matcher
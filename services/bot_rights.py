@@ -0,0 +1,95 @@
+"""Botning har bir chatdagi huquqlari uchun xotiradagi cache.
+
+Moderatsiya (zararli fayl, mute) har safar ``get_me`` + ``get_chat_member`` so‘ramasligi
+uchun huquqlar ``my_chat_member`` eventidan to‘ldiriladi — Telegram bot statusi yoki
+admin huquqlari o‘zgarganda shu eventni yuboradi. TTL o‘tgan yozuv darhol qaytariladi
+va fonda yangilanadi; faqat hali umuman ko‘rilmagan chat uchun API kutiladi.
+"""
+import asyncio
+import logging
+import time
+
+from aiogram.enums import ChatMemberStatus
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+
+from config import BOT_RIGHTS_TTL
+
+logger = logging.getLogger(__name__)
+
+_rights: dict[int, tuple[float, dict]] = {}
+_refreshing: dict[int, asyncio.Task] = {}
+
+NOT_MEMBER_RIGHTS = {"status": "not_member", "can_delete_messages": False, "can_restrict_members": False}
+UNKNOWN_RIGHTS = {"status": "unknown", "can_delete_messages": False, "can_restrict_members": False}
+
+
+def _status_value(status) -> str:
+    return getattr(status, "value", str(status))
+
+
+def rights_from_member(member) -> dict:
+    status = member.status
+    if status == ChatMemberStatus.CREATOR:
+        can_delete = can_restrict = True
+    elif status == ChatMemberStatus.ADMINISTRATOR:
+        can_delete = bool(getattr(member, "can_delete_messages", False))
+        can_restrict = bool(getattr(member, "can_restrict_members", False))
+    else:
+        can_delete = can_restrict = False
+    return {"status": _status_value(status), "can_delete_messages": can_delete, "can_restrict_members": can_restrict}
+
+
+def remember_bot_member(chat_id: int, member) -> dict:
+    """my_chat_member yoki get_chat_member natijasini cache'ga yozadi."""
+    rights = rights_from_member(member)
+    _rights[chat_id] = (time.monotonic(), rights)
+    return rights
+
+
+def forget_bot_rights(chat_id: int):
+    """Masalan, o‘chirish so‘rovi huquq yo‘qligi sababli rad etilganda."""
+    _rights.pop(chat_id, None)
+
+
+async def fetch_bot_rights(bot, chat_id: int) -> dict:
+    """Telegramdan botning real huquqlarini oladi va cache'ni yangilaydi."""
+    try:
+        # bot.id tokendan olinadi, get_me so‘rovi kerak emas.
+        member = await bot.get_chat_member(chat_id, bot.id)
+    except (TelegramForbiddenError, TelegramBadRequest):
+        _rights[chat_id] = (time.monotonic(), NOT_MEMBER_RIGHTS)
+        return NOT_MEMBER_RIGHTS
+    return remember_bot_member(chat_id, member)
+
+
+async def _load(bot, chat_id: int) -> dict:
+    try:
+        return await fetch_bot_rights(bot, chat_id)
+    finally:
+        _refreshing.pop(chat_id, None)
+
+
+def _start_refresh(bot, chat_id: int) -> asyncio.Task:
+    task = _refreshing.get(chat_id)
+    if task is None:
+        task = asyncio.create_task(_load(bot, chat_id))
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        _refreshing[chat_id] = task
+    return task
+
+
+async def get_bot_rights(bot, chat_id: int) -> dict:
+    """Cache'dagi huquqlar; eskirgan bo‘lsa fonda yangilanadi, yo‘q bo‘lsa bir marta so‘raladi."""
+    item = _rights.get(chat_id)
+    if item is not None:
+        ts, rights = item
+        if time.monotonic() - ts > BOT_RIGHTS_TTL:
+            _start_refresh(bot, chat_id)
+        return rights
+    try:
+        return await asyncio.shield(_start_refresh(bot, chat_id))
+    except asyncio.CancelledError:
+        raise
+    except Exception as exc:
+        logger.warning("Bot huquqlarini olib bo‘lmadi. chat_id=%s: %s", chat_id, exc)
+        return UNKNOWN_RIGHTS
@@ -0,0 +1,252 @@
+"""Ommaviy xabar (broadcast) vazifalari: bazada saqlanadi, fonda yuboriladi, restartdan keyin davom etadi.
+
+Handler faqat vazifani yaratadi (``create_broadcast_job``) va shu yerga topshiradi.
+Har vazifa uchun bitta runner qabul qiluvchilarni ``BROADCAST_BATCH_SIZE`` tadan
+bazadan oladi, ``BROADCAST_WORKERS`` ta worker bilan ``copy_message`` qiladi va
+natijalarni partiya tugashi bilan bitta commitda yozadi. Tezlikni
+``services/rate_limiter.py`` boshqaradi (broadcast — fon ustuvorligida).
+
+To‘xtatishda (``stop``) yarim partiya natijalari ham yoziladi; faqat jarayon
+kutilmaganda o‘lsa eng ko‘pi bitta partiya qayta yuborilishi mumkin (kamida bir marta).
+Pauza va bekor qilish holati ham bazada turadi.
+Progress xabari ``BROADCAST_PROGRESS_SECONDS`` da bir martadan ko‘p tahrirlanmaydi.
+
+Doimiy xatolar (bot bloklangan/chatdan chiqarilgan, chat topilmadi, akkaunt o‘chirilgan)
+natijalar bilan birga ``users``/``chats`` ga ``is_reachable=0`` qilib yoziladi — keyingi
+broadcast, statistika va exportlar bu qatorlarni o‘tkazib yuboradi.
+"""
+import asyncio
+import logging
+import time
+from html import escape
+
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramNotFound, TelegramRetryAfter
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+from config import BROADCAST_PROGRESS_SECONDS, BROADCAST_WORKERS
+from database import (
+    get_broadcast_job,
+    get_pending_broadcast_recipients,
+    list_broadcast_jobs,
+    save_broadcast_results,
+    set_broadcast_job_status,
+)
+from services.rate_limiter import set_background_priority
+
+logger = logging.getLogger(__name__)
+
+BROADCAST_BATCH_SIZE = 50
+
+# TelegramBadRequest matnidagi doimiy (qayta urinish foydasiz) xatolar.
+_PERMANENT_ERRORS = {
+    "chat not found": "chat_not_found",
+    "peer_id_invalid": "chat_not_found",
+    "user not found": "chat_not_found",
+    "user is deactivated": "deactivated",
+    "bot was blocked by the user": "blocked",
+    "bot was kicked": "kicked",
+    "bot is not a member": "kicked",
+}
+
+_TARGET_LABELS = {"users": "foydalanuvchilar", "chats": "guruhlar", "all": "hammaga"}
+_STATUS_LABELS = {
+    "running": "⏳ Yuborilmoqda",
+    "paused": "⏸ Pauza",
+    "cancelled": "🛑 Bekor qilindi",
+    "done": "✅ Yakunlandi",
+}
+
+
+def unreachable_reason(exc: Exception) -> str | None:
+    """Qabul qiluvchiga endi hech qachon yetib bo‘lmasa — sababi, aks holda None."""
+    if not isinstance(exc, (TelegramForbiddenError, TelegramNotFound, TelegramBadRequest)):
+        return None
+    message = str(exc).lower()
+    for needle, reason in _PERMANENT_ERRORS.items():
+        if needle in message:
+            return reason
+    if isinstance(exc, TelegramForbiddenError):
+        return "forbidden"
+    if isinstance(exc, TelegramNotFound):
+        return "chat_not_found"
+    return None
+
+
+def broadcast_progress_text(job) -> str:
+    job_id, _, target, _, _, _, _, status, total, sent, failed, _, _ = job
+    done = (sent or 0) + (failed or 0)
+    return (
+        f"🖼 <b>Ommaviy xabar #{job_id}</b> — {escape(_TARGET_LABELS.get(target, target))}\n"
+        f"Holat: <b>{_STATUS_LABELS.get(status, status)}</b>\n\n"
+        f"✅ Yuborildi: <b>{sent}</b>\n"
+        f"❌ Xato: <b>{failed}</b>\n"
+        f"📌 Tekshirildi: <b>{done}/{total}</b>"
+    )
+
+
+def broadcast_job_kb(job) -> InlineKeyboardMarkup:
+    job_id, status = job[0], job[7]
+    rows = []
+    if status == "running":
+        rows.append([
+            InlineKeyboardButton(text="⏸ Pauza", callback_data=f"bc:pause:{job_id}"),
+            InlineKeyboardButton(text="🛑 Bekor qilish", callback_data=f"bc:cancel:{job_id}"),
+        ])
+    elif status == "paused":
+        rows.append([
+            InlineKeyboardButton(text="▶️ Davom ettirish", callback_data=f"bc:resume:{job_id}"),
+            InlineKeyboardButton(text="🛑 Bekor qilish", callback_data=f"bc:cancel:{job_id}"),
+        ])
+    if status in {"running", "paused"}:
+        rows.append([InlineKeyboardButton(text="🔄 Yangilash", callback_data=f"bc:refresh:{job_id}")])
+    rows.append([InlineKeyboardButton(text="🏠 Asosiy menyu", callback_data="menu:main")])
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+class BroadcastEngine:
+    def __init__(self, workers: int = BROADCAST_WORKERS, batch_size: int = BROADCAST_BATCH_SIZE,
+                 progress_interval: float = BROADCAST_PROGRESS_SECONDS):
+        self.workers = max(int(workers), 1)
+        self.batch_size = int(batch_size)
+        self.progress_interval = float(progress_interval)
+        self._runners: dict[int, asyncio.Task] = {}
+        # Pauza/bekor qilingan vazifalar: workerlar keyingi qabul qiluvchini olmaydi.
+        self._stopping: set[int] = set()
+        # Pauza tugamasdan davom ettirilgan vazifalar.
+        self._relaunch: set[int] = set()
+        self.bot = None
+
+    async def start(self, bot):
+        """Restartdan oldin ishlayotgan vazifalarni davom ettiradi (pauzadagilar kutib turadi)."""
+        self.bot = bot
+        jobs = await list_broadcast_jobs(("running",))
+        for job_id, _ in jobs:
+            self.launch(job_id)
+        if jobs:
+            logger.info("%s ta broadcast vazifasi davom ettirildi", len(jobs))
+
+    async def stop(self):
+        # Holat bazada "running" qoladi — keyingi startda davom etadi.
+        self._relaunch.clear()
+        tasks = list(self._runners.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._runners.clear()
+
+    def launch(self, job_id: int):
+        task = self._runners.get(job_id)
+        if task is not None and not task.done():
+            if job_id in self._stopping:
+                # Eski runner pauzadan oldingi partiyani tugatyapti — u chiqqach qayta ishga tushadi.
+                self._relaunch.add(job_id)
+            return
+        self._stopping.discard(job_id)
+        task = asyncio.create_task(self._run(job_id))
+        self._runners[job_id] = task
+        task.add_done_callback(lambda finished: self._runner_done(job_id, finished))
+
+    def _runner_done(self, job_id: int, task: asyncio.Task):
+        if job_id in self._relaunch and not task.cancelled():
+            self._relaunch.discard(job_id)
+            # Yangi runner holatni bazadan o‘qiydi: yana pauza qilingan bo‘lsa darhol chiqadi.
+            self.launch(job_id)
+
+    async def pause(self, job_id: int) -> bool:
+        if not await set_broadcast_job_status(job_id, "paused", ("running",)):
+            return False
+        self._stopping.add(job_id)
+        return True
+
+    async def resume(self, job_id: int) -> bool:
+        if not await set_broadcast_job_status(job_id, "running", ("paused",)):
+            return False
+        self.launch(job_id)
+        return True
+
+    async def cancel(self, job_id: int) -> bool:
+        if not await set_broadcast_job_status(job_id, "cancelled", ("running", "paused")):
+            return False
+        self._stopping.add(job_id)
+        return True
+
+    async def _send_batch(self, job_id: int, chat_ids: list[int], from_chat_id: int, message_id: int,
+                          results: list[tuple[int, str, str | None]], unreachable: list[tuple[int, str]]):
+        pending = iter(chat_ids)
+
+        async def worker():
+            for chat_id in pending:
+                if job_id in self._stopping:
+                    return
+                try:
+                    await self.bot.copy_message(chat_id, from_chat_id, message_id)
+                    results.append((chat_id, "sent", None))
+                except TelegramRetryAfter:
+                    # Limiter qayta urinib ham bo‘lmadi — qabul qiluvchi "pending" qoladi, keyingi aylanishda yuboriladi.
+                    continue
+                except Exception as exc:
+                    results.append((chat_id, "failed", str(exc)[:200]))
+                    reason = unreachable_reason(exc)
+                    if reason:
+                        unreachable.append((chat_id, reason))
+
+        await asyncio.gather(*(worker() for _ in range(min(self.workers, len(chat_ids)))))
+
+    async def _report(self, job_id: int):
+        job = await get_broadcast_job(job_id)
+        if not job or not job[5] or not job[6]:
+            return
+        try:
+            await self.bot.edit_message_text(
+                broadcast_progress_text(job), chat_id=job[5], message_id=job[6], reply_markup=broadcast_job_kb(job)
+            )
+        except TelegramBadRequest as exc:
+            if "message is not modified" not in str(exc).lower():
+                logger.debug("Broadcast progress xabarini tahrirlab bo‘lmadi. job_id=%s: %s", job_id, exc)
+        except Exception as exc:
+            logger.debug("Broadcast progress xabarini tahrirlab bo‘lmadi. job_id=%s: %s", job_id, exc)
+
+    async def _run(self, job_id: int):
+        set_background_priority()
+        job = await get_broadcast_job(job_id)
+        if not job or job[7] != "running":
+            return
+        from_chat_id, message_id = job[3], job[4]
+        after = None
+        deferred = False
+        last_report = time.monotonic()
+        try:
+            while job_id not in self._stopping:
+                batch = await get_pending_broadcast_recipients(job_id, self.batch_size, after)
+                if not batch:
+                    if deferred:
+                        # RetryAfter sababli qolib ketganlar uchun boshidan yana bir aylanish.
+                        after, deferred = None, False
+                        await asyncio.sleep(1)
+                        continue
+                    await set_broadcast_job_status(job_id, "done", ("running",))
+                    break
+                after = batch[-1]
+                results: list[tuple[int, str, str | None]] = []
+                unreachable: list[tuple[int, str]] = []
+                try:
+                    await self._send_batch(job_id, batch, from_chat_id, message_id, results, unreachable)
+                except asyncio.CancelledError:
+                    # Bot to‘xtayapti: yuborilganlarni yozib qo‘yamiz, restartda ular qayta ketmaydi.
+                    await save_broadcast_results(job_id, results, unreachable)
+                    raise
+                if len(results) < len(batch):
+                    deferred = True
+                await save_broadcast_results(job_id, results, unreachable)
+                if time.monotonic() - last_report >= self.progress_interval:
+                    last_report = time.monotonic()
+                    await self._report(job_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Broadcast vazifasi xatoga uchradi. job_id=%s", job_id)
+        self._stopping.discard(job_id)
+        await self._report(job_id)
+
+
+broadcast_engine = BroadcastEngine()
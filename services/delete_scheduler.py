@@ -0,0 +1,131 @@
+"""Bot xabarlarini kechiktirib o‘chirish uchun yagona rejalashtiruvchi.
+
+Oldin har ogohlantirish/"/start" javobi uchun alohida ``asyncio.create_task`` 5 soniya
+uxlab turardi: spam to‘lqinida minglab task, restartda esa hammasi yo‘qolardi.
+Endi barcha xabarlar bitta heapda (muddat bo‘yicha) turadi, bitta task ularni
+vaqti kelganda chat bo‘yicha guruhlab ``deleteMessages`` (100 tagacha) bilan o‘chiradi.
+
+Navbat ``DELETE_QUEUE_MAX`` dan oshsa yangi xabarlar kutmasdan o‘chiriladi va
+``is_saturated()`` handlerlarga ortiqcha ogohlantirish yubormaslik uchun signal beradi.
+``DELETE_PERSIST`` yoqilgan bo‘lsa navbat bazada ham saqlanadi va start paytida tiklanadi.
+"""
+import asyncio
+import heapq
+import logging
+import time
+from itertools import groupby
+
+from aiogram.exceptions import TelegramRetryAfter
+
+from config import DELETE_CONCURRENCY, DELETE_PERSIST, DELETE_QUEUE_MAX
+from database import add_pending_deletion, list_pending_deletions, remove_pending_deletion
+
+logger = logging.getLogger(__name__)
+
+# Telegram deleteMessages bir so‘rovda shuncha xabar qabul qiladi.
+DELETE_BATCH_LIMIT = 100
+# Muddati shuncha soniya ichida keladigan xabarlar ham bitta partiyaga qo‘shiladi.
+DELETE_COALESCE_SECONDS = 0.5
+
+
+class DeleteScheduler:
+    def __init__(self, max_pending: int = DELETE_QUEUE_MAX, concurrency: int = DELETE_CONCURRENCY, persist: bool = DELETE_PERSIST):
+        self.max_pending = max_pending
+        self.persist = persist
+        # (due_at, chat_id, message_id); due_at — unix vaqt, restartdan keyin ham ma'noli.
+        self._heap: list[tuple[float, int, int]] = []
+        self._wakeup = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._task: asyncio.Task | None = None
+        self.bot = None
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def is_saturated(self) -> bool:
+        return len(self._heap) >= self.max_pending
+
+    def schedule(self, chat_id: int, message_id: int, delay: float = 5):
+        if self.is_saturated():
+            # Backpressure: navbat to‘lgan — xabar kutmasdan o‘chiriladi, heap cheksiz o‘smaydi.
+            delay = 0
+        due_at = time.time() + delay
+        if self.persist:
+            add_pending_deletion(chat_id, message_id, due_at)
+        self._push(due_at, chat_id, message_id)
+
+    def _push(self, due_at: float, chat_id: int, message_id: int):
+        heapq.heappush(self._heap, (due_at, chat_id, message_id))
+        if self._heap[0][0] == due_at:
+            # Yangi eng yaqin muddat — uxlayotgan loopni uyg‘otamiz.
+            self._wakeup.set()
+
+    async def start(self, bot):
+        self.bot = bot
+        if self.persist:
+            for chat_id, message_id, due_at in await list_pending_deletions():
+                self._push(float(due_at), int(chat_id), int(message_id))
+            if self._heap:
+                logger.info("Restartdan oldingi %s ta xabar o‘chirish navbatiga qaytarildi", len(self._heap))
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        # Qolgan xabarlar bazada turadi (persist) va keyingi startda o‘chiriladi.
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            horizon = time.time() + DELETE_COALESCE_SECONDS
+            due = []
+            while self._heap and self._heap[0][0] <= horizon:
+                _, chat_id, message_id = heapq.heappop(self._heap)
+                due.append((chat_id, message_id))
+            due.sort()
+            jobs = []
+            for chat_id, items in groupby(due, key=lambda item: item[0]):
+                ids = [message_id for _, message_id in items]
+                for i in range(0, len(ids), DELETE_BATCH_LIMIT):
+                    jobs.append(self._delete(chat_id, ids[i:i + DELETE_BATCH_LIMIT]))
+            await asyncio.gather(*jobs)
+
+    async def _delete(self, chat_id: int, message_ids: list[int]):
+        async with self._semaphore:
+            try:
+                if len(message_ids) == 1:
+                    await self.bot.delete_message(chat_id, message_ids[0])
+                else:
+                    await self.bot.delete_messages(chat_id, message_ids)
+            except TelegramRetryAfter as exc:
+                due_at = time.time() + exc.retry_after
+                for message_id in message_ids:
+                    self._push(due_at, chat_id, message_id)
+                return
+            except Exception as exc:
+                # Xabar allaqachon o‘chirilgan yoki huquq yo‘q — qayta urinish foydasiz.
+                logger.debug("Xabarlarni o‘chirib bo‘lmadi. chat_id=%s ids=%s: %s", chat_id, message_ids, exc)
+        if self.persist:
+            for message_id in message_ids:
+                remove_pending_deletion(chat_id, message_id)
+
+
+delete_scheduler = DeleteScheduler()
+
+
+def schedule_delete(message, delay: float = 5):
+    """Xabarni ``delay`` soniyadan keyin o‘chirishga navbatga qo‘yadi."""
+    delete_scheduler.schedule(message.chat.id, message.message_id, delay)
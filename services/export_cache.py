@@ -0,0 +1,121 @@
+"""Tayyor export fayllari keshi (kalit — export turi + ma'lumot versiyasi).
+
+Versiya ``get_export_version`` dan olinadi (qatorlar soni, oxirgi ``updated_at``,
+id yig‘indisi). Ma'lumot o‘zgarmagan bo‘lsa fayl qayta yaratilmaydi: birinchi
+yuborishdagi Telegram ``file_id`` qayta ishlatiladi, u ishlamasa diskdagi fayl yuboriladi.
+
+- fayl avval ``EXPORT_DIR/tmp-<uuid>`` ga yoziladi va tayyor bo‘lgach kalit nomiga
+  ko‘chiriladi — bir vaqtdagi bosishlar bitta faylga yozib bir-birini buzmaydi;
+- bir xil kalit uchun parallel so‘rovlar bitta tayyorlashni kutadi;
+- yangi versiya yozilganda shu turdagi eski fayllar o‘chiriladi, qolganlari
+  ``EXPORT_CACHE_MAX_FILES`` (LRU) va ``EXPORT_CACHE_TTL`` bo‘yicha tozalanadi.
+"""
+import asyncio
+import glob
+import hashlib
+import logging
+import os
+import re
+import uuid
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import FSInputFile
+
+from config import EXPORT_CACHE_MAX_FILES, EXPORT_CACHE_TTL, EXPORT_DIR
+from database import (
+    evict_export_files,
+    forget_export_file,
+    get_export_file,
+    save_export_file,
+    set_export_file_id,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _remove(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class ExportCache:
+    def __init__(self, directory: str = EXPORT_DIR, max_files: int = EXPORT_CACHE_MAX_FILES,
+                 ttl: int = EXPORT_CACHE_TTL):
+        self.directory = directory
+        self.max_files = int(max_files)
+        self.ttl = int(ttl)
+        self._building: dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.builds = 0
+
+    @staticmethod
+    def cache_key(kind: str, version: tuple) -> str:
+        return hashlib.sha256(repr((kind, version)).encode("utf-8")).hexdigest()[:32]
+
+    def temp_path(self, ext: str) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        return os.path.join(self.directory, f"tmp-{uuid.uuid4().hex}.{ext}")
+
+    async def start(self):
+        """Oldingi ishga tushirishdan qolgan yarim fayllarni va eskirganlarni tozalaydi."""
+        _remove(glob.glob(os.path.join(self.directory, "tmp-*")))
+        await self.evict()
+
+    async def evict(self):
+        _remove(await evict_export_files(self.max_files, self.ttl))
+
+    async def get(self, kind: str, version: tuple, ext: str, build) -> tuple[str, str, str | None]:
+        """``(kalit, fayl yo‘li, file_id)``; kerak bo‘lsa ``await build(path)`` bilan tayyorlaydi."""
+        key = self.cache_key(kind, version)
+        row = await get_export_file(key)
+        if row:
+            path, file_id = row
+            if file_id or os.path.exists(path):
+                self.hits += 1
+                return key, path, file_id
+            await forget_export_file(key)
+        task = self._building.get(key)
+        if task is None:
+            task = asyncio.create_task(self._build(key, kind, ext, build))
+            self._building[key] = task
+            task.add_done_callback(lambda _: self._building.pop(key, None))
+        # Kutayotgan bitta handler bekor qilinsa ham tayyorlash boshqalar uchun davom etadi.
+        return key, await asyncio.shield(task), None
+
+    async def _build(self, key: str, kind: str, ext: str, build) -> str:
+        tmp = self.temp_path(ext)
+        path = os.path.join(self.directory, f"{re.sub(r'[^a-zA-Z0-9_-]+', '_', kind)}-{key[:16]}.{ext}")
+        try:
+            await build(tmp)
+            os.replace(tmp, path)
+        except BaseException:
+            _remove([tmp])
+            raise
+        self.builds += 1
+        stale = await save_export_file(key, kind, path, os.path.getsize(path))
+        _remove(item for item in stale if item != path)
+        await self.evict()
+        return path
+
+    async def send(self, message, kind: str, version: tuple, ext: str, build, filename: str, caption: str | None = None):
+        """Faylni yuboradi: avval saqlangan file_id, bo‘lmasa diskdagi (yoki yangi tayyorlangan) fayl."""
+        key, path, file_id = await self.get(kind, version, ext, build)
+        if file_id:
+            try:
+                return await message.answer_document(file_id, caption=caption)
+            except TelegramBadRequest as exc:
+                logger.warning("Export file_id ishlamadi, fayl qayta yuboriladi. kind=%s: %s", kind, exc)
+                await set_export_file_id(key, None)
+                if not os.path.exists(path):
+                    await forget_export_file(key)
+                    key, path, _ = await self.get(kind, version, ext, build)
+        sent = await message.answer_document(FSInputFile(path, filename=filename), caption=caption)
+        if sent.document:
+            await set_export_file_id(key, sent.document.file_id)
+        return sent
+
+
+export_cache = ExportCache()
@@ -0,0 +1,172 @@
+"""Chat va foydalanuvchi exportlari: bazadan oqim bilan o‘qish, fonda faylga yozish.
+
+Qatorlar ``EXPORT_CHUNK_ROWS`` tadan alohida (pool'ni band qilmaydigan) ulanishdan
+o‘qiladi. TXT har partiyada worker threadda yoziladi. PDF esa ``ProcessPoolExecutor``
+da chiziladi (``utils/pdf_render.py``): ro‘yxat ``PDF_RANGE_PAGES`` sahifalik
+oraliqlarga bo‘linadi, oraliqlar ``PDF_RENDER_PROCESSES`` ta jarayonda parallel
+chiziladi va oxirida bitta faylga birlashtiriladi. Event loop faqat partiyalarni
+uzatadi, shuning uchun 200k qatorli PDF paytida ham moderatsiya to‘xtamaydi.
+Bir vaqtda ``EXPORT_CONCURRENCY`` tadan ortiq export tayyorlanmaydi.
+
+CSV va gzip JSONL (``export_data_file``) to‘g‘ridan-to‘g‘ri kursordan yoziladi va
+``EXPORT_PART_MAX_MB`` dan oshganda qismlarga bo‘linadi (Telegram yuklash limiti).
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import aclosing
+
+from config import EXPORT_CHUNK_ROWS, EXPORT_CONCURRENCY, EXPORT_PART_MAX_MB, PDF_RANGE_PAGES, PDF_RENDER_PROCESSES
+from database import (
+    DATA_EXPORTS,
+    get_chat_count,
+    get_user_count,
+    iter_chats,
+    iter_data_export,
+    iter_referral_chats,
+    iter_users,
+)
+from utils.file_export import RecordExport, ReferralXlsxExport, open_chats_export, open_users_export
+from utils.pdf_render import can_merge, merge_pdfs, render_pdf_range, rows_per_page
+
+logger = logging.getLogger(__name__)
+
+_slots = asyncio.Semaphore(max(int(EXPORT_CONCURRENCY), 1))
+_pdf_pool: ProcessPoolExecutor | None = None
+
+
+def _render_pool() -> ProcessPoolExecutor:
+    global _pdf_pool
+    if _pdf_pool is None:
+        # fork emas: ota jarayonda aiosqlite threadlari va event loop bor.
+        _pdf_pool = ProcessPoolExecutor(
+            max_workers=max(int(PDF_RENDER_PROCESSES), 1),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pdf_pool
+
+
+def shutdown_pdf_pool():
+    global _pdf_pool
+    if _pdf_pool is not None:
+        _pdf_pool.shutdown(wait=False, cancel_futures=True)
+        _pdf_pool = None
+
+
+def _remove(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+async def _write_stream(chunks, open_export) -> str | list[str]:
+    """``open_export`` (fayl ochish) ham, yozish va yopish ham threadda bajariladi."""
+    async with _slots:
+        started = time.monotonic()
+        export = await asyncio.to_thread(open_export)
+        try:
+            async with aclosing(chunks):
+                async for rows in chunks:
+                    await asyncio.to_thread(export.write, rows)
+            path = await asyncio.to_thread(export.close)
+        except BaseException:
+            await asyncio.to_thread(export.abort)
+            raise
+        logger.info("Export tayyor: %s (%s qator, %.1f s)", path, export.count, time.monotonic() - started)
+        return path
+
+
+async def _render_pdf(chunks, kind: str, title: str, filename: str) -> str:
+    """Oraliqlarni jarayonlarga taqsimlaydi; navbatda jarayonlar sonidan ikki baravar ko‘p oraliq turmaydi."""
+    async with _slots:
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+        pool = _render_pool()
+        per_page = rows_per_page()
+        # pypdf bo‘lmasa qismlarni birlashtirib bo‘lmaydi — butun ro‘yxat bitta oraliq.
+        range_rows = max(int(PDF_RANGE_PAGES), 1) * per_page if can_merge() else None
+        max_inflight = max(int(PDF_RENDER_PROCESSES), 1) * 2
+        futures: list[asyncio.Future] = []
+        parts: list[str] = []
+        buffer: list = []
+        submitted = 0
+
+        async def submit(rows):
+            nonlocal submitted
+            pending = [future for future in futures if not future.done()]
+            if len(pending) >= max_inflight:
+                await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            part = f"{filename}.{len(parts)}.part"
+            parts.append(part)
+            futures.append(loop.run_in_executor(
+                pool, render_pdf_range, part, kind, title, rows, submitted + 1, submitted // per_page + 1
+            ))
+            submitted += len(rows)
+
+        try:
+            async with aclosing(chunks):
+                async for rows in chunks:
+                    buffer.extend(rows)
+                    while range_rows and len(buffer) >= range_rows:
+                        await submit(buffer[:range_rows])
+                        buffer = buffer[range_rows:]
+            if buffer or not futures:
+                await submit(buffer)
+            results = await asyncio.gather(*futures)
+            if len(parts) == 1:
+                os.replace(parts[0], filename)
+            else:
+                await asyncio.to_thread(merge_pdfs, parts, filename)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            await asyncio.gather(*futures, return_exceptions=True)
+            _remove(parts)
+            raise
+        logger.info(
+            "PDF export tayyor: %s (%s qator, %s sahifa, %s oraliq, %.1f s)",
+            filename, submitted, sum(pages for _, pages in results), len(parts), time.monotonic() - started,
+        )
+        return filename
+
+
+async def export_chats_file(fmt: str, filename: str | None = None, reachable_only: bool = True) -> str:
+    filename = filename or f"chats.{fmt}"
+    chunks = iter_chats(EXPORT_CHUNK_ROWS, reachable_only)
+    if fmt == "pdf":
+        total = await get_chat_count(reachable_only)
+        return await _render_pdf(chunks, "chats", f"Guruh/kanallar ro‘yxati — jami {total}", filename)
+    return await _write_stream(chunks, lambda: open_chats_export(fmt, filename))
+
+
+async def export_users_file(fmt: str, filename: str | None = None, reachable_only: bool = True) -> str:
+    filename = filename or f"users.{fmt}"
+    total = await get_user_count(reachable_only)
+    chunks = iter_users(EXPORT_CHUNK_ROWS, reachable_only)
+    if fmt == "pdf":
+        return await _render_pdf(chunks, "users", f"Foydalanuvchilar ro‘yxati — jami {total}", filename)
+    return await _write_stream(chunks, lambda: open_users_export(fmt, filename, total))
+
+
+async def export_referral_chats_xlsx(filename: str = "giper_links.xlsx") -> str:
+    """Barcha giper ssilkalar chatlari bitta Excel varag‘ida (write_only, oqim bilan)."""
+    return await _write_stream(iter_referral_chats(EXPORT_CHUNK_ROWS), lambda: ReferralXlsxExport(filename))
+
+
+DATA_FORMATS = {"csv": "csv", "jsonl": "jsonl.gz"}
+
+
+async def export_data_file(dataset: str, fmt: str, filename: str) -> list[str]:
+    """``DATA_EXPORTS`` jadvali CSV yoki gzip JSONL ko‘rinishida; qism fayllar yo‘llari qaytadi."""
+    if dataset not in DATA_EXPORTS or fmt not in DATA_FORMATS:
+        raise ValueError(f"Noma’lum export: {dataset}/{fmt}")
+    columns, _ = DATA_EXPORTS[dataset]
+    max_bytes = int(EXPORT_PART_MAX_MB * 1024 * 1024)
+    return await _write_stream(
+        iter_data_export(dataset, EXPORT_CHUNK_ROWS), lambda: RecordExport(fmt, filename, columns, max_bytes)
+    )
@@ -0,0 +1,218 @@
+"""Chatlar a'zolar sonini fonda yangilaydigan yagona servis.
+
+Ro‘yxatlar, referral sahifalari va exportlar a'zolar sonini faqat bazadan
+(``chats.member_count``) o‘qiydi. Telegramga ``getChatMemberCount`` so‘rovlarini
+faqat shu servis yuboradi:
+
+- navbat — heap: avval aniq so‘rovlar (sahifa ochildi, bot chatga qo‘shildi),
+  keyin fon tekshiruvi topgan eskirgan chatlar "kechikish darajasi" bo‘yicha
+  (yoshi / ruxsat etilgan yoshi; hali olinmaganlar eng oldinda);
+- muhim chatlar (bot admin yoki referral orqali kelgan) uchun ruxsat etilgan yosh
+  ``MEMBER_COUNT_PRIORITY_MAX_AGE``, qolganlari uchun ``MEMBER_COUNT_MAX_AGE``;
+- Telegramga sekundiga ``MEMBER_COUNT_RATE`` tadan, bir vaqtda
+  ``MEMBER_COUNT_CONCURRENCY`` tadan ortiq so‘rov ketmaydi, RetryAfter kelsa butun
+  navbat kutadi;
+- har ``MEMBER_COUNT_SWEEP_SECONDS`` da bazadan eskirgan chatlar navbatga olinadi
+  (bir aylanishda byudjetga sig‘adigan qadar).
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+
+from config import (
+    MEMBER_COUNT_CONCURRENCY,
+    MEMBER_COUNT_MAX_AGE,
+    MEMBER_COUNT_PRIORITY_MAX_AGE,
+    MEMBER_COUNT_RATE,
+    MEMBER_COUNT_SWEEP_SECONDS,
+)
+from database import list_stale_member_counts, update_chat_member_count
+from services.rate_limiter import set_background_priority
+
+logger = logging.getLogger(__name__)
+
+# Navbat darajalari: aniq so‘rovlar fon tekshiruvidan oldin bajariladi.
+URGENT = 0
+BACKGROUND = 1
+
+
+def is_member_count_stale(updated_ts: int | None, important: bool = False, now: float | None = None) -> bool:
+    """``updated_ts`` — member_count_updated_at (unix soniya), None — hali olinmagan."""
+    if updated_ts is None:
+        return True
+    now = time.time() if now is None else now
+    max_age = MEMBER_COUNT_PRIORITY_MAX_AGE if important else MEMBER_COUNT_MAX_AGE
+    return now - int(updated_ts) > max_age
+
+
+async def fetch_member_count(bot, chat_id: int) -> int | None:
+    """Telegramdan a'zolar sonini olib bazaga yozadi; bot kira olmasa None saqlanadi."""
+    try:
+        count = int(await bot.get_chat_member_count(chat_id))
+    except (TelegramForbiddenError, TelegramBadRequest):
+        count = None
+    await update_chat_member_count(chat_id, count)
+    return count
+
+
+class MemberCountRefresher:
+    def __init__(
+        self,
+        rate: float = MEMBER_COUNT_RATE,
+        concurrency: int = MEMBER_COUNT_CONCURRENCY,
+        sweep_interval: float = MEMBER_COUNT_SWEEP_SECONDS,
+    ):
+        self.rate = max(float(rate), 0.1)
+        self.sweep_interval = float(sweep_interval)
+        # (daraja, -kechikish, tartib, chat_id); eskirgan yozuvlar olishda tashlab ketiladi.
+        self._heap: list[tuple[int, float, int, int]] = []
+        self._queued: dict[int, tuple[int, float, int, int]] = {}
+        self._inflight: set[int] = set()
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._next_slot = 0.0
+        self._tasks: set[asyncio.Task] = set()
+        self._loops: list[asyncio.Task] = []
+        self.bot = None
+        self.fetched = 0
+        self.failed = 0
+
+    def __len__(self) -> int:
+        return len(self._queued)
+
+    def request(self, chat_ids, urgent: bool = True, overdue: float = 0.0) -> int:
+        """Chatlarni navbatga qo‘yadi; nechta yangi yozuv qo‘shilganini qaytaradi."""
+        tier = URGENT if urgent else BACKGROUND
+        added = 0
+        for chat_id in chat_ids:
+            chat_id = int(chat_id)
+            if chat_id in self._inflight:
+                continue
+            entry = (tier, -float(overdue), next(self._seq), chat_id)
+            current = self._queued.get(chat_id)
+            if current is not None and current[:2] <= entry[:2]:
+                continue
+            self._queued[chat_id] = entry
+            heapq.heappush(self._heap, entry)
+            added += 1
+        if added:
+            self._wakeup.set()
+        return added
+
+    def _pop(self) -> int | None:
+        while self._heap:
+            entry = heapq.heappop(self._heap)
+            chat_id = entry[3]
+            if self._queued.get(chat_id) is entry:
+                del self._queued[chat_id]
+                return chat_id
+        return None
+
+    async def _take_slot(self):
+        """Global byudjet: so‘rovlar orasida kamida 1/rate soniya."""
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + 1 / self.rate
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def _pause(self, seconds: float):
+        self._next_slot = max(self._next_slot, time.monotonic() + seconds)
+
+    async def fetch(self, bot, chat_id: int) -> int | None:
+        """Bitta chatni darhol (lekin byudjet ichida) yangilaydi, masalan detail sahifasida."""
+        chat_id = int(chat_id)
+        self._queued.pop(chat_id, None)
+        self._inflight.add(chat_id)
+        try:
+            async with self._semaphore:
+                await self._take_slot()
+                try:
+                    return await fetch_member_count(bot, chat_id)
+                except TelegramRetryAfter as exc:
+                    self._pause(exc.retry_after)
+                    raise
+        finally:
+            self._inflight.discard(chat_id)
+
+    async def _refresh(self, chat_id: int):
+        try:
+            await fetch_member_count(self.bot, chat_id)
+            self.fetched += 1
+        except TelegramRetryAfter as exc:
+            self._pause(exc.retry_after)
+            self._inflight.discard(chat_id)
+            self.request([chat_id])
+        except Exception as exc:
+            # Tarmoq xatosi: hech narsa yozilmaydi, keyingi tekshiruvda yana navbatga tushadi.
+            self.failed += 1
+            logger.warning("A'zolar sonini yangilashda xato. chat_id=%s error=%s", chat_id, exc)
+        finally:
+            self._inflight.discard(chat_id)
+            self._semaphore.release()
+
+    async def _run(self):
+        set_background_priority()
+        while True:
+            self._wakeup.clear()
+            chat_id = self._pop()
+            if chat_id is None:
+                await self._wakeup.wait()
+                continue
+            self._inflight.add(chat_id)
+            await self._semaphore.acquire()
+            await self._take_slot()
+            task = asyncio.create_task(self._refresh(chat_id))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def sweep_once(self) -> int:
+        """Bazadan eskirgan chatlarni olib fon navbatiga qo‘shadi."""
+        # Bir aylanishda byudjet ko‘tara oladigandan ortig‘ini olish foydasiz.
+        limit = max(int(self.rate * self.sweep_interval), 1)
+        rows = await list_stale_member_counts(MEMBER_COUNT_MAX_AGE, MEMBER_COUNT_PRIORITY_MAX_AGE, limit)
+        added = 0
+        for chat_id, overdue in rows:
+            added += self.request([chat_id], urgent=False, overdue=overdue)
+        return added
+
+    async def _sweep_loop(self):
+        set_background_priority()
+        await asyncio.sleep(10)
+        while True:
+            try:
+                added = await self.sweep_once()
+                if added:
+                    logger.info(
+                        "A'zolar soni: %s ta eskirgan chat navbatga qo‘shildi (navbat=%s, olingan=%s, xato=%s)",
+                        added, len(self), self.fetched, self.failed,
+                    )
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("A'zolar soni fon tekshiruvi xatoga uchradi")
+            await asyncio.sleep(self.sweep_interval)
+
+    async def start(self, bot):
+        self.bot = bot
+        self._loops = [asyncio.create_task(self._run()), asyncio.create_task(self._sweep_loop())]
+
+    async def stop(self):
+        tasks = self._loops + list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._loops = []
+
+
+member_count_refresher = MemberCountRefresher()
+
+
+def request_member_count_refresh(chat_ids) -> int:
+    """Chatlar a'zolar sonini navbatdan tashqari (birinchi navbatda) yangilashni so‘raydi."""
+    return member_count_refresher.request(chat_ids)
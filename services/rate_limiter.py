@@ -0,0 +1,265 @@
+"""Telegram Bot API so‘rovlari uchun umumiy tezlik cheklovchi (aiogram session middleware).
+
+Bot yuboradigan har bir so‘rov shu yerdan o‘tadi:
+
+- global token-bucket: sekundiga ``TELEGRAM_GLOBAL_RATE`` ta so‘rov (Telegram: ~30 xabar/s);
+- har guruh/kanal uchun xabar yuborish limiti: daqiqasiga ``TELEGRAM_GROUP_PER_MINUTE`` ta;
+- navbat ustuvorlik bo‘yicha: moderatsiya (o‘chirish, cheklash, ban) birinchi,
+  oddiy javoblar keyin, fon ishlari (a'zolar soni, status tekshiruvi, broadcast) oxirida;
+- ``TelegramRetryAfter`` kelsa tegishli chat (yoki butun bot) shuncha vaqt to‘xtaydi
+  va so‘rov ``TELEGRAM_RETRY_MAX`` martagacha avtomatik qayta yuboriladi.
+
+Fon ishlari o‘z task'ida ``set_background_priority()`` ni chaqiradi yoki
+``background_requests()`` konteksti ichida so‘rov yuboradi.
+"""
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import time
+from contextlib import contextmanager
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import (
+    BanChatMember,
+    BanChatSenderChat,
+    CopyMessage,
+    CopyMessages,
+    DeleteMessage,
+    DeleteMessages,
+    ForwardMessage,
+    ForwardMessages,
+    GetChatMemberCount,
+    GetUpdates,
+    RestrictChatMember,
+    SendAnimation,
+    SendAudio,
+    SendContact,
+    SendDice,
+    SendDocument,
+    SendLocation,
+    SendMediaGroup,
+    SendMessage,
+    SendPhoto,
+    SendPoll,
+    SendSticker,
+    SendVenue,
+    SendVideo,
+    SendVideoNote,
+    SendVoice,
+    UnbanChatMember,
+)
+
+from config import TELEGRAM_GLOBAL_RATE, TELEGRAM_GROUP_PER_MINUTE, TELEGRAM_RETRY_MAX, TELEGRAM_RETRY_MAX_WAIT
+
+logger = logging.getLogger(__name__)
+
+MODERATION = 0
+INTERACTIVE = 1
+BACKGROUND = 2
+
+_MODERATION_METHODS = (DeleteMessage, DeleteMessages, RestrictChatMember, BanChatMember, UnbanChatMember, BanChatSenderChat)
+_BACKGROUND_METHODS = (GetChatMemberCount,)
+# Guruh/kanal limiti (daqiqasiga N ta) faqat xabar yuboradigan metodlarga tegishli.
+_MESSAGE_METHODS = (
+    SendMessage, CopyMessage, CopyMessages, ForwardMessage, ForwardMessages, SendMediaGroup,
+    SendPhoto, SendDocument, SendVideo, SendAnimation, SendAudio, SendVoice, SendVideoNote,
+    SendSticker, SendPoll, SendLocation, SendContact, SendVenue, SendDice,
+)
+# Long polling cheklanmaydi.
+_EXEMPT_METHODS = (GetUpdates,)
+# Bo‘sh (to‘la) chat bucketlari shu sondan oshganda tozalanadi.
+_CHAT_BUCKETS_MAX = 10000
+
+_priority: contextvars.ContextVar[int | None] = contextvars.ContextVar("telegram_request_priority", default=None)
+
+
+def set_background_priority():
+    """Joriy task (va undan yaratilgan task'lar) so‘rovlari fon ustuvorligida ketadi."""
+    _priority.set(BACKGROUND)
+
+
+@contextmanager
+def background_requests():
+    token = _priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Keyingi token uchun kutish (0 — hozir olish mumkin)."""
+        self._refill(now)
+        if self.paused_until > now:
+            return self.paused_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def reserve(self, now: float) -> float:
+        """Tokenni qarzga oladi va navbat kelguncha kutish vaqtini qaytaradi (FIFO)."""
+        self._refill(now)
+        self.tokens -= 1
+        wait = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+        return max(wait, self.paused_until - now)
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def is_idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity and self.paused_until <= now
+
+
+class PriorityBucket(TokenBucket):
+    """Token-bucket, kutayotganlar esa ustuvorlik (keyin kelish tartibi) bo‘yicha o‘tadi."""
+
+    def __init__(self, rate: float, capacity: float):
+        super().__init__(rate, capacity)
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    async def acquire(self, priority: int):
+        if not self._waiters and self.wait_time(time.monotonic()) == 0:
+            self.tokens -= 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._dispatch())
+        self._wakeup.set()
+        await future
+
+    def pause(self, seconds: float):
+        super().pause(seconds)
+        self._wakeup.set()
+
+    async def _dispatch(self):
+        while True:
+            while self._waiters and self._waiters[0][2].done():
+                # Kutayotgan so‘rov bekor qilingan.
+                heapq.heappop(self._waiters)
+            self._wakeup.clear()
+            if not self._waiters:
+                await self._wakeup.wait()
+                continue
+            wait = self.wait_time(time.monotonic())
+            if wait <= 0:
+                self.tokens -= 1
+                heapq.heappop(self._waiters)[2].set_result(None)
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+class RateLimiter(BaseRequestMiddleware):
+    def __init__(
+        self,
+        global_rate: float = TELEGRAM_GLOBAL_RATE,
+        group_per_minute: float = TELEGRAM_GROUP_PER_MINUTE,
+        max_retries: int = TELEGRAM_RETRY_MAX,
+        max_retry_wait: float = TELEGRAM_RETRY_MAX_WAIT,
+    ):
+        self.global_bucket = PriorityBucket(global_rate, global_rate)
+        self.group_per_minute = float(group_per_minute)
+        self.max_retries = int(max_retries)
+        self.max_retry_wait = float(max_retry_wait)
+        self._chats: dict[int, TokenBucket] = {}
+        self.requests = 0
+        self.retry_after = 0
+
+    @staticmethod
+    def priority_for(method) -> int:
+        if isinstance(method, _MODERATION_METHODS):
+            return MODERATION
+        forced = _priority.get()
+        if forced is not None:
+            return forced
+        if isinstance(method, _BACKGROUND_METHODS):
+            return BACKGROUND
+        return INTERACTIVE
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= _CHAT_BUCKETS_MAX:
+                now = time.monotonic()
+                for key in [key for key, item in self._chats.items() if item.is_idle(now)]:
+                    del self._chats[key]
+            bucket = self._chats[chat_id] = TokenBucket(self.group_per_minute / 60, self.group_per_minute)
+        return bucket
+
+    @staticmethod
+    def _group_chat_id(method) -> int | None:
+        if not isinstance(method, _MESSAGE_METHODS):
+            return None
+        chat_id = getattr(method, "chat_id", None)
+        # Guruh/kanal id manfiy; private chat va "@username" bu limitga kirmaydi.
+        if isinstance(chat_id, int) and chat_id < 0:
+            return chat_id
+        return None
+
+    async def __call__(self, make_request, bot, method):
+        if isinstance(method, _EXEMPT_METHODS):
+            return await make_request(bot, method)
+
+        priority = self.priority_for(method)
+        chat_id = self._group_chat_id(method)
+        attempt = 0
+        while True:
+            if chat_id is not None:
+                wait = self._chat_bucket(chat_id).reserve(time.monotonic())
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            await self.global_bucket.acquire(priority)
+            self.requests += 1
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as exc:
+                self.retry_after += 1
+                # Chatga yuborilgan xabarda — faqat o‘sha chat, aks holda butun bot to‘xtaydi.
+                if chat_id is not None:
+                    self._chat_bucket(chat_id).pause(exc.retry_after)
+                else:
+                    self.global_bucket.pause(exc.retry_after)
+                attempt += 1
+                if attempt > self.max_retries or exc.retry_after > self.max_retry_wait:
+                    raise
+                logger.warning(
+                    "Telegram RetryAfter: %s s kutiladi (%s, chat_id=%s, urinish %s)",
+                    exc.retry_after, type(method).__name__, getattr(method, "chat_id", None), attempt,
+                )
+
+    def stats(self) -> dict:
+        return {"requests": self.requests, "retry_after": self.retry_after, "chats": len(self._chats)}
+
+    async def close(self):
+        await self.global_bucket.close()
+
+
+rate_limiter = RateLimiter()
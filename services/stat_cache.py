@@ -2,15 +2,21 @@ import asyncio
 import logging
 
 from aiogram.enums import ChatMemberStatus
-from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
 
 from database import (
     get_all_chats,
     update_chat_bot_status,
-    get_stats_summary,
-    save_stats_summary_cache,
+    get_stats_summary_cached,
+    reconcile_stats_cache,
     rebuild_referral_stats_cache,
+    check_referral_stats_cache,
+    flush_writes,
+    get_metadata_cache_stats,
+    sweep_runtime_caches,
+    get_runtime_cache_stats,
 )
+from services.bot_rights import fetch_bot_rights
+from services.rate_limiter import set_background_priority
 
 logger = logging.getLogger(__name__)
 
@@ -18,16 +24,13 @@ REFRESH_INTERVAL_SECONDS = 30 * 60
 REFRESH_CONCURRENCY = 12
 
 
-async def _refresh_one_chat_status(bot, bot_id: int, chat_id: int) -> tuple[int, str]:
+async def _refresh_one_chat_status(bot, chat_id: int) -> tuple[int, str]:
     try:
-        member = await bot.get_chat_member(chat_id, bot_id)
-        status = getattr(member.status, "value", str(member.status))
-        is_admin = 1 if member.status in {ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.CREATOR} else 0
+        rights = await fetch_bot_rights(bot, chat_id)
+        status = rights["status"]
+        is_admin = 1 if status in {ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.CREATOR} else 0
         await update_chat_bot_status(chat_id, is_admin, status)
         return is_admin, status
-    except (TelegramForbiddenError, TelegramBadRequest):
-        await update_chat_bot_status(chat_id, 0, "not_member")
-        return 0, "not_member"
     except Exception as exc:
         logger.warning("Status cache yangilashda xato. chat_id=%s: %s", chat_id, exc)
         await update_chat_bot_status(chat_id, 0, "unknown")
@@ -35,26 +38,46 @@ async def _refresh_one_chat_status(bot, bot_id: int, chat_id: int) -> tuple[int,
 
 
 async def refresh_stats_cache_once(bot) -> None:
-    """10 000+ chatni fon rejimida tekshiradi va natijani cache jadvallariga yozadi."""
-    bot_id = (await bot.me()).id
-    chats = await get_all_chats()
+    """10 000+ chatni fon rejimida tekshiradi va natijani cache jadvallariga yozadi.
+
+    Bot chiqarilgan chatlar (``is_reachable=0``) tekshirilmaydi — bot qayta qo‘shilsa
+    my_chat_member eventi ularni yana faol qiladi.
+    """
+    chats = await get_all_chats(reachable_only=True)
     semaphore = asyncio.Semaphore(REFRESH_CONCURRENCY)
 
     async def worker(chat_id: int):
         async with semaphore:
-            return await _refresh_one_chat_status(bot, bot_id, chat_id)
+            return await _refresh_one_chat_status(bot, chat_id)
 
     if chats:
         await asyncio.gather(*(worker(int(chat[0])) for chat in chats), return_exceptions=True)
 
-    stats = await get_stats_summary()
-    await save_stats_summary_cache(stats)
-    await rebuild_referral_stats_cache()
+    await flush_writes()
+    # Hisoblagichlarni triggerlar saqlaydi; bu yerda faqat to‘liq hisob bilan solishtirib tuzatiladi.
+    await reconcile_stats_cache()
+    stats = await get_stats_summary_cached()
+    # Referral hisoblagichlari ham triggerlar bilan saqlanadi; farq bo‘lsagina qayta quriladi.
+    referral_drift = await check_referral_stats_cache()
+    if referral_drift:
+        logger.warning("referral_stats_cache farqi topildi, qayta qurilmoqda: %s", referral_drift)
+        await rebuild_referral_stats_cache()
     logger.info("Statistika cache yangilandi: chats=%s admin=%s", stats.get("chats_count"), stats.get("bot_admin_chats"))
+    meta = get_metadata_cache_stats()
+    logger.info("User/chat upsert: tejalgan=%s yozilgan=%s (hit=%.1f%%)", meta["hits"], meta["misses"], meta["hit_ratio"] * 100)
+    swept = sweep_runtime_caches()
+    for cache in get_runtime_cache_stats():
+        logger.info(
+            "Cache %s: yozuv=%s ~%.1f KB hit=%.1f%% chiqarilgan=%s eskirgan=%s",
+            cache["name"], cache["entries"], cache["bytes"] / 1024, cache["hit_ratio"] * 100,
+            cache["evictions"], cache["expirations"],
+        )
+    logger.debug("Runtime cache supurildi: %s yozuv", swept)
 
 
 async def stats_cache_loop(bot) -> None:
     """Bot ishlashi davomida statistikani har 30 daqiqada yangilab turadi."""
+    set_background_priority()
     await asyncio.sleep(5)
     while True:
         try:
@@ -0,0 +1,8 @@
+import os
+import sys
+from pathlib import Path
+
+# config.py BOT_TOKEN'siz yuklanmaydi; testlar Telegramga ulanmaydi.
+os.environ.setdefault("BOT_TOKEN", "0:test")
+os.environ.setdefault("ADMIN_IDS", "1")
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,70 @@
+import asyncio
+
+import database
+from database import ConnectionPool
+
+
+def test_submit_during_drain_is_flushed(tmp_path):
+    """Taymer drain ichida turganda kelgan yozuv ham o‘z taymeri bilan saqlanadi."""
+
+    async def scenario():
+        pool = ConnectionPool(str(tmp_path / "queue.db"), readers=1)
+        pool.queue.flush_interval = 0.05
+        async with pool.write() as db:
+            await db.execute("CREATE TABLE t (id INTEGER PRIMARY KEY)")
+            await db.commit()
+
+        writer = pool._writer
+        commit = writer.commit
+        draining = asyncio.Event()
+
+        async def slow_commit():
+            draining.set()
+            await asyncio.sleep(0.3)
+            await commit()
+
+        writer.commit = slow_commit
+        try:
+            pool.queue.submit(None, "INSERT INTO t (id) VALUES (?)", (1,))
+            await draining.wait()
+            pool.queue.submit(None, "INSERT INTO t (id) VALUES (?)", (2,))
+            await asyncio.sleep(1)
+            assert len(pool.queue) == 0
+            async with pool.read() as reader:
+                cursor = await reader.execute("SELECT id FROM t ORDER BY id")
+                assert [row[0] for row in await cursor.fetchall()] == [1, 2]
+        finally:
+            writer.commit = commit
+            await pool.close()
+
+    asyncio.run(scenario())
+
+
+def test_failed_write_reports_keys(tmp_path):
+    """Bajarilmagan yozuv kaliti on_failed ga uzatiladi, muvaffaqiyatlisi esa yo‘q."""
+
+    async def scenario():
+        pool = ConnectionPool(str(tmp_path / "queue.db"), readers=1)
+        failed = []
+        pool.queue.on_failed = failed.extend
+        async with pool.write() as db:
+            await db.execute("CREATE TABLE t (id INTEGER PRIMARY KEY)")
+            await db.commit()
+        try:
+            pool.queue.submit(("user", 1), "INSERT INTO t (id) VALUES (?)", (1,))
+            pool.queue.submit(("user", 2), "INSERT INTO t (id) VALUES (?)", (1,))
+            await pool.queue.flush()
+            assert failed == [("user", 2)]
+        finally:
+            await pool.close()
+
+    asyncio.run(scenario())
+
+
+def test_failed_metadata_write_is_retried():
+    key = ("user", 987654321)
+    fingerprint = ("Ism", "", "", None)
+    assert database._metadata_changed(*key, fingerprint)
+    assert not database._metadata_changed(*key, fingerprint)
+    database._pool.queue.on_failed([key])
+    assert database._metadata_changed(*key, fingerprint)
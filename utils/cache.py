@@ -0,0 +1,156 @@
+"""Jarayon ichidagi LRU+TTL cache: kalit va namespace bo‘yicha bekor qilish, single-flight.
+
+Bitta chat sozlamasi o‘zgarsa faqat o‘sha kalit o‘chiriladi. Global o‘zgarish
+(masalan global yomon so‘z) namespace generatsiyasini oshiradi — eski yozuvlar
+o‘qishda eskirgan deb hisoblanadi, hammasini bir vaqtda tozalash shart emas.
+Bir kalit uchun bir vaqtda kelgan miss'lar bitta yuklashni (so‘rovni) kutadi.
+
+Hajm cheklangan: yozuvlar soni (``max_entries``) va taxminiy baytlar (``max_bytes``)
+oshsa eng kam ishlatilgan yozuvlar chiqariladi, muddati o‘tganlar esa har ``ttl``
+soniyada bir marta yozish paytida supurib tashlanadi.
+"""
+import asyncio
+import sys
+import time
+from collections import OrderedDict
+
+MISSING = object()
+
+
+def approx_size(obj) -> int:
+    """Taxminiy bayt hajmi: obyektning o‘zi va bir qavat ichidagi elementlar."""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(sys.getsizeof(item) for item in obj)
+    return size
+
+
+class RuntimeCache:
+    def __init__(self, name: str, ttl: float, max_entries: int = 0, max_bytes: int = 0):
+        self.name = name
+        self.ttl = float(ttl)
+        self.max_entries = int(max_entries)
+        self.max_bytes = int(max_bytes)
+        # key -> (ts, generation, value, size); tartib — eng eski ishlatilgandan yangisiga.
+        self._data: OrderedDict = OrderedDict()
+        self._generation = 0
+        self._inflight: dict = {}
+        self._bytes = 0
+        self._last_sweep = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def _drop(self, key):
+        item = self._data.pop(key, None)
+        if item is not None:
+            self._bytes -= item[3]
+        return item
+
+    def get(self, key, default=MISSING):
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return default
+        ts, generation, value, _ = item
+        if generation != self._generation or time.monotonic() - ts > self.ttl:
+            self._drop(key)
+            self.expirations += 1
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        now = time.monotonic()
+        if now - self._last_sweep >= self.ttl:
+            self.sweep(now)
+        self._drop(key)
+        size = approx_size(key) + approx_size(value)
+        self._data[key] = (now, self._generation, value, size)
+        self._bytes += size
+        while self._data and (
+            (self.max_entries and len(self._data) > self.max_entries)
+            or (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            self._drop(next(iter(self._data)))
+            self.evictions += 1
+        return value
+
+    def sweep(self, now: float | None = None) -> int:
+        """Muddati o‘tgan va eski generatsiyadagi yozuvlarni o‘chiradi."""
+        now = time.monotonic() if now is None else now
+        self._last_sweep = now
+        stale = [
+            key for key, (ts, generation, _, _) in self._data.items()
+            if generation != self._generation or now - ts > self.ttl
+        ]
+        for key in stale:
+            self._drop(key)
+        self.expirations += len(stale)
+        return len(stale)
+
+    def invalidate(self, key):
+        """Bitta kalitni bekor qiladi; davom etayotgan yuklash natijasi ham saqlanmaydi."""
+        self._drop(key)
+        self._inflight.pop(key, None)
+
+    def invalidate_all(self):
+        """Global o‘zgarish: generatsiya oshadi, barcha eski yozuvlar eskiradi."""
+        self._generation += 1
+        self._inflight.clear()
+
+    def clear(self):
+        self._data.clear()
+        self._bytes = 0
+        self.invalidate_all()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "name": self.name,
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": (self.hits / total) if total else 0.0,
+        }
+
+    async def get_or_load(self, key, loader):
+        """Cache'dan oladi, bo‘lmasa ``loader()`` ni chaqiradi (bir kalitga bitta yuklash)."""
+        value = self.get(key)
+        if value is not MISSING:
+            return value
+        flight = self._inflight.get(key)
+        if flight is None:
+            flight = asyncio.ensure_future(self._load(key, loader, self._generation))
+            # Hech kim kutmay qolsa ham "exception was never retrieved" chiqmasin.
+            flight.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[key] = flight
+        # Birinchi chaqiruvchi bekor qilinsa ham yuklash boshqalar uchun davom etadi.
+        return await asyncio.shield(flight)
+
+    async def _load(self, key, loader, generation: int):
+        me = asyncio.current_task()
+        try:
+            value = await loader()
+            # Yuklash paytida kalit yoki namespace bekor qilingan bo‘lsa, eski natija saqlanmaydi.
+            if self._inflight.get(key) is me and generation == self._generation:
+                self.set(key, value)
+            return value
+        finally:
+            if self._inflight.get(key) is me:
+                self._inflight.pop(key, None)
@@ -1,30 +1,191 @@
+import csv
+import gzip
+import io
+import json
+import os
+
 from reportlab.platypus import SimpleDocTemplate, Paragraph
 from reportlab.lib.styles import getSampleStyleSheet
 from xml.sax.saxutils import escape as xml_escape
+from utils.pdf_render import render_pdf_range
 from utils.timezone import format_samarkand
 
-def export_chats_to_txt(chats, filename="chats.txt"):
-    with open(filename, "w", encoding="utf-8") as f:
-        for row in chats:
-            chat_id, title, chat_type, invite_link, is_admin = row[:5]
-            bot_status = row[5] if len(row) > 5 else "unknown"
-            f.write(f"ID: {chat_id} | {title} | {chat_type} | Admin: {bool(is_admin)} | Status: {bot_status} | link: {invite_link}\n")
-    return filename
 
+class TxtWriter:
+    """Bloklarni faylga darhol yozadi (butun matn xotirada yig‘ilmaydi)."""
 
-def export_chats_to_pdf(chats, filename="chats.pdf"):
-    doc = SimpleDocTemplate(filename)
-    styles = getSampleStyleSheet()
-    story = []
+    def __init__(self, filename: str):
+        self.filename = filename
+        self._file = open(filename, "w", encoding="utf-8")
 
-    for row in chats:
-        chat_id, title, chat_type, invite_link, is_admin = row[:5]
-        bot_status = row[5] if len(row) > 5 else "unknown"
-        text = f"ID: {chat_id} | {title} | {chat_type} | Admin: {bool(is_admin)} | Status: {bot_status} | link: {invite_link}"
-        story.append(Paragraph(text, styles["Normal"]))
+    def write_block(self, lines):
+        self._file.write("".join(f"{line}\n" for line in lines))
 
-    doc.build(story)
-    return filename
+    def close(self) -> str:
+        self._file.close()
+        return self.filename
+
+
+class StreamingExport:
+    """Qatorlar partiyalab keladi; ``write`` va ``close`` worker threadda chaqiriladi."""
+
+    def __init__(self, writer, render):
+        self.writer = writer
+        self.render = render
+        self.count = 0
+
+    def write(self, rows):
+        for row in rows:
+            self.count += 1
+            self.writer.write_block(self.render(self.count, row))
+
+    def close(self) -> str:
+        return self.writer.close()
+
+    def abort(self):
+        """Xato bo‘lsa yarim yozilgan fayl qolmasin."""
+        try:
+            self.writer.close()
+        except Exception:
+            pass
+        try:
+            os.remove(self.writer.filename)
+        except OSError:
+            pass
+
+
+def _writer(fmt: str, filename: str):
+    # PDF uchun utils/pdf_render.py (jadval, alohida jarayonlarda).
+    if fmt == "txt":
+        return TxtWriter(filename)
+    raise ValueError(f"Noma’lum export formati: {fmt}")
+
+
+def _chat_lines(_, row):
+    chat_id, title, chat_type, invite_link, is_admin = row[:5]
+    bot_status = row[5] if len(row) > 5 else "unknown"
+    return [f"ID: {chat_id} | {title} | {chat_type} | Admin: {bool(is_admin)} | Status: {bot_status} | link: {invite_link}"]
+
+
+def _user_lines(index, row):
+    user_id, first_name, last_name, username, language_code, joined_at = row[:6]
+    full_name = f"{first_name or ''} {last_name or ''}".strip() or "Noma’lum"
+    username_text = f"@{username}" if username else "—"
+    return [
+        f"{index}. {full_name}",
+        f"   ID: {user_id}",
+        f"   Username: {username_text}",
+        f"   Til: {language_code or '—'}",
+        f"   Qo‘shilgan: {format_samarkand(joined_at)}",
+        "",
+    ]
+
+
+def open_chats_export(fmt: str, filename: str) -> StreamingExport:
+    return StreamingExport(_writer(fmt, filename), _chat_lines)
+
+
+def open_users_export(fmt: str, filename: str, total: int) -> StreamingExport:
+    """``total`` sarlavha uchun oldindan (COUNT bilan) olinadi — qatorlar hali o‘qilmagan."""
+    writer = _writer(fmt, filename)
+    writer.write_block([f"Foydalanuvchilar soni: {total}", "=" * 60, ""])
+    return StreamingExport(writer, _user_lines)
+
+
+class RecordExport:
+    """CSV yoki gzip JSON Lines; fayl ``max_bytes`` dan oshsa keyingi qism ochiladi.
+
+    Hajm har partiyadan oldin tekshiriladi (qism chegaradan ko‘pi bilan bitta partiyaga
+    oshadi). Har qism mustaqil: CSV sarlavhasi har qismda takrorlanadi. Bitta qism
+    bo‘lsa fayl ``filename`` nomida qoladi, aks holda ``name.1.csv``, ``name.2.csv`` ...
+    """
+
+    def __init__(self, fmt: str, filename: str, columns, max_bytes: int):
+        if fmt not in {"csv", "jsonl"}:
+            raise ValueError(f"Noma’lum export formati: {fmt}")
+        self.fmt = fmt
+        self.filename = filename
+        self.columns = tuple(columns)
+        self.max_bytes = int(max_bytes)
+        self.parts: list[str] = []
+        self.count = 0
+        self._raw = None
+        self._file = None
+        self._open_part()
+
+    def _part_name(self, number: int) -> str:
+        base, ext = self.filename, ""
+        for suffix in (".jsonl.gz", ".csv"):
+            if base.endswith(suffix):
+                base, ext = base[:-len(suffix)], suffix
+                break
+        return f"{base}.{number}{ext}"
+
+    def _open_part(self):
+        path = self.filename if not self.parts else self._part_name(len(self.parts) + 1)
+        if len(self.parts) == 1:
+            # Ikkinchi qism kerak bo‘ldi — birinchisi ham raqamli nom oladi.
+            os.replace(self.parts[0], self._part_name(1))
+            self.parts[0] = self._part_name(1)
+        self.parts.append(path)
+        self._part_rows = 0
+        self._raw = open(path, "wb")
+        if self.fmt == "csv":
+            # utf-8-sig: Excel o‘zbek/kirill harflarini to‘g‘ri ochadi.
+            self._file = io.TextIOWrapper(self._raw, encoding="utf-8-sig", newline="")
+            self._csv = csv.writer(self._file)
+            self._csv.writerow(self.columns)
+        else:
+            self._file = gzip.GzipFile(filename=os.path.basename(path)[:-3], mode="wb", fileobj=self._raw)
+
+    def _close_part(self):
+        self._file.close()
+        self._raw.close()
+
+    def _size(self) -> int:
+        # gzip ichki buferi hisobga olinmaydi — u chegara zaxirasidan ancha kichik.
+        if self.fmt == "csv":
+            self._file.flush()
+        return self._raw.tell()
+
+    def write(self, rows):
+        if self._part_rows and self._size() >= self.max_bytes:
+            self._close_part()
+            self._open_part()
+        if self.fmt == "csv":
+            self._csv.writerows(rows)
+        else:
+            columns = self.columns
+            self._file.write("".join(
+                json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=str) + "\n" for row in rows
+            ).encode("utf-8"))
+        self._part_rows += len(rows)
+        self.count += len(rows)
+
+    def close(self) -> list[str]:
+        self._close_part()
+        return self.parts
+
+    def abort(self):
+        try:
+            self._close_part()
+        except Exception:
+            pass
+        for path in self.parts:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def export_chats_to_txt(chats, filename="chats.txt"):
+    export = open_chats_export("txt", filename)
+    export.write(chats)
+    return export.close()
+
+
+def export_chats_to_pdf(chats, filename="chats.pdf"):
+    return render_pdf_range(filename, "chats", f"Guruh/kanallar ro‘yxati — jami {len(chats)}", list(chats))[0]
 
 
 def _only_admin_referral_chats(chats):
@@ -92,125 +253,106 @@ def export_referral_chats_to_pdf(link_name, public_url, chats, filename="referra
 
 
 def export_users_to_txt(users, filename="users.txt"):
-    with open(filename, "w", encoding="utf-8") as f:
-        f.write(f"Foydalanuvchilar soni: {len(users)}\n")
-        f.write("=" * 60 + "\n\n")
-        for i, row in enumerate(users, start=1):
-            user_id, first_name, last_name, username, language_code, joined_at = row[:6]
-            full_name = f"{first_name or ''} {last_name or ''}".strip() or "Noma’lum"
-            username_text = f"@{username}" if username else "—"
-            f.write(f"{i}. {full_name}\n")
-            f.write(f"   ID: {user_id}\n")
-            f.write(f"   Username: {username_text}\n")
-            f.write(f"   Til: {language_code or '—'}\n")
-            f.write(f"   Qo‘shilgan: {format_samarkand(joined_at)}\n\n")
-    return filename
+    export = open_users_export("txt", filename, len(users))
+    export.write(users)
+    return export.close()
 
 
 def export_users_to_pdf(users, filename="users.pdf"):
-    doc = SimpleDocTemplate(filename)
-    styles = getSampleStyleSheet()
-    story = []
-    story.append(Paragraph("<b>Foydalanuvchilar ro‘yxati</b>", styles["Title"]))
-    story.append(Paragraph(f"<b>Jami:</b> {len(users)}", styles["Normal"]))
-    story.append(Paragraph("<br/>", styles["Normal"]))
-
-    if not users:
-        story.append(Paragraph("Foydalanuvchilar topilmadi.", styles["Normal"]))
-    else:
-        for i, row in enumerate(users, start=1):
-            user_id, first_name, last_name, username, language_code, joined_at = row[:6]
-            full_name = f"{first_name or ''} {last_name or ''}".strip() or "Noma’lum"
-            username_text = f"@{username}" if username else "—"
-            text = (
-                f"<b>{i}. {xml_escape(str(full_name))}</b><br/>"
-                f"ID: {user_id} | Username: {xml_escape(str(username_text))} | Til: {xml_escape(str(language_code or '—'))}<br/>"
-                f"Qo‘shilgan: {xml_escape(format_samarkand(joined_at))}"
-            )
-            story.append(Paragraph(text, styles["Normal"]))
-            story.append(Paragraph("<br/>", styles["Normal"]))
-
-    doc.build(story)
-    return filename
-
-
-
-def export_all_referral_chats_to_xlsx(referral_data, filename="giper_links.xlsx"):
-    from openpyxl import Workbook
-    from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-    from openpyxl.utils import get_column_letter
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Guruh kanallar"
-
-    headers = [
-        "TR",
-        "Guruh/kanallar nomi",
-        "Guruh/kanallar turi",
-        "Id",
-        "Azolar soni",
-        "Kim qo'shgani",
-        "Giper\nssilkasi nomi",
-    ]
-
-    blue = PatternFill("solid", fgColor="8DB4D9")
-    title_blue = PatternFill("solid", fgColor="4F81BD")
-    bold = Font(bold=True)
-    thin = Side(style="thin", color="000000")
-    border = Border(left=thin, right=thin, top=thin, bottom=thin)
-
-    # Katta sarlavha
-    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=len(headers))
-    title_cell = ws.cell(row=1, column=1, value="Guruh/kanallar ro'yxati")
-    title_cell.fill = title_blue
-    title_cell.font = Font(bold=True, size=14)
-    title_cell.alignment = Alignment(horizontal="center", vertical="center")
-
-    # Jadval shapka
-    for col_idx, header in enumerate(headers, start=1):
-        cell = ws.cell(row=2, column=col_idx, value=header)
-        cell.fill = blue
-        cell.font = bold
-        cell.border = border
-        cell.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-
-    row = 3
-    tr = 1
-
-    for item in referral_data:
-        link_name = item.get("name") or "Nomsiz ssilka"
-        chats = item.get("chats") or []
-
-        for chat in chats:
-            chat_id, title, chat_type, is_admin, bot_status, added_at, added_by = chat[:7]
-            member_count = chat[7] if len(chat) > 7 else None
-
+    return render_pdf_range(filename, "users", f"Foydalanuvchilar ro‘yxati — jami {len(users)}", list(users))[0]
+
+
+
+REFERRAL_XLSX_HEADERS = [
+    "TR",
+    "Guruh/kanallar nomi",
+    "Guruh/kanallar turi",
+    "Id",
+    "Azolar soni",
+    "Kim qo'shgani",
+    "Giper\nssilkasi nomi",
+]
+REFERRAL_XLSX_WIDTHS = [8, 28, 28, 18, 18, 22, 18]
+
+
+class ReferralXlsxExport:
+    """Barcha giper ssilkalar chatlari: ``write_only`` workbook, qatorlar kelishi bilan yoziladi.
+
+    Oddiy ``Workbook`` har hujayrani xotirada ushlaydi va har biriga yangi Alignment/Border
+    yaratiladi. Bu yerda uchta nomli (named) stil bir marta ro‘yxatga olinadi, hujayralar
+    faqat stil nomiga ishora qiladi. Qatorlar: ``(ssilka nomi, chat_id, nomi, turi, a'zolar, kim qo‘shgan)``.
+    """
+
+    def __init__(self, filename: str):
+        from openpyxl import Workbook
+        from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+        from openpyxl.utils import get_column_letter
+
+        self.filename = filename
+        self.count = 0
+        self._wb = Workbook(write_only=True)
+        ws = self._ws = self._wb.create_sheet("Guruh kanallar")
+
+        thin = Side(style="thin", color="000000")
+        border = Border(left=thin, right=thin, top=thin, bottom=thin)
+        centered = Alignment(horizontal="center", vertical="center", wrap_text=True)
+        for style in (
+            NamedStyle(name="ref_title", font=Font(bold=True, size=14), fill=PatternFill("solid", fgColor="4F81BD"),
+                       alignment=Alignment(horizontal="center", vertical="center")),
+            NamedStyle(name="ref_header", font=Font(bold=True), fill=PatternFill("solid", fgColor="8DB4D9"),
+                       border=border, alignment=centered),
+            NamedStyle(name="ref_cell", border=border, alignment=centered),
+        ):
+            self._wb.add_named_style(style)
+
+        # write_only rejimida o‘lchamlar, birlashtirish va muzlatish qatorlardan oldin beriladi.
+        for col_idx, width in enumerate(REFERRAL_XLSX_WIDTHS, start=1):
+            ws.column_dimensions[get_column_letter(col_idx)].width = width
+        ws.row_dimensions[1].height = 25
+        ws.row_dimensions[2].height = 45
+        ws.merged_cells.add(f"A1:{get_column_letter(len(REFERRAL_XLSX_HEADERS))}1")
+        ws.freeze_panes = "A3"
+
+        ws.append([self._cell("Guruh/kanallar ro'yxati", "ref_title")])
+        ws.append([self._cell(header, "ref_header") for header in REFERRAL_XLSX_HEADERS])
+
+    def _cell(self, value, style: str):
+        from openpyxl.cell import WriteOnlyCell
+
+        cell = WriteOnlyCell(self._ws, value=value)
+        cell.style = style
+        return cell
+
+    def write(self, rows):
+        for link_name, chat_id, title, chat_type, member_count, added_by in rows:
+            self.count += 1
             values = [
-                tr,
+                self.count,
                 title or "",
                 chat_type or "",
                 chat_id or "",
                 member_count if member_count is not None else "",
                 added_by or "",
-                link_name,
+                link_name or "Nomsiz ssilka",
             ]
-
-            for col_idx, value in enumerate(values, start=1):
-                cell = ws.cell(row=row, column=col_idx, value=value)
-                cell.border = border
-                cell.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-
-            row += 1
-            tr += 1
-
-    widths = [8, 28, 28, 18, 18, 22, 18]
-    for col_idx, width in enumerate(widths, start=1):
-        ws.column_dimensions[get_column_letter(col_idx)].width = width
-
-    ws.row_dimensions[1].height = 25
-    ws.row_dimensions[2].height = 45
-    ws.freeze_panes = "A3"
-
-    wb.save(filename)
-    return filename
\ No newline at end of file
+            self._ws.append([self._cell(value, "ref_cell") for value in values])
+
+    def close(self) -> str:
+        self._wb.save(self.filename)
+        return self.filename
+
+    def abort(self):
+        try:
+            self._ws.close()
+        except Exception:
+            pass
+        try:
+            os.remove(self.filename)
+        except OSError:
+            pass
+
+
+def export_all_referral_chats_to_xlsx(rows, filename="giper_links.xlsx"):
+    export = ReferralXlsxExport(filename)
+    export.write(rows)
+    return export.close()
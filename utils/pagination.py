@@ -0,0 +1,62 @@
+"""Keyset (cursor) sahifalash uchun callback_data yordamchilari.
+
+OFFSET chuqur sahifalarda barcha oldingi qatorlarni o‘qib chiqadi va yangi qator
+qo‘shilsa sahifalar siljiydi. Kursor esa sahifaning chetidagi qator kaliti
+(masalan ``(updated_at, chat_id)``) — keyingi so‘rov shu kalitdan davom etadi.
+
+Telegram callback_data 64 baytdan oshmasligi kerak, shuning uchun kalit butun
+sonlari base36 ko‘rinishida, nuqta bilan ajratib yoziladi: ``"tr8k0w.-cs9tlz9u"``.
+Sahifa havolasi: ``<prefix>:<sahifa>`` (birinchi sahifa) yoki
+``<prefix>:<sahifa>:<n|p>:<kursor>`` — ``n`` kursordan keyingi, ``p`` oldingi qatorlar.
+"""
+CALLBACK_DATA_LIMIT = 64
+
+_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+def _to_base36(value: int) -> str:
+    if value < 0:
+        return "-" + _to_base36(-value)
+    text = ""
+    while True:
+        value, rem = divmod(value, 36)
+        text = _DIGITS[rem] + text
+        if not value:
+            return text
+
+
+def encode_cursor(*values: int) -> str:
+    return ".".join(_to_base36(int(value)) for value in values)
+
+
+def decode_cursor(token: str, size: int) -> tuple[int, ...] | None:
+    """Noto‘g‘ri yoki eskirgan kursor uchun None (handler birinchi sahifani ko‘rsatadi)."""
+    parts = (token or "").split(".")
+    if len(parts) != size:
+        return None
+    try:
+        return tuple(int(part, 36) for part in parts)
+    except ValueError:
+        return None
+
+
+def page_ref(page: int, direction: str | None = None, cursor: tuple | None = None) -> str:
+    """Sahifa havolasining prefiksdan keyingi qismi."""
+    if direction is None or cursor is None:
+        return str(max(page, 0))
+    return f"{max(page, 0)}:{direction}:{encode_cursor(*cursor)}"
+
+
+def parse_page_ref(parts: list[str], size: int) -> tuple[int, bool, tuple[int, ...] | None]:
+    """``[sahifa, yo‘nalish, kursor]`` bo‘laklaridan ``(page, backward, cursor)``."""
+    page = int(parts[0]) if parts and parts[0].isdigit() else 0
+    if len(parts) < 3 or parts[1] not in {"n", "p"}:
+        return 0, False, None
+    cursor = decode_cursor(parts[2], size)
+    if cursor is None:
+        return 0, False, None
+    return page, parts[1] == "p", cursor
+
+
+def fits_callback_data(data: str) -> bool:
+    return len(data.encode("utf-8")) <= CALLBACK_DATA_LIMIT
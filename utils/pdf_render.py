@@ -0,0 +1,177 @@
+"""Katta ro‘yxatlar uchun PDF jadval chizuvchi (alohida jarayonda ishlashga mo‘ljallangan).
+
+Har qatorga ``Paragraph`` yaratilmaydi: sahifa — belgilangan balandlikdagi qatorlardan
+iborat jadval, matn reportlab canvas'ga bitta text obyekt bilan yoziladi, sig‘magan
+qiymat "…" bilan qisqartiriladi. Qator balandligi o‘zgarmas bo‘lgani uchun sahifadagi
+qatorlar soni oldindan ma'lum: ro‘yxatni sahifa oraliqlariga bo‘lib, har oraliqni
+boshqa jarayonda chizish va oxirida ``merge_pdfs`` bilan birlashtirish mumkin.
+
+Modul ``config``/``database`` ni import qilmaydi — ProcessPool workerlari uni toza yuklaydi.
+"""
+import os
+
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+
+from utils.timezone import format_samarkand
+
+PAGE_SIZE = landscape(A4)
+MARGIN = 28
+FONT = "Helvetica"
+BOLD_FONT = "Helvetica-Bold"
+FONT_SIZE = 7.5
+ROW_HEIGHT = 11
+TITLE_HEIGHT = 20
+HEADER_HEIGHT = 14
+CELL_PADDING = 3
+
+
+def _chat_cells(index: int, row) -> tuple:
+    chat_id, title, chat_type, invite_link, is_admin = row[:5]
+    bot_status = row[5] if len(row) > 5 else "unknown"
+    return index, chat_id, title or "", chat_type or "", "ha" if is_admin else "yo‘q", bot_status or "", invite_link or ""
+
+
+def _user_cells(index: int, row) -> tuple:
+    user_id, first_name, last_name, username, language_code, joined_at = row[:6]
+    full_name = f"{first_name or ''} {last_name or ''}".strip() or "Noma’lum"
+    return index, user_id, full_name, f"@{username}" if username else "—", language_code or "—", format_samarkand(joined_at)
+
+
+# (sarlavha, kenglik ulushi, o‘ngga tekislash)
+TABLES = {
+    "chats": (
+        [("#", 0.05, True), ("ID", 0.12, True), ("Nomi", 0.27, False), ("Turi", 0.08, False),
+         ("Admin", 0.06, False), ("Status", 0.1, False), ("Link", 0.32, False)],
+        _chat_cells,
+    ),
+    "users": (
+        [("#", 0.06, True), ("ID", 0.13, True), ("Ism", 0.33, False), ("Username", 0.22, False),
+         ("Til", 0.06, False), ("Qo‘shilgan", 0.2, False)],
+        _user_cells,
+    ),
+}
+
+
+def rows_per_page() -> int:
+    usable = PAGE_SIZE[1] - 2 * MARGIN - TITLE_HEIGHT - HEADER_HEIGHT
+    return int(usable // ROW_HEIGHT)
+
+
+def _fit(text: str, width: float) -> str:
+    """Matnni ustun kengligiga sig‘diradi (sig‘masa oxiri "…")."""
+    if stringWidth(text, FONT, FONT_SIZE) <= width:
+        return text
+    # Taxminiy uzunlikdan boshlab qisqartiriladi — har harf uchun o‘lchanmaydi.
+    cut = max(int(len(text) * width / max(stringWidth(text, FONT, FONT_SIZE), 1)), 1)
+    text = text[:cut]
+    while text and stringWidth(text + "…", FONT, FONT_SIZE) > width:
+        text = text[:-1]
+    return text + "…"
+
+
+def _columns(kind: str):
+    columns, _ = TABLES[kind]
+    width = PAGE_SIZE[0] - 2 * MARGIN
+    result, x = [], MARGIN
+    for header, share, right in columns:
+        result.append((header, x, width * share, right))
+        x += width * share
+    return result
+
+
+def _draw_page(pdf: canvas.Canvas, kind: str, title: str, page_no: int, cells: list[tuple], note: str = ""):
+    page_width, page_height = PAGE_SIZE
+    columns = _columns(kind)
+    top = page_height - MARGIN
+
+    pdf.setFont(BOLD_FONT, 11)
+    pdf.drawString(MARGIN, top - 12, title)
+    pdf.setFont(FONT, 8)
+    pdf.drawRightString(page_width - MARGIN, top - 12, f"Sahifa {page_no}")
+
+    header_top = top - TITLE_HEIGHT
+    pdf.setFillGray(0.85)
+    pdf.rect(MARGIN, header_top - HEADER_HEIGHT, page_width - 2 * MARGIN, HEADER_HEIGHT, stroke=0, fill=1)
+    pdf.setFillGray(0)
+
+    text = pdf.beginText()
+    text.setFont(BOLD_FONT, FONT_SIZE)
+    for header, x, width, _ in columns:
+        text.setTextOrigin(x + CELL_PADDING, header_top - HEADER_HEIGHT + 4)
+        text.textOut(header)
+    text.setFont(FONT, FONT_SIZE)
+    y = header_top - HEADER_HEIGHT
+    for values in cells:
+        y -= ROW_HEIGHT
+        for (_, x, width, right), value in zip(columns, values):
+            value = _fit(str(value), width - 2 * CELL_PADDING)
+            if right:
+                text.setTextOrigin(x + width - CELL_PADDING - stringWidth(value, FONT, FONT_SIZE), y + 3)
+            else:
+                text.setTextOrigin(x + CELL_PADDING, y + 3)
+            text.textOut(value)
+    pdf.drawText(text)
+
+    # Jadval chiziqlari bitta path bilan chiziladi.
+    path = pdf.beginPath()
+    bottom = y
+    for line_y in [header_top, header_top - HEADER_HEIGHT] + [
+        header_top - HEADER_HEIGHT - ROW_HEIGHT * i for i in range(1, len(cells) + 1)
+    ]:
+        path.moveTo(MARGIN, line_y)
+        path.lineTo(page_width - MARGIN, line_y)
+    for _, x, _, _ in columns + [(None, page_width - MARGIN, 0, False)]:
+        path.moveTo(x, header_top)
+        path.lineTo(x, bottom)
+    pdf.setLineWidth(0.3)
+    pdf.drawPath(path, stroke=1, fill=0)
+    if note:
+        pdf.setFont(FONT, 9)
+        pdf.drawString(MARGIN, bottom - 16, note)
+    pdf.showPage()
+
+
+def render_pdf_range(path: str, kind: str, title: str, rows: list, first_index: int = 1, first_page: int = 1) -> tuple[str, int]:
+    """``rows`` ni ``first_page`` sahifadan boshlab ``path`` ga chizadi; ``(path, sahifalar)``."""
+    _, to_cells = TABLES[kind]
+    per_page = rows_per_page()
+    pdf = canvas.Canvas(path, pagesize=PAGE_SIZE, pageCompression=1)
+    pdf.setTitle(title)
+    pages = 0
+    for start in range(0, len(rows), per_page):
+        cells = [to_cells(first_index + start + i, row) for i, row in enumerate(rows[start:start + per_page])]
+        _draw_page(pdf, kind, title, first_page + pages, cells)
+        pages += 1
+    if not rows:
+        _draw_page(pdf, kind, title, first_page, [], note="Ma’lumot topilmadi.")
+        pages = 1
+    pdf.save()
+    return path, pages
+
+
+def can_merge() -> bool:
+    try:
+        import pypdf  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def merge_pdfs(parts: list[str], path: str) -> str:
+    """Oraliqlarni tartib bilan bitta faylga yig‘adi va qism fayllarni o‘chiradi (``pypdf`` kerak)."""
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    for part in parts:
+        writer.append(part)
+    with open(path, "wb") as f:
+        writer.write(f)
+    writer.close()
+    for part in parts:
+        try:
+            os.remove(part)
+        except OSError:
+            pass
+    return path
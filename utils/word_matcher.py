@@ -0,0 +1,90 @@
+"""Yomon so‘zlar uchun Aho-Corasick avtomati.
+
+Eski ``contains_bad_word`` har xabarda barcha so‘zlardan ulkan regex yasab, uni
+qayta kompilyatsiya qilardi. Bu yerda ro‘yxat bir marta avtomatga aylantiriladi va
+matn ro‘yxat hajmidan qat'i nazar bitta o‘tishda (chiziqli vaqtda) tekshiriladi.
+
+Chegara qoidasi regex bilan bir xil: ``(?<![\\w'])so‘z(?![\\w'])`` — so‘zdan oldin
+va keyin harf, raqam, ``_`` yoki ``'`` bo‘lmasligi kerak.
+"""
+
+
+def _is_word_char(ch: str) -> bool:
+    # Python re dagi Unicode \w: isalnum() yoki "_". Bunga apostrof ham qo‘shiladi.
+    return ch.isalnum() or ch == "_" or ch == "'"
+
+
+class WordMatcher:
+    __slots__ = ("_goto", "_fail", "_out", "size")
+
+    def __init__(self, words):
+        goto: list[dict[str, int]] = [{}]
+        out: list[tuple[int, ...]] = [()]
+        size = 0
+
+        for word in {w.strip().lower() for w in words if w and w.strip()}:
+            node = 0
+            for ch in word:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({})
+                    out.append(())
+                node = nxt
+            out[node] = out[node] + (len(word),)
+            size += 1
+
+        # BFS bilan fail havolalari; har tugunga suffiks so‘zlar uzunligi ham qo‘shiladi.
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        head = 0
+        while head < len(queue):
+            node = queue[head]
+            head += 1
+            for ch, child in goto[node].items():
+                queue.append(child)
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                target = goto[f].get(ch, 0)
+                fail[child] = target if target != child else 0
+                if out[fail[child]]:
+                    out[child] = out[child] + out[fail[child]]
+
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+        self.size = size
+
+    def __bool__(self) -> bool:
+        return self.size > 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def find(self, text: str) -> str | None:
+        """Matndagi birinchi to‘liq so‘z mosligini qaytaradi, topilmasa None."""
+        if not text or not self.size:
+            return None
+        text = text.lower()
+        goto, fail, out = self._goto, self._fail, self._out
+        last = len(text) - 1
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            lengths = out[node]
+            if not lengths:
+                continue
+            if i < last and _is_word_char(text[i + 1]):
+                continue
+            for length in lengths:
+                start = i - length + 1
+                if start == 0 or not _is_word_char(text[start - 1]):
+                    return text[start:i + 1]
+        return None
+
+    def search(self, text: str) -> bool:
+        return self.find(text) is not None